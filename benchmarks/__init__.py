@@ -0,0 +1,13 @@
+# benchmarks/__init__.py
+
+"""
+Benchmarks de los caminos críticos de la calculadora.
+
+Miden los operadores, format_numeros, realizar_operacion, autenticar_usuario, los informes de
+Consultas, las exportaciones (CSV, Excel y binaria), backup_user_data, QueryCache
+y SQLSecurityValidator con varios tamaños de datos, sobre el backend en memoria,
+SQLite o PostgreSQL, y escriben los resultados en JSON para comparar versiones.
+
+Uso:
+    python -m benchmarks --backend sqlite --tamanos 100 1000 10000 --salida resultados.json
+"""
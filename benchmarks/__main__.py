@@ -0,0 +1,116 @@
+# benchmarks/__main__.py
+
+"""
+Ejecuta los benchmarks y escribe los resultados en JSON.
+
+    python -m benchmarks                                # backend en memoria, salida por pantalla
+    python -m benchmarks --backend sqlite --salida resultados.json
+    python -m benchmarks --casos consultas export       # solo los casos cuyo nombre contiene el texto
+    python -m benchmarks --comparar anterior.json --salida actual.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from benchmarks.medicion import medir, metadatos, resumir
+
+TAMANOS = [100, 1000, 10000]
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks de la Calculadora Avanzada")
+    parser.add_argument("--backend", choices=["memoria", "sqlite", "postgres"], default="memoria",
+                        help="Backend de almacenamiento (postgres usa la base de datos del .env)")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS, help="Tamaños de datos")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Repeticiones medidas por caso")
+    parser.add_argument("--casos", nargs="+", help="Ejecutar solo los casos cuyo nombre contenga alguno de estos textos")
+    parser.add_argument("--salida", help="Fichero JSON de resultados (por defecto, la salida estándar)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar las medianas")
+    return parser
+
+
+def _configurar(backend, directorio):
+    from calculadora.db.backends import configurar_backend
+    from calculadora.db.escritura_diferida import configurar_escritura
+    from calculadora.db.models import crear_tablas
+
+    if backend == "sqlite":
+        configurar_backend("sqlite", ruta=f"{directorio}/benchmark.db")
+    else:
+        configurar_backend(backend)
+    # Las escrituras se vacían dentro de la medición de realizar_operacion
+    configurar_escritura(sincrona=False)
+    crear_tablas()
+
+
+def ejecutar(backend, tamanos, repeticiones, filtros=None):
+    """
+    Ejecuta los casos seleccionados con cada tamaño.
+
+    Returns:
+        Diccionario con 'metadatos' y 'resultados' (uno por caso y tamaño). Los
+        casos que no pueden ejecutarse (p. ej. falta una dependencia) aparecen
+        con 'error' en lugar de tiempos.
+    """
+    from benchmarks.casos import CASOS, Entorno
+    from calculadora.db.backends import cerrar_backend
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="benchmarks_") as directorio:
+        _configurar(backend, directorio)
+        entorno = Entorno(directorio)
+        try:
+            for nombre, preparar in CASOS.items():
+                if filtros and not any(f in nombre for f in filtros):
+                    continue
+                for tamano in tamanos:
+                    try:
+                        tiempos = medir(preparar(entorno, tamano), repeticiones)
+                    except ImportError as e:
+                        resultados.append({"nombre": nombre, "tamano": tamano, "error": str(e)})
+                        print(f"{nombre:<34} {tamano:>8}  omitido: {e}", file=sys.stderr)
+                        break
+                    resultado = resumir(nombre, tamano, tiempos)
+                    resultados.append(resultado)
+                    print(f"{nombre:<34} {tamano:>8}  {resultado['mediana_s'] * 1000:>10.3f} ms", file=sys.stderr)
+        finally:
+            cerrar_backend()
+
+    return {"metadatos": metadatos(backend, tamanos, repeticiones), "resultados": resultados}
+
+
+def comparar(anterior, actual):
+    """
+    Relación entre las medianas actuales y las de una ejecución anterior por caso
+    y tamaño (>1 significa más lento).
+    """
+    previas = {(r["nombre"], r["tamano"]): r["mediana_s"] for r in anterior["resultados"] if "mediana_s" in r}
+    return [
+        {
+            "nombre": r["nombre"],
+            "tamano": r["tamano"],
+            "anterior_s": previas[(r["nombre"], r["tamano"])],
+            "actual_s": r["mediana_s"],
+            "relacion": r["mediana_s"] / previas[(r["nombre"], r["tamano"])],
+        }
+        for r in actual["resultados"]
+        if "mediana_s" in r and previas.get((r["nombre"], r["tamano"]))
+    ]
+
+
+if __name__ == "__main__":
+    args = crear_parser().parse_args()
+    informe = ejecutar(args.backend, args.tamanos, args.repeticiones, args.casos)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            informe["comparacion"] = comparar(json.load(f), informe)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(informe, sys.stdout, ensure_ascii=False, indent=2)
+        print()
@@ -0,0 +1,348 @@
+# benchmarks/casos.py
+
+"""
+Casos de benchmark. Cada caso es una función (entorno, tamano) que prepara lo
+necesario y retorna la función sin argumentos que se mide; la preparación no
+entra en el tiempo.
+"""
+
+import contextlib
+import io
+import os
+import random
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+from calculadora.core.cache_consultas import configurar_cache_consultas
+from calculadora.core.evaluacion_lote import evaluar_lote
+from calculadora.core.operators import operators
+from calculadora.db.escritura_diferida import vaciar_escrituras
+from calculadora.db.models import (
+    insertar_operaciones_lote,
+    obtener_operaciones,
+    obtener_usuario_por_nombre,
+    TAMANO_PAGINA,
+)
+from calculadora.services.user_service import (
+    autenticar_usuario,
+    crear_usuario_si_no_existe,
+)
+
+# Semilla de los datos generados (mismos datos en todas las ejecuciones)
+SEMILLA = 2025
+
+PASSWORD = "Benchmark1!"
+
+# Casos registrados en orden: nombre -> función
+CASOS = {}
+
+
+def caso(nombre):
+    """Registra una función como caso de benchmark."""
+    def registrar(funcion):
+        CASOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+class Entorno:
+    """
+    Datos compartidos por los casos: usuarios de prueba con 'tamano' operaciones
+    cada uno (se crean una sola vez por tamaño) y un directorio para los ficheros.
+    """
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._usuarios = {}
+        self._operaciones = {}
+
+    def usuario(self, nombre):
+        """ID del usuario 'nombre', creándolo si no existe."""
+        if nombre not in self._usuarios:
+            with contextlib.redirect_stdout(io.StringIO()):
+                crear_usuario_si_no_existe(nombre, PASSWORD)
+            self._usuarios[nombre] = obtener_usuario_por_nombre(nombre)[0]
+        return self._usuarios[nombre]
+
+    def usuario_con_operaciones(self, tamano):
+        """ID de un usuario con exactamente 'tamano' operaciones."""
+        nombre = f"benchmark_{tamano}"
+        nuevo = nombre not in self._usuarios and obtener_usuario_por_nombre(nombre) is None
+        usuario_id = self.usuario(nombre)
+        if nuevo:
+            insertar_operaciones_lote(generar_operaciones(usuario_id, tamano))
+        return usuario_id
+
+    def operaciones(self, tamano):
+        """Lista de diccionarios con las operaciones del usuario de 'tamano'."""
+        if tamano not in self._operaciones:
+            self._operaciones[tamano] = obtener_operaciones(self.usuario_con_operaciones(tamano))
+        return self._operaciones[tamano]
+
+    def ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+
+def generar_operandos(tamano, semilla=SEMILLA):
+    """Operandos y operadores aleatorios válidos (sin divisiones entre cero ni raíces negativas)."""
+    rng = np.random.default_rng(semilla)
+    operadores = rng.choice(np.array(list(operators), dtype=object), size=tamano)
+    operandos1 = np.round(rng.uniform(0, 1000, size=tamano), 2)
+    operandos2 = np.round(rng.uniform(1, 10, size=tamano), 2)
+    return operandos1, operadores, operandos2
+
+
+def generar_operaciones(usuario_id, tamano):
+    """Filas para insertar_operaciones_lote con resultados calculados."""
+    operandos1, operadores, operandos2 = generar_operandos(tamano)
+    resultados = evaluar_lote(operandos1, operadores, operandos2).resultados
+    ahora = datetime.now()
+    return [
+        (usuario_id, float(a), op, float(b), float(r), ahora, None)
+        for a, op, b, r in zip(operandos1, operadores, operandos2, resultados)
+    ]
+
+
+@contextlib.contextmanager
+def _silencio():
+    """Descarta lo que se imprime y responde Enter a cualquier input()."""
+    with contextlib.redirect_stdout(io.StringIO()), mock.patch("builtins.input", return_value=""):
+        yield
+
+
+@caso("operadores")
+def operadores_escalares(entorno, tamano):
+    operandos1, operadores, operandos2 = generar_operandos(tamano)
+    filas = list(zip(operandos1.tolist(), operadores.tolist(), operandos2.tolist()))
+
+    def ejecutar():
+        for a, op, b in filas:
+            operators[op](a, b)
+    return ejecutar
+
+
+@caso("evaluar_lote")
+def operadores_vectorizados(entorno, tamano):
+    operandos1, operadores, operandos2 = generar_operandos(tamano)
+    return lambda: evaluar_lote(operandos1, operadores, operandos2)
+
+
+@caso("format_numeros")
+def formato_numeros(entorno, tamano):
+    from calculadora.core.utils import format_numeros
+
+    operandos1, operadores, operandos2 = generar_operandos(tamano)
+    resultados = evaluar_lote(operandos1, operadores, operandos2).resultados
+    return lambda: format_numeros(resultados)
+
+
+@caso("realizar_operacion")
+def realizar_operacion(entorno, tamano):
+    from calculadora.services.operation_service import realizar_operacion as realizar
+
+    # Usuario aparte para no alterar el volumen de los usuarios de consultas
+    usuario_id = entorno.usuario("benchmark_escritura")
+    operandos1, operadores, operandos2 = generar_operandos(tamano, semilla=SEMILLA + 1)
+    filas = list(zip(operandos1.tolist(), operadores.tolist(), operandos2.tolist()))
+
+    def ejecutar():
+        for a, op, b in filas:
+            realizar(usuario_id, a, op, b)
+        # Incluye la escritura de lo encolado
+        vaciar_escrituras()
+    return ejecutar
+
+
+@caso("autenticar_usuario")
+def autenticar(entorno, tamano):
+    nombre = "benchmark_autenticacion"
+    entorno.usuario(nombre)
+
+    def ejecutar():
+        for _ in range(tamano):
+            autenticar_usuario(nombre, PASSWORD)
+    return ejecutar
+
+
+def _sin_preparadas(preparar):
+    """
+    Variante de un caso con CALCULADORA_SENTENCIAS_PREPARADAS=0 durante la medición,
+    para comparar con el caso original (solo cambia algo con el backend postgres).
+    """
+    def preparar_sin(entorno, tamano):
+        ejecutar_caso = preparar(entorno, tamano)
+
+        def ejecutar():
+            with mock.patch.dict(os.environ, {"CALCULADORA_SENTENCIAS_PREPARADAS": "0"}):
+                ejecutar_caso()
+        return ejecutar
+    return preparar_sin
+
+
+caso("realizar_operacion_sin_preparadas")(_sin_preparadas(realizar_operacion))
+caso("autenticar_usuario_sin_preparadas")(_sin_preparadas(autenticar))
+
+
+@caso("consultas_por_usuario")
+def consultas_por_usuario(entorno, tamano):
+    from calculadora.consultas import Consultas
+
+    usuario_id = entorno.usuario_con_operaciones(tamano)
+    # Sin caché de informes: se mide la consulta y el formato
+    configurar_cache_consultas(0)
+    # Tamaño de página fijo: el predeterminado depende del alto del terminal
+    consultas = Consultas(TAMANO_PAGINA)
+
+    def ejecutar():
+        # Recorre todas las páginas del informe
+        with _silencio():
+            consultas.operaciones_por_usuario(usuario_id).mostrar()
+    return ejecutar
+
+
+@caso("consultas_por_usuario_y_operador")
+def consultas_por_usuario_y_operador(entorno, tamano):
+    from calculadora.consultas import Consultas
+
+    usuario_id = entorno.usuario_con_operaciones(tamano)
+    configurar_cache_consultas(0)
+    consultas = Consultas(TAMANO_PAGINA)
+
+    def ejecutar():
+        with _silencio():
+            consultas.operaciones_por_usuario_y_operador(usuario_id, '+').mostrar()
+    return ejecutar
+
+
+@caso("consultas_por_usuario_cache")
+def consultas_por_usuario_cache(entorno, tamano):
+    from calculadora.consultas import Consultas
+
+    usuario_id = entorno.usuario_con_operaciones(tamano)
+    # La repetición de calentamiento llena la caché; las medidas son aciertos
+    configurar_cache_consultas()
+    consultas = Consultas(TAMANO_PAGINA)
+
+    def ejecutar():
+        with _silencio():
+            consultas.operaciones_por_usuario(usuario_id).mostrar()
+    return ejecutar
+
+
+@caso("export_to_csv")
+def exportar_csv(entorno, tamano):
+    from calculadora.core.export_utils import export_to_csv
+
+    datos = entorno.operaciones(tamano)
+    ruta = entorno.ruta(f"export_{tamano}.csv")
+
+    def ejecutar():
+        with _silencio():
+            export_to_csv(datos, ruta)
+    return ejecutar
+
+
+@caso("export_to_excel")
+def exportar_excel(entorno, tamano):
+    from calculadora.core.export_utils import export_to_excel
+
+    datos = entorno.operaciones(tamano)
+    ruta = entorno.ruta(f"export_{tamano}.xlsx")
+
+    def ejecutar():
+        with _silencio():
+            export_to_excel(datos, ruta)
+    return ejecutar
+
+
+@caso("export_to_binary")
+def exportar_binario(entorno, tamano):
+    from calculadora.core.export_utils import export_to_binary
+
+    datos = entorno.operaciones(tamano)
+    ruta = entorno.ruta(f"export_{tamano}.pkl")
+
+    def ejecutar():
+        with _silencio():
+            export_to_binary(datos, ruta)
+    return ejecutar
+
+
+@caso("backup_user_data")
+def copia_de_seguridad(entorno, tamano):
+    from calculadora.core.serialization_utils import backup_user_data
+
+    usuario_id = entorno.usuario_con_operaciones(tamano)
+    datos = {"operaciones": entorno.operaciones(tamano)}
+    directorio = entorno.ruta(f"backups_{tamano}")
+
+    def ejecutar():
+        with _silencio():
+            backup_user_data(usuario_id, datos, directorio)
+    return ejecutar
+
+
+def _query_cache(entorno, tamano):
+    """QueryCache en un fichero temporal con 'tamano' entradas."""
+    from calculadora.sql_chatbot import QueryCache
+
+    cache = QueryCache(entorno.ruta(f"query_cache_{tamano}.json"))
+    ahora = datetime.now()
+    cache.cache = {
+        f"clave_{i}": {"result": {"sql": f"SELECT * FROM operaciones WHERE id = {i}", "filas": i}, "timestamp": ahora}
+        for i in range(tamano)
+    }
+    cache._save_cache()
+    return cache
+
+
+@caso("query_cache_get")
+def query_cache_get(entorno, tamano):
+    cache = _query_cache(entorno, tamano)
+    claves = [f"clave_{i}" for i in range(tamano)]
+
+    def ejecutar():
+        for clave in claves:
+            cache.get(clave)
+    return ejecutar
+
+
+# Inserciones medidas por repetición de query_cache_set (cada una reescribe el fichero)
+INSERCIONES_QUERY_CACHE = 20
+
+
+@caso("query_cache_set")
+def query_cache_set(entorno, tamano):
+    """El tamaño es el número de entradas ya guardadas en la caché."""
+    cache = _query_cache(entorno, tamano)
+    resultado = {"sql": "SELECT COUNT(*) FROM operaciones", "filas": 1}
+
+    def ejecutar():
+        for i in range(INSERCIONES_QUERY_CACHE):
+            cache.set(f"nueva_{i}", resultado)
+    return ejecutar
+
+
+CONSULTAS_VALIDACION = [
+    "SELECT * FROM operaciones",
+    "SELECT operador, COUNT(*) FROM operaciones GROUP BY operador;",
+    "SELECT u.nombre, SUM(o.resultado) FROM operaciones o JOIN usuarios u ON u.id = o.usuario_id GROUP BY u.nombre",
+    "SELECT * FROM historial_memoria WHERE fecha_hora > NOW() - INTERVAL '1 day' LIMIT 10;",
+    "DELETE FROM operaciones WHERE id = 1;",
+    "SELECT * FROM pg_user",
+]
+
+
+@caso("validate_query")
+def validar_consultas(entorno, tamano):
+    from calculadora.sql_chatbot import SQLSecurityValidator
+
+    validador = SQLSecurityValidator()
+    consultas = (CONSULTAS_VALIDACION * (tamano // len(CONSULTAS_VALIDACION) + 1))[:tamano]
+    random.Random(SEMILLA).shuffle(consultas)
+
+    def ejecutar():
+        for consulta in consultas:
+            validador.validate_query(consulta)
+    return ejecutar
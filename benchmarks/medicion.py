@@ -0,0 +1,84 @@
+# benchmarks/medicion.py
+
+"""
+Medición de tiempos y formato de los resultados.
+"""
+
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def medir(funcion, repeticiones=5, calentamiento=1):
+    """
+    Ejecuta 'funcion' (sin argumentos) 'calentamiento' veces sin medir y después
+    'repeticiones' veces midiendo cada una. El recolector de basura se desactiva
+    durante cada medición para que no añada ruido.
+
+    Returns:
+        Lista con los segundos de cada repetición
+    """
+    for _ in range(calentamiento):
+        funcion()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        finally:
+            gc.enable()
+    return tiempos
+
+
+def resumir(nombre, tamano, tiempos):
+    """
+    Estadísticas de una medición. 'por_elemento_s' divide la mediana entre el
+    tamaño para comparar tamaños distintos.
+    """
+    mediana = statistics.median(tiempos)
+    return {
+        "nombre": nombre,
+        "tamano": tamano,
+        "repeticiones": len(tiempos),
+        "min_s": min(tiempos),
+        "mediana_s": mediana,
+        "media_s": statistics.fmean(tiempos),
+        "max_s": max(tiempos),
+        "desviacion_s": statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+        "por_elemento_s": mediana / tamano if tamano else None,
+    }
+
+
+def _version():
+    """Commit actual del repositorio (None si no se puede obtener)."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadatos(backend, tamanos, repeticiones):
+    """Datos del entorno que acompañan a los resultados."""
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _version(),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "backend": backend,
+        "tamanos": list(tamanos),
+        "repeticiones": repeticiones,
+        "sentencias_preparadas": os.getenv("CALCULADORA_SENTENCIAS_PREPARADAS", "1") != "0",
+    }
@@ -0,0 +1,187 @@
+# calculadora/analytics.py
+
+"""
+Analítica de uso de la calculadora: frecuencia de operadores, volumen por día y por
+hora y actividad por usuario.
+
+En lugar de cargar todas las operaciones y recalcularlo todo (como hace el notebook
+a partir de un backup), se leen dos tablas de resumen que models.actualizar_analitica
+mantiene al día de forma incremental:
+
+    analitica_por_hora     (hora, operador) -> cantidad, suma, mínimo y máximo
+    analitica_por_usuario  usuario_id       -> cantidad, suma, primera y última operación
+
+Una marca de agua (analitica_marca.ultimo_id) recuerda hasta qué id de 'operaciones'
+están incluidas; cada actualización solo suma las operaciones posteriores. Los
+resúmenes por día, por operador o por hora del día se obtienen agrupando las filas
+por hora, que son pocas comparadas con las operaciones.
+
+Los resúmenes no descuentan operaciones borradas: tras borrar, hay que reconstruirlos
+(actualizar(reconstruir=True)).
+"""
+
+import pandas as pd
+
+from calculadora.core.utils import format_numero, format_numeros
+from calculadora.db.models import (
+    actualizar_analitica,
+    estado_analitica,
+    obtener_analitica_por_hora,
+    obtener_analitica_por_usuario
+)
+
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+_COLUMNAS_POR_HORA = ["hora", "operador", "cantidad", "suma", "minimo", "maximo"]
+
+
+def actualizar(reconstruir=False):
+    """
+    Suma a los resúmenes las operaciones nuevas desde la última actualización
+    (o los recalcula desde cero con 'reconstruir').
+
+    Returns:
+        Diccionario con 'desde_id' y 'hasta_id' (intervalo de ids procesado)
+    """
+    return actualizar_analitica(reconstruir=reconstruir)
+
+
+def _por_hora(desde=None, hasta=None):
+    """DataFrame de analitica_por_hora ('desde' incluido, 'hasta' excluido)."""
+    df = pd.DataFrame(obtener_analitica_por_hora(desde=desde, hasta=hasta), columns=_COLUMNAS_POR_HORA)
+    df["hora"] = pd.to_datetime(df["hora"])
+    return df
+
+
+def _agrupar(df, clave):
+    """Cantidad, suma, mínimo y máximo de las filas por hora agrupadas por 'clave'."""
+    return df.groupby(clave).agg(
+        cantidad=("cantidad", "sum"),
+        suma=("suma", "sum"),
+        minimo=("minimo", "min"),
+        maximo=("maximo", "max")
+    )
+
+
+def frecuencia_operadores(desde=None, hasta=None):
+    """
+    DataFrame indexado por operador con cantidad, porcentaje del total, suma,
+    mínimo y máximo de los resultados, del más al menos usado.
+    """
+    df = _agrupar(_por_hora(desde, hasta), "operador").sort_values("cantidad", ascending=False)
+    total = df["cantidad"].sum()
+    df.insert(1, "porcentaje", df["cantidad"] * 100.0 / total if total else 0.0)
+    return df
+
+
+def volumen_por_dia(desde=None, hasta=None):
+    """
+    DataFrame indexado por día con cantidad, suma, mínimo y máximo, y una columna
+    por operador con su cantidad ese día.
+    """
+    df = _por_hora(desde, hasta)
+    dias = df["hora"].dt.date.rename("dia")
+    volumen = _agrupar(df, dias)
+    por_operador = df.pivot_table(index=dias, columns="operador", values="cantidad", aggfunc="sum", fill_value=0)
+    return volumen.join(por_operador)
+
+
+def actividad_por_hora_del_dia():
+    """Serie con la cantidad de operaciones por hora del día (0-23), incluidas las horas sin actividad."""
+    df = _por_hora()
+    return (df.groupby(df["hora"].dt.hour.rename("hora_del_dia"))["cantidad"].sum()
+            .reindex(range(24), fill_value=0))
+
+
+def actividad_por_dia_semana():
+    """Serie con la cantidad de operaciones por día de la semana (de lunes a domingo)."""
+    df = _por_hora()
+    return (df.groupby(df["hora"].dt.dayofweek)["cantidad"].sum()
+            .reindex(range(7), fill_value=0)
+            .set_axis(DIAS_SEMANA).rename_axis("dia_semana"))
+
+
+def usuarios_mas_activos(limite=10):
+    """
+    DataFrame con los 'limite' usuarios con más operaciones (todos si es None):
+    id, nombre, cantidad, suma y fechas de su primera y última operación.
+    """
+    return pd.DataFrame(
+        obtener_analitica_por_usuario(limite=limite),
+        columns=["usuario_id", "nombre", "cantidad", "suma", "primera", "ultima"]
+    )
+
+
+def resumen():
+    """
+    Cifras generales: total de operaciones, suma y media de los resultados, mínimo y
+    máximo, usuarios activos, periodo cubierto, media de operaciones por día activo,
+    operador más usado y usuario más activo. None si no hay operaciones resumidas.
+    """
+    df = _por_hora()
+    if df.empty:
+        return None
+    usuarios = usuarios_mas_activos(limite=None)
+    operadores = df.groupby("operador")["cantidad"].sum()
+    cantidad = int(df["cantidad"].sum())
+    suma = float(df["suma"].sum())
+    dias = df["hora"].dt.date
+    return {
+        "cantidad": cantidad,
+        "suma": suma,
+        "media": suma / cantidad,
+        "minimo": float(df["minimo"].min()),
+        "maximo": float(df["maximo"].max()),
+        "usuarios": len(usuarios),
+        "desde": df["hora"].min(),
+        "hasta": df["hora"].max(),
+        "media_por_dia": cantidad / dias.nunique(),
+        "operador_mas_usado": operadores.idxmax(),
+        "usuario_mas_activo": usuarios["nombre"].iloc[0] if not usuarios.empty else None,
+    }
+
+
+def mostrar_analitica(actualizar_antes=True):
+    """
+    Imprime el resumen general, la frecuencia de operadores, el volumen de los
+    últimos días, la actividad por hora del día y los usuarios más activos.
+    Con 'actualizar_antes' incorpora primero las operaciones nuevas (solo las
+    posteriores a la marca de agua, así que es rápido).
+    """
+    if actualizar_antes:
+        actualizar()
+    datos = resumen()
+    if datos is None:
+        print("No hay operaciones registradas.")
+        return
+
+    estado = estado_analitica()
+    print(f"\nAnalítica de uso (actualizada {estado['actualizado_en']:%Y-%m-%d %H:%M:%S}, "
+          f"hasta la operación {estado['ultimo_id']}; pendientes: {estado['pendientes']})")
+    print(f"Operaciones: {datos['cantidad']} de {datos['usuarios']} usuarios, "
+          f"entre {datos['desde']:%Y-%m-%d} y {datos['hasta']:%Y-%m-%d} "
+          f"({datos['media_por_dia']:.1f} por día con actividad)")
+    print(f"Resultados: suma {format_numero(datos['suma'])}, media {format_numero(datos['media'])}, "
+          f"mínimo {format_numero(datos['minimo'])}, máximo {format_numero(datos['maximo'])}")
+    print(f"Operador más usado: '{datos['operador_mas_usado']}' | "
+          f"usuario más activo: {datos['usuario_mas_activo']}")
+
+    operadores = frecuencia_operadores()
+    operadores["porcentaje"] = operadores["porcentaje"].round(2)
+    for columna in ("suma", "minimo", "maximo"):
+        operadores[columna] = format_numeros(operadores[columna])
+    print(f"\nFrecuencia de operadores:\n{operadores.to_string()}")
+
+    dias = volumen_por_dia().tail(14).copy()
+    for columna in ("suma", "minimo", "maximo"):
+        dias[columna] = format_numeros(dias[columna])
+    print(f"\nVolumen de los últimos días:\n{dias.to_string()}")
+
+    horas = actividad_por_hora_del_dia()
+    print("\nOperaciones por hora del día:")
+    for inicio in (0, 12):
+        print("  ".join(f"{h:02d}h: {c}" for h, c in horas.iloc[inicio:inicio + 12].items()))
+
+    usuarios = usuarios_mas_activos()
+    usuarios["suma"] = format_numeros(usuarios["suma"])
+    print(f"\nUsuarios más activos:\n{usuarios.to_string(index=False)}")
@@ -0,0 +1,155 @@
+# calculadora/batch_app.py
+
+"""
+Modo por lotes (no interactivo) de la calculadora.
+
+Lee operaciones de un fichero CSV o JSON Lines (o de la entrada estándar) con las
+columnas de operaciones.csv (operando1, operador, operando2; el resto se ignoran),
+las evalúa por bloques con NumPy, guarda cada bloque con un único INSERT multi-fila
+y escribe los resultados en CSV por la salida estándar a medida que avanza.
+
+Uso:
+    python main.py lote --usuario admin --entrada operaciones.csv > resultados.csv
+    cat operaciones.jsonl | python main.py lote --usuario admin --formato jsonl
+"""
+
+import getpass
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculadora.core.evaluacion_lote import MENSAJES_ERROR, ERROR_NINGUNO
+from calculadora.db.backends import cerrar_backend
+from calculadora.db.models import crear_tablas
+from calculadora.services.operation_service import realizar_operaciones_lote
+from calculadora.services.user_service import autenticar_usuario
+
+# Operaciones que se evalúan y guardan juntas
+TAMANO_BLOQUE = 10000
+
+COLUMNAS_ENTRADA = ("operando1", "operador", "operando2")
+COLUMNAS_SALIDA = ["operando1", "operador", "operando2", "resultado", "error"]
+
+
+def _detectar_formato(entrada, formato):
+    if formato != "auto":
+        return formato
+    if entrada != "-" and os.path.splitext(entrada)[1].lower() in (".jsonl", ".json", ".ndjson"):
+        return "jsonl"
+    return "csv"
+
+
+def leer_bloques(entrada="-", formato="auto", tamano_bloque=TAMANO_BLOQUE):
+    """
+    Lee las operaciones por bloques de 'tamano_bloque' filas.
+
+    Args:
+        entrada: Ruta del fichero o '-' para la entrada estándar
+        formato: 'csv', 'jsonl' o 'auto' (según la extensión; la entrada estándar se lee como CSV)
+
+    Yields:
+        DataFrames con las columnas operando1 y operando2 (float64, NaN si no son
+        numéricos) y operador (texto)
+    """
+    origen = sys.stdin if entrada == "-" else entrada
+    if _detectar_formato(entrada, formato) == "jsonl":
+        lector = pd.read_json(origen, lines=True, chunksize=tamano_bloque, dtype=False)
+    else:
+        lector = pd.read_csv(
+            origen,
+            chunksize=tamano_bloque,
+            usecols=lambda columna: columna in COLUMNAS_ENTRADA,
+            dtype={"operador": str},
+            skipinitialspace=True,
+        )
+
+    for bloque in lector:
+        faltan = [c for c in ("operando1", "operador") if c not in bloque.columns]
+        if faltan:
+            raise ValueError(f"Faltan columnas en la entrada: {', '.join(faltan)}")
+        if "operando2" not in bloque.columns:
+            bloque["operando2"] = np.nan
+
+        operador = bloque["operador"].astype(str).str.strip()
+        operando1 = pd.to_numeric(bloque["operando1"], errors="coerce")
+        operando2 = pd.to_numeric(bloque["operando2"], errors="coerce")
+        # sqrt no usa el segundo operando (puede venir vacío)
+        operando2 = operando2.mask(operador == "sqrt", 0.0)
+
+        yield pd.DataFrame({
+            "operando1": operando1.to_numpy(dtype=np.float64),
+            "operador": operador.to_numpy(),
+            "operando2": operando2.to_numpy(dtype=np.float64),
+        })
+
+
+def procesar_bloques(usuario_id, bloques, salida=sys.stdout, guardar=True):
+    """
+    Evalúa y guarda cada bloque y escribe sus resultados en CSV por 'salida'.
+
+    Returns:
+        Diccionario con 'operaciones', 'errores' y 'segundos'
+    """
+    inicio = time.perf_counter()
+    total = errores = 0
+    mensajes = np.array([""] + [MENSAJES_ERROR[c] for c in sorted(MENSAJES_ERROR)], dtype=object)
+
+    for bloque in bloques:
+        resultado = realizar_operaciones_lote(
+            usuario_id,
+            bloque["operando1"].to_numpy(),
+            bloque["operador"].to_numpy(),
+            bloque["operando2"].to_numpy(),
+            guardar=guardar
+        )
+        bloque["resultado"] = resultado.resultados
+        bloque["error"] = mensajes[resultado.errores]
+        bloque.to_csv(salida, columns=COLUMNAS_SALIDA, header=total == 0, index=False)
+
+        total += len(bloque)
+        errores += int(np.count_nonzero(resultado.errores != ERROR_NINGUNO))
+
+    salida.flush()
+    return {"operaciones": total, "errores": errores, "segundos": time.perf_counter() - inicio}
+
+
+def ejecutar_lote(usuario, password=None, entrada="-", formato="auto",
+                  tamano_bloque=TAMANO_BLOQUE, guardar=True, salida=sys.stdout):
+    """
+    Autentica una sola vez al usuario y procesa todas las operaciones de 'entrada'.
+    El resumen y los errores se escriben por la salida de error para no mezclarse
+    con los resultados.
+
+    Returns:
+        Código de salida del proceso (0 si todo fue bien)
+    """
+    if password is None:
+        password = os.getenv("CALCULADORA_PASSWORD") or getpass.getpass("Contraseña: ")
+
+    try:
+        crear_tablas()
+        usuario_id, _ = autenticar_usuario(usuario, password)
+        if usuario_id is None:
+            print("Usuario o contraseña incorrectos.", file=sys.stderr)
+            return 1
+
+        resumen = procesar_bloques(
+            usuario_id, leer_bloques(entrada, formato, tamano_bloque), salida, guardar
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        cerrar_backend()
+
+    segundos = resumen["segundos"]
+    velocidad = resumen["operaciones"] / segundos if segundos > 0 else 0
+    print(
+        f"{resumen['operaciones']} operaciones ({resumen['errores']} con error) "
+        f"en {segundos:.2f} s ({velocidad:,.0f} op/s).",
+        file=sys.stderr
+    )
+    return 0
@@ -16,21 +16,39 @@ from calculadora.services.user_service import (
     verificar_password,
     hashear_password  # Añadido
 )
-from calculadora.services.operation_service import realizar_operacion
+from calculadora.services.operation_service import (
+    realizar_operacion,
+    realizar_expresion,
+    describir_expresion,
+    estadisticas_de_numeros,
+    estadisticas_historial,
+    realizar_operacion_matricial
+)
+from calculadora.core.matrices import OPERADORES_UNARIOS, formatear_matriz, leer_matriz
+from calculadora.core.operators import operadores_matriciales
+from calculadora.core.estadisticas import PERCENTILES, leer_numeros
+from calculadora.core.expresiones import compilar
 from calculadora.core.export_utils import export_to_csv, export_to_excel
 from calculadora.db.models import (
     crear_tablas,
-    obtener_todas_las_operaciones_unidas,
+    iterar_todas_las_operaciones_unidas,
     obtener_usuario_por_nombre,
-    obtener_operaciones,
+    iterar_operaciones,
+    hay_operaciones,
     obtener_todos_usuarios,
-    get_connection,
+    obtener_usuario_por_id,
     insertar_usuario,
-    guardar_en_historial,    # Añadido
     obtener_historial,       # Añadido
-    limpiar_historial_antiguo # Añadido
+    limpiar_historial_antiguo, # Añadido
+    mantener_historial,
+    FORMATO_DICTS,
+    FORMATO_DATAFRAME
 )
 from calculadora.consultas import Consultas
+from calculadora.analytics import actualizar as actualizar_analitica, mostrar_analitica
+from calculadora.db.connection import cerrar_pool
+from calculadora.db.backends import cerrar_backend, obtener_backend
+from calculadora.db.escritura_diferida import encolar_historial, vaciar_escrituras
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -59,14 +77,17 @@ def registrar_en_historial(user_id, descripcion):
         historial_memoria[user_id] = []
     historial_memoria[user_id].append((ahora, descripcion))
     
-    # Guardar en la base de datos para persistencia
-    guardar_en_historial(user_id, ahora, descripcion)
+    # Guardar en la base de datos para persistencia (escritura diferida en lote)
+    encolar_historial(user_id, ahora, descripcion)
 
 def mostrar_historial_en_memoria(user_id, mostrar_todos=False):
     """
     Muestra las operaciones de las últimas 24h para el usuario seleccionado.
     Carga los datos desde la base de datos.
     """
+    # Asegurar que el historial pendiente de escribir esté en la BD
+    vaciar_escrituras()
+
     if mostrar_todos and is_superuser:
         # Obtener historial de todos los usuarios desde la BD
         historial_db = obtener_historial(usuario_id=None)
@@ -205,10 +226,11 @@ def opcion_nueva_operacion():
     # Usamos directamente el usuario actual (ya autenticado)
     usuario_id = current_user_id
 
-    print("\nOperadores disponibles: +, -, *, /, ^, sqrt")
+    print("\nOperadores disponibles: +, -, *, /, ^, sqrt, expr (expresión completa), "
+          "stats (estadísticas), mat (vectores y matrices)")
     
     # Validación de operador: solo aceptar operadores válidos
-    operadores_validos = ['+', '-', '*', '/', '^', 'sqrt']
+    operadores_validos = ['+', '-', '*', '/', '^', 'sqrt', 'expr', 'stats', 'mat']
     while True:
         operador = input("Operador: ").strip()
         if operador in operadores_validos:
@@ -216,6 +238,13 @@ def opcion_nueva_operacion():
         else:
             print(f"Error: Operador inválido. Use uno de estos: {', '.join(operadores_validos)}")
 
+    if operador == 'expr':
+        return opcion_expresion(usuario_id)
+    if operador == 'stats':
+        return opcion_estadisticas(usuario_id)
+    if operador == 'mat':
+        return opcion_matricial(usuario_id)
+
     if operador == 'sqrt':
         op1 = leer_flotante("Ingrese el operando (base de la raíz): ")
         op2 = 0
@@ -229,7 +258,7 @@ def opcion_nueva_operacion():
         print(f"\nResultado: {format_numero(resultado)}")
 
         # Guardamos en MEMORIA y BD para historial
-        descripcion_op = f"{op1} {operador} {op2} = {resultado}"
+        descripcion_op = f"{format_numero(op1)} {operador} {format_numero(op2)} = {format_numero(resultado)}"
         registrar_en_historial(usuario_id, descripcion_op)
 
         # Preguntamos si desea continuar
@@ -249,10 +278,131 @@ def opcion_nueva_operacion():
 
     input("\nPresione Enter para continuar...")
 
+def opcion_expresion(usuario_id):
+    """
+    Solicita una expresión completa (p. ej. '2 * (x + 1) ^ 2 - sqrt y'), pide el valor
+    de sus variables, la evalúa y la registra como una sola operación.
+    """
+    print("\nUse +, -, *, /, ^, sqrt, paréntesis y variables (p. ej. 2 * (x + 1) ^ 2 - sqrt y)")
+    try:
+        expresion = compilar(input("Expresión: "))
+        variables = {
+            nombre: leer_flotante(f"Valor de {nombre}: ")
+            for nombre in expresion.variables
+        }
+        resultado = realizar_expresion(usuario_id, expresion.fuente, variables)
+        print(f"\nResultado: {format_numero(resultado)}")
+
+        descripcion_op = f"{describir_expresion(expresion, variables)} = {resultado}"
+        registrar_en_historial(usuario_id, descripcion_op)
+
+        while True:
+            continuar = input("\n¿Desea realizar otra operación? (s/n): ").lower()
+            if continuar == 's':
+                return opcion_nueva_operacion()
+            elif continuar == 'n':
+                return
+            else:
+                print("Por favor, ingrese 's' para continuar o 'n' para salir.")
+
+    except ZeroDivisionError as zde:
+        print(f"\nError: {zde}")
+    except ValueError as ve:
+        print(f"\nError: {ve}")
+
+    input("\nPresione Enter para continuar...")
+
+def opcion_matricial(usuario_id):
+    """
+    Solicita un operador matricial y sus operandos (vectores o matrices), la evalúa
+    con NumPy y la registra.
+    """
+    print(f"\nOperadores matriciales: {', '.join(operadores_matriciales)}")
+    print("Filas separadas por ';' y elementos por espacios (p. ej. 1 2; 3 4)")
+    operador = input("Operador: ").strip()
+    if operador not in operadores_matriciales:
+        print("Error: Operador matricial inválido.")
+        input("\nPresione Enter para continuar...")
+        return
+
+    try:
+        a = leer_matriz(input("Primer operando: "))
+        b = None if operador in OPERADORES_UNARIOS else leer_matriz(input("Segundo operando: "))
+        resultado = realizar_operacion_matricial(usuario_id, a, operador, b)
+        print(f"\nResultado: {formatear_matriz(resultado, format_numero)}")
+
+        operandos = formatear_matriz(a) if b is None else f"{formatear_matriz(a)} {formatear_matriz(b)}"
+        registrar_en_historial(usuario_id, f"{operador} {operandos} = {formatear_matriz(resultado)}")
+
+        while True:
+            continuar = input("\n¿Desea realizar otra operación? (s/n): ").lower()
+            if continuar == 's':
+                return opcion_nueva_operacion()
+            elif continuar == 'n':
+                return
+            else:
+                print("Por favor, ingrese 's' para continuar o 'n' para salir.")
+
+    except ZeroDivisionError as zde:
+        print(f"\nError: {zde}")
+    except ValueError as ve:
+        print(f"\nError: {ve}")
+
+    input("\nPresione Enter para continuar...")
+
+def mostrar_estadisticas(estadisticas):
+    """Imprime el diccionario de resumen_estadistico / estadisticas_resultados."""
+    print(f"\nCantidad:   {estadisticas['cantidad']}")
+    print(f"Suma:       {format_numero(estadisticas['suma'])}")
+    print(f"Media:      {format_numero(estadisticas['media'])}")
+    print(f"Mediana:    {format_numero(estadisticas['mediana'])}")
+    desviacion = estadisticas['desviacion']
+    print(f"Desviación: {format_numero(desviacion) if desviacion is not None else '-'}")
+    print(f"Mínimo:     {format_numero(estadisticas['minimo'])}")
+    print(f"Máximo:     {format_numero(estadisticas['maximo'])}")
+    for percentil, valor in estadisticas['percentiles'].items():
+        print(f"P{format_numero(percentil):<10}{format_numero(valor)}")
+
+def opcion_estadisticas(usuario_id):
+    """
+    Calcula media, mediana, desviación típica, percentiles, suma, mínimo y máximo
+    sobre los resultados guardados del usuario o sobre una lista de números.
+    """
+    print("\n1. Sobre los resultados de mi historial")
+    print("2. Sobre una lista de números")
+    origen = input("Seleccione una opción: ").strip()
+
+    try:
+        texto = input(f"Percentiles (Enter para {' '.join(map(str, PERCENTILES))}): ").strip()
+        percentiles = leer_numeros(texto) if texto else PERCENTILES
+
+        if origen == '1':
+            operador = input("Operador a incluir (Enter para todos): ").strip() or None
+            estadisticas = estadisticas_historial(usuario_id, operador, percentiles)
+            descripcion = f"stats historial{f' ({operador})' if operador else ''}"
+        elif origen == '2':
+            estadisticas = estadisticas_de_numeros(input("Números (separados por espacios o comas): "), percentiles)
+            descripcion = f"stats de {estadisticas['cantidad']} números"
+        else:
+            print("Opción no válida.")
+            input("\nPresione Enter para continuar...")
+            return
+
+        mostrar_estadisticas(estadisticas)
+        registrar_en_historial(
+            usuario_id, f"{descripcion}: media {estadisticas['media']}, mediana {estadisticas['mediana']}"
+        )
+    except ValueError as ve:
+        print(f"\nError: {ve}")
+
+    input("\nPresione Enter para continuar...")
+
 def opcion_consultas():
     """
     Despliega un menú de consultas (DB) adaptado según el tipo de usuario.
     """
+    # Las consultas deben incluir las operaciones aún pendientes de escribir
+    vaciar_escrituras()
     consultas = Consultas()
 
     while True:
@@ -265,12 +415,14 @@ def opcion_consultas():
             print("2. Ver Todos los Usuarios Registrados")
             print("3. Operaciones por Operador")
             print("4. Mostrar Mis Operaciones")
-            print("5. Volver al Menú Principal")
+            print("5. Resumen por Usuario y Operador")
+            print("6. Volver al Menú Principal")
         else:
             # Menú para usuario normal
             print("1. Mis Operaciones")
             print("2. Mis Operaciones por Operador")
-            print("3. Volver al Menú Principal")
+            print("3. Mi Resumen por Operador")
+            print("4. Volver al Menú Principal")
 
         opcion = input("Seleccione una opción: ")
         
@@ -281,13 +433,13 @@ def opcion_consultas():
                 try:
                     user_id = int(entrada)
                     limpiar_pantalla()
-                    consultas.operaciones_por_usuario(user_id)
+                    consultas.operaciones_por_usuario(user_id).mostrar()
                 except ValueError:
                     usuario = obtener_usuario_por_nombre(entrada)
                     if usuario:
                         user_id = usuario[0]
                         limpiar_pantalla()
-                        consultas.operaciones_por_usuario(user_id)
+                        consultas.operaciones_por_usuario(user_id).mostrar()
                     else:
                         print(f"No existe un usuario con el nombre '{entrada}'.")
                 input("\nPresione Enter para continuar...")
@@ -301,15 +453,20 @@ def opcion_consultas():
                 limpiar_pantalla()
                 print("Operadores disponibles: +, -, *, /, ^, sqrt")
                 op_seleccionado = input("Seleccione un operador: ").strip()
-                consultas.operaciones_por_operador(op_seleccionado)
+                consultas.operaciones_por_operador(op_seleccionado).mostrar()
                 input("\nPresione Enter para continuar...")
             
             elif opcion == '4':
                 limpiar_pantalla()
-                consultas.operaciones_por_usuario(current_user_id)
+                consultas.operaciones_por_usuario(current_user_id).mostrar()
                 input("\nPresione Enter para continuar...")
-                
+
             elif opcion == '5':
+                limpiar_pantalla()
+                consultas.resumen_por_operador()
+                input("\nPresione Enter para continuar...")
+                
+            elif opcion == '6':
                 break
             else:
                 print("Opción no válida.")
@@ -319,17 +476,22 @@ def opcion_consultas():
         else:
             if opcion == '1':
                 limpiar_pantalla()
-                consultas.operaciones_por_usuario(current_user_id)
+                consultas.operaciones_por_usuario(current_user_id).mostrar()
                 input("\nPresione Enter para continuar...")
             
             elif opcion == '2':
                 limpiar_pantalla()
                 print("Operadores disponibles: +, -, *, /, ^, sqrt")
                 op_seleccionado = input("Seleccione un operador: ").strip()
-                consultas.operaciones_por_usuario_y_operador(current_user_id, op_seleccionado)
+                consultas.operaciones_por_usuario_y_operador(current_user_id, op_seleccionado).mostrar()
                 input("\nPresione Enter para continuar...")
-                
+
             elif opcion == '3':
+                limpiar_pantalla()
+                consultas.resumen_por_operador(current_user_id)
+                input("\nPresione Enter para continuar...")
+                
+            elif opcion == '4':
                 break
             else:
                 print("Opción no válida.")
@@ -365,6 +527,7 @@ def opcion_exportar():
     """
     Permite exportar las operaciones a CSV, Excel o formato pickle (PKL) según el tipo de usuario.
     """
+    vaciar_escrituras()
     limpiar_pantalla()
     
     if is_superuser:
@@ -374,22 +537,29 @@ def opcion_exportar():
         opcion = input("Seleccione una opción: ")
         
         if opcion == '1':
-            data = obtener_operaciones(usuario_id=current_user_id)
+            usuario_filtro = current_user_id
         elif opcion == '2':
-            data = obtener_todas_las_operaciones_unidas()
+            usuario_filtro = None
         else:
             print("Opción no válida.")
             input("\nPresione Enter para continuar...")
             return
     else:
         # Usuario normal solo exporta sus propias operaciones
-        data = obtener_operaciones(usuario_id=current_user_id)
+        usuario_filtro = current_user_id
     
-    if not data:
+    if not hay_operaciones(usuario_id=usuario_filtro):
         print("No hay operaciones registradas para exportar.")
         input("\nPresione Enter para continuar...")
         return
 
+    # Los datos se leen en streaming (por lotes) al exportar, sin cargarlos completos en memoria.
+    # CSV y Excel reciben cada lote como DataFrame con columnas float64/datetime64.
+    def obtener_lotes(formato=FORMATO_DICTS):
+        if usuario_filtro is None:
+            return iterar_todas_las_operaciones_unidas(por_lotes=True, formato=formato)
+        return iterar_operaciones(usuario_id=usuario_filtro, por_lotes=True, formato=formato)
+
     print("¿En qué formato desea exportar?")
     print("1. CSV")
     print("2. Excel")
@@ -400,17 +570,17 @@ def opcion_exportar():
         nombre_archivo = input("Ingrese nombre del archivo (o Enter para 'operaciones.csv'): ") or "operaciones.csv"
         if not nombre_archivo.endswith('.csv'):
             nombre_archivo += '.csv'
-        export_to_csv(data, nombre_archivo)
+        export_to_csv(obtener_lotes(FORMATO_DATAFRAME), nombre_archivo)
     elif eleccion == '2':
         nombre_archivo = input("Ingrese nombre del archivo (o Enter para 'operaciones.xlsx'): ") or "operaciones.xlsx"
         if not nombre_archivo.endswith('.xlsx'):
             nombre_archivo += '.xlsx'
-        export_to_excel(data, nombre_archivo)
+        export_to_excel(obtener_lotes(FORMATO_DATAFRAME), nombre_archivo)
     elif eleccion == '3':
         nombre_archivo = input("Ingrese nombre del archivo (o Enter para 'operaciones.pkl'): ") or "operaciones.pkl"
         if not nombre_archivo.endswith('.pkl'):
             nombre_archivo += '.pkl'
-        export_to_binary(data, nombre_archivo)
+        export_to_binary(obtener_lotes(), nombre_archivo)
     else:
         print("Opción no válida.")
 
@@ -478,14 +648,7 @@ def obtener_usuario_por_nombre_y_id(user_id):
     """
     Obtiene información de un usuario por su ID.
     """
-    conn = get_connection()
-    usuario = None
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id, nombre, password, es_superusuario FROM usuarios WHERE id = %s;", (user_id,))
-            usuario = cur.fetchone()
-    conn.close()
-    return usuario
+    return obtener_usuario_por_id(user_id)
 
 def opcion_chatbot_sql():
     """
@@ -512,6 +675,12 @@ def opcion_chatbot_sql():
         print("Contraseña incorrecta. Acceso denegado.")
         input("\nPresione Enter para continuar...")
         return
+
+    # El chatbot lee el esquema y ejecuta SQL directamente contra el pool de PostgreSQL
+    if not obtener_backend().usa_models:
+        print("El chatbot SQL solo está disponible con PostgreSQL (CALCULADORA_BACKEND=postgres).")
+        input("\nPresione Enter para continuar...")
+        return
         
     try:
         from calculadora.sql_chatbot import SQLChatbot
@@ -548,9 +717,11 @@ def opcion_chatbot_sql():
     print("- !sql [consulta]: Muestra el SQL generado para una consulta sin ejecutarla")
     print("- !salir: Volver al menú principal")
     
-    # Inicializar chatbot con conexión a BD
-    conn = get_connection()
-    chatbot = SQLChatbot(conn)
+    # El chatbot consulta la BD directamente: volcamos lo pendiente
+    vaciar_escrituras()
+
+    # Inicializar chatbot (toma conexiones del pool solo mientras ejecuta cada consulta)
+    chatbot = SQLChatbot()
     
     # Establecer nivel técnico avanzado para superusuario
     chatbot.set_tech_level("avanzado")
@@ -679,7 +850,6 @@ def opcion_chatbot_sql():
                     print(f"\nError al procesar la consulta: {str(e)}")
                     print("Por favor, intente reformular su consulta.")
     
-    conn.close()
     input("\nPresione Enter para continuar...")
 
 def opcion_backup():
@@ -692,6 +862,7 @@ def opcion_backup():
         input("\nPresione Enter para continuar...")
         return
     
+    vaciar_escrituras()
     print("=== Backup de Datos ===")
     print("1. Backup de mi historial")
     print("2. Backup de todos los usuarios")
@@ -700,8 +871,8 @@ def opcion_backup():
     opcion = input("Seleccione una opción: ")
     
     if opcion == '1':
-        # Obtener datos del usuario actual
-        operaciones = obtener_operaciones(usuario_id=current_user_id)
+        # Obtener datos del usuario actual (las operaciones se leen en streaming)
+        operaciones = iterar_operaciones(usuario_id=current_user_id, por_lotes=True)
         historial = obtener_historial(usuario_id=current_user_id)
         
         datos = {
@@ -717,8 +888,8 @@ def opcion_backup():
             print("Error al crear el backup.")
             
     elif opcion == '2':
-        # Obtener datos de todos los usuarios
-        operaciones = obtener_todas_las_operaciones_unidas()
+        # Obtener datos de todos los usuarios (las operaciones se leen en streaming)
+        operaciones = iterar_todas_las_operaciones_unidas(por_lotes=True)
         usuarios = obtener_todos_usuarios()
         historial = obtener_historial()
         
@@ -741,6 +912,37 @@ def opcion_backup():
     
     input("\nPresione Enter para continuar...")
 
+def opcion_analitica():
+    """
+    Muestra al superusuario la analítica de uso a partir de los resúmenes
+    incrementales (ver calculadora/analytics.py), sin recorrer las operaciones.
+    """
+    limpiar_pantalla()
+    if not is_superuser:
+        print("Esta función es exclusiva para superusuarios.")
+        input("\nPresione Enter para continuar...")
+        return
+
+    vaciar_escrituras()
+    print("=== Analítica de Uso ===")
+    print("1. Ver analítica")
+    print("2. Reconstruir los resúmenes desde cero")
+    print("3. Volver al Menú Principal")
+
+    opcion = input("Seleccione una opción: ")
+
+    if opcion == '1':
+        mostrar_analitica()
+    elif opcion == '2':
+        rango = actualizar_analitica(reconstruir=True)
+        print(f"Resúmenes reconstruidos hasta la operación {rango['hasta_id']}.")
+    elif opcion == '3':
+        return
+    else:
+        print("Opción no válida.")
+
+    input("\nPresione Enter para continuar...")
+
 def main_menu():
     """
     Punto de entrada para manejar el menú principal.
@@ -761,7 +963,8 @@ def main_menu():
             print("5. Crear Usuario")
             print("6. Chatbot SQL")  # Disponible solo para superusuario
             print("7. Backup de Datos")  # Nueva opción
-            print("8. Salir o Cambiar Sesión")  # Corregido de 7 a 8
+            print("8. Analítica de Uso")
+            print("9. Salir o Cambiar Sesión")
         else:
             # Usuarios normales no ven la opción de chatbot
             print("5. Salir o Cambiar Sesión")
@@ -782,7 +985,9 @@ def main_menu():
             opcion_chatbot_sql()
         elif opcion == '7' and is_superuser:  # Opción para Backup de Datos
             opcion_backup()
-        elif (opcion == '8' and is_superuser) or (opcion == '5' and not is_superuser):  # Corregido de 7 a 8
+        elif opcion == '8' and is_superuser:
+            opcion_analitica()
+        elif (opcion == '9' and is_superuser) or (opcion == '5' and not is_superuser):
             print("\n1. Salir de la aplicación")
             print("2. Cambiar de sesión")
             sub_opcion = input("Seleccione una opción: ")
@@ -792,6 +997,8 @@ def main_menu():
                 break
             elif sub_opcion == '2':
                 print("Cambiando de sesión...")
+                # Escribir lo pendiente de la sesión que se cierra
+                vaciar_escrituras()
                 # Reseteamos las variables de sesión
                 current_user_id = None
                 is_superuser = False
@@ -814,6 +1021,10 @@ def run_app():
     
     # Programar limpieza del historial en memoria cada 24 horas
     schedule.every(24).hours.do(limpiar_historial_memoria_completo)
+    # Crear con antelación las particiones diarias del historial
+    schedule.every(1).hours.do(mantener_historial)
+    # Incorporar cada hora las operaciones nuevas a los resúmenes analíticos
+    schedule.every(1).hours.do(actualizar_analitica)
 
     # 1) Autenticación
     current_user_id, is_superuser = menu_autenticacion()
@@ -830,5 +1041,10 @@ def run_app():
     # 3) Llamamos al main_menu principal, donde se usa el current_user_id
     main_menu()
 
+    # 4) Escribimos lo pendiente y cerramos las conexiones del pool antes de salir
+    vaciar_escrituras()
+    cerrar_backend()
+    cerrar_pool()
+
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
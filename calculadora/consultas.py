@@ -1,88 +1,302 @@
 # Modificaciones en consultas.py para añadir nuevas consultas
 
+import shutil
+
 import pandas as pd
-from calculadora.db.models import obtener_operaciones
-from calculadora.core.utils import format_numero
+from tabulate import tabulate
+from calculadora.db.models import (
+    consultar_operaciones,
+    registrar_observador_operaciones,
+    obtener_agregados_operaciones,
+    hay_operaciones,
+    COLUMNAS_CONSULTA,
+    FORMATO_DATAFRAME
+)
+from calculadora.core.cache_consultas import estadisticas_cache_consultas, obtener_cache_consultas
+from calculadora.core.utils import format_numero, format_numeros
 
-class Consultas:
-    def __init__(self):
-        pass
+# Líneas de la pantalla que no son filas de operaciones (título, cabecera de la tabla y aviso)
+_LINEAS_RESERVADAS = 8
 
-    def operaciones_por_usuario(self, usuario_id):
+def filas_por_pantalla():
+    """Filas de operaciones que caben en una pantalla del terminal (al menos 5)."""
+    return max(shutil.get_terminal_size().lines - _LINEAS_RESERVADAS, 5)
+
+def _invalidar_cache(pares):
+    """Observador de models: descarta los informes afectados por las operaciones escritas."""
+    cache = obtener_cache_consultas()
+    if cache is not None:
+        cache.invalidar(pares)
+
+registrar_observador_operaciones(_invalidar_cache)
+
+class ResultadoConsulta:
+    """
+    Operaciones de un informe de Consultas, leídas bajo demanda.
+
+    Crear el objeto no consulta nada: cada página se pide a consultar_operaciones
+    (con el cursor de la anterior) solo cuando se usa, y se formatea solo al
+    mostrarla, así que un historial grande nunca se carga entero. Las páginas
+    leídas pasan por la caché de informes. Se puede recorrer sin imprimir
+    (pagina, paginas, iteración por filas, totales) o mostrar con un paginador
+    de terminal (mostrar).
+    """
+    def __init__(self, consultas, titulo, usuario_id=None, operador=None, vacio=None):
+        """
+        Args:
+            consultas: Consultas que lo crea (tamaño de página y caché)
+            titulo: Título que imprime mostrar()
+            usuario_id, operador: Filtros de las operaciones (None = todos)
+            vacio: Mensaje de mostrar() si no hay operaciones (o función que lo retorna)
+        """
+        self._consultas = consultas
+        self.titulo = titulo
+        self.usuario_id = usuario_id
+        self.operador = operador
+        self._vacio = vacio
+        self.tamano_pagina = consultas.tamano_pagina
+        # Las columnas fijadas por los filtros no se leen
+        self.columnas = [
+            c for c in COLUMNAS_CONSULTA
+            if not (c == 'usuario_id' and usuario_id is not None)
+            and not (c == 'operador' and operador is not None)
+            and not (c == 'expresion' and operador not in (None, 'expr'))
+        ]
+        self._cursores = [None]  # cursor de cada página conocida (la primera no lo necesita)
+        self._completo = False   # True cuando se ha leído la última página
+        self._totales = None
+
+    def _anotar(self, numero, siguiente_cursor):
+        """Anota el cursor de la página que sigue a 'numero' (o que 'numero' es la última)."""
+        if siguiente_cursor is None:
+            self._completo = True
+        elif len(self._cursores) == numero + 1:
+            self._cursores.append(siguiente_cursor)
+
+    def _cursor(self, numero):
         """
-        Muestra las operaciones registradas para un usuario (por ID).
+        Cursor de la página 'numero'. Para conocerlo hay que haber leído la anterior,
+        así que las que falten se leen antes. Lanza IndexError si la página no existe;
+        si ya se sabe por los totales, sin leer las intermedias.
         """
-        data = obtener_operaciones(usuario_id=usuario_id)
-        if not data:
-            print(f"No hay operaciones registradas para el usuario con ID {usuario_id}.")
-            return
+        if numero < 0:
+            raise IndexError("El número de página no puede ser negativo.")
+        if numero >= len(self._cursores) and numero * self.tamano_pagina >= self.totales["cantidad"]:
+            raise IndexError(f"No existe la página {numero}.")
+        while len(self._cursores) <= numero and not self._completo:
+            self._leer(len(self._cursores) - 1)
+        if numero >= len(self._cursores):
+            raise IndexError(f"No existe la página {numero}.")
+        return self._cursores[numero]
 
-        df = pd.DataFrame(data)
+    def _leer(self, numero):
+        """Lee la página 'numero', cuyo cursor ya se conoce, y anota el de la siguiente."""
+        cursor = self._cursores[numero]
+        df, siguiente_cursor, totales = self._consultas._desde_cache(
+            ("pagina", self.usuario_id, self.operador, cursor),
+            lambda: self._consultas._pagina(self.usuario_id, self.operador, self.columnas, cursor),
+            self.usuario_id, self.operador
+        )
+        if totales is not None:
+            self._totales = totales
+        self._anotar(numero, siguiente_cursor)
+        # Copia: la página guardada en la caché no se modifica
+        df = df.copy()
+        df.index += numero * self.tamano_pagina
+        return df
 
-        # Sumar antes de formatear
-        total = df['resultado'].sum()
+    def pagina(self, numero=0):
+        """
+        DataFrame con las operaciones de la página 'numero' (desde 0), con los valores
+        sin formatear. Lanza IndexError si no existe.
+        """
+        self._cursor(numero)
+        return self._leer(numero)
 
-        # Formatear columnas
-        df['operando1'] = df['operando1'].apply(format_numero)
-        df['operando2'] = df['operando2'].apply(format_numero)
-        df['resultado'] = df['resultado'].apply(format_numero)
+    def hay_siguiente(self, numero):
+        """True si hay una página después de la página 'numero' (ya leída)."""
+        return numero + 1 < len(self._cursores)
 
-        print("Operaciones para el usuario con ID", usuario_id)
-        print(df)
+    def paginas(self):
+        """Genera las páginas (DataFrames) de una en una, leyendo cada una al pedirla."""
+        numero = 0
+        while True:
+            yield self._leer(numero)
+            if not self.hay_siguiente(numero):
+                return
+            numero += 1
 
-        print(f"\nImporte total de operaciones: {format_numero(total)}")
+    def __iter__(self):
+        """Recorre las operaciones como diccionarios, página a página."""
+        for df in self.paginas():
+            yield from df.to_dict("records")
 
-    def operaciones_por_operador(self, operador):
+    @property
+    def totales(self):
+        """Cantidad, total, mínimo y máximo de todas las operaciones (se leen con la primera página)."""
+        if self._totales is None:
+            self._leer(0)
+        return self._totales
+
+    def __len__(self):
+        return self.totales["cantidad"]
+
+    def _tabla(self, numero):
+        """Formatea la página 'numero'. Retorna (texto, cursor de la siguiente página o None)."""
+        df = self.pagina(numero)
+        for columna in ('operando1', 'operando2', 'resultado'):
+            df[columna] = format_numeros(df[columna])
+        # Las operaciones que no son 'expr' no tienen expresión (saldría 'nan')
+        if 'expresion' in df.columns:
+            df = df.fillna({'expresion': ''})
+        # disable_numparse: los números ya vienen formateados como texto
+        texto = tabulate(df, headers="keys", tablefmt="simple", disable_numparse=True)
+        return texto, self._cursores[numero + 1] if self.hay_siguiente(numero) else None
+
+    def tabla(self, numero=0):
+        """
+        Texto de la página 'numero' con los números formateados, como tabla (tabulate).
+        El texto también se guarda en la caché de informes.
+        """
+        cursor = self._cursor(numero)
+        texto, siguiente_cursor = self._consultas._desde_cache(
+            ("tabla", self.usuario_id, self.operador, cursor, numero),
+            lambda: self._tabla(numero),
+            self.usuario_id, self.operador
+        )
+        self._anotar(numero, siguiente_cursor)
+        return texto
+
+    def mostrar(self, entrada=None):
+        """
+        Paginador de terminal: imprime el título y una página (una pantalla) cada
+        vez, de la operación más reciente a la más antigua. Enter pasa a la
+        siguiente, 'a' vuelve a la anterior y 'q' termina; al final imprime el
+        importe total, el mínimo y el máximo. Solo se leen y formatean las páginas
+        que se muestran.
+        'entrada' lee la respuesta del usuario (por defecto, input).
+        Retorna False (tras imprimir el mensaje de 'vacio') si no hay operaciones.
+        """
+        entrada = entrada or input
+        resumen = self.totales
+        if resumen["cantidad"] == 0:
+            if self._vacio is not None:
+                print(self._vacio() if callable(self._vacio) else self._vacio)
+            return False
+
+        print(self.titulo)
+        numero = 0
+        while True:
+            print(self.tabla(numero))
+            if not self.hay_siguiente(numero):
+                break
+            desde = numero * self.tamano_pagina + 1
+            hasta = desde + self.tamano_pagina - 1
+            respuesta = entrada(
+                f"\nOperaciones {desde}-{hasta} de {resumen['cantidad']}. "
+                "Enter: siguiente, 'a': anterior, 'q': terminar: "
+            ).strip().lower()
+            if respuesta == 'q':
+                break
+            numero = max(numero - 1, 0) if respuesta == 'a' else numero + 1
+
+        print(f"\nImporte total de operaciones: {format_numero(resumen['total'])}")
+        print(f"Resultado mínimo: {format_numero(resumen['minimo'])} | máximo: {format_numero(resumen['maximo'])}")
+        return True
+
+class Consultas:
+    def __init__(self, tamano_pagina=None):
+        """
+        Args:
+            tamano_pagina: Operaciones por página (por defecto, las que caben en una pantalla)
         """
-        Muestra las operaciones que utilizan el 'operador' especificado.
+        self.tamano_pagina = tamano_pagina or filas_por_pantalla()
+
+    def _desde_cache(self, clave, funcion, usuario_id=None, operador=None):
         """
-        data = obtener_operaciones(operador=operador)
-        if not data:
-            print(f"No hay operaciones registradas con el operador: {operador}")
-            return
+        Resultado de funcion() a través de la caché de informes, que lo invalida
+        cuando se escriben operaciones de (usuario_id, operador).
+        """
+        cache = obtener_cache_consultas()
+        if cache is None:
+            return funcion()
+        return cache.calcular(("consultas", self.tamano_pagina) + clave, funcion, usuario_id, operador)
+
+    def _pagina(self, usuario_id, operador, columnas, cursor):
+        """
+        Lee una página de operaciones. Retorna una tupla (DataFrame, siguiente_cursor,
+        totales); la página y los totales se piden en una sola consulta, y los
+        totales solo con la primera página.
+        """
+        pagina = consultar_operaciones(
+            usuario_id=usuario_id,
+            operador=operador,
+            columnas=columnas,
+            tamano_pagina=self.tamano_pagina,
+            cursor=cursor,
+            con_totales=cursor is None,
+            formato=FORMATO_DATAFRAME
+        )
+        return pagina["operaciones"], pagina["siguiente_cursor"], pagina["totales"]
+
+    def _resumen_por_operador(self, usuario_id):
+        """Texto del informe de resumen_por_operador."""
+        agregados = obtener_agregados_operaciones(usuario_id=usuario_id)
+        if not agregados:
+            return "No hay operaciones registradas."
 
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(agregados)
+        # El total sale de los mismos grupos, sin otra consulta
+        cantidad, total = int(df['cantidad'].sum()), float(df['suma'].sum())
+        for columna in ('suma', 'minimo', 'maximo'):
+            df[columna] = format_numeros(df[columna])
+        if usuario_id is not None:
+            df = df.drop(columns='usuario_id')
+        return (f"Resumen por operador:\n{df.to_string(index=False)}\n"
+                f"\nTotal: {cantidad} operaciones, importe {format_numero(total)}")
 
-        # Sumar antes de formatear
-        total = df['resultado'].sum()
+    def resumen_por_operador(self, usuario_id=None):
+        """
+        Muestra cantidad, importe total, mínimo y máximo por usuario y operador
+        (solo del usuario indicado, si se indica). Se lee de los agregados, sin
+        recorrer las operaciones.
+        """
+        print(self._desde_cache(("resumen_por_operador", usuario_id),
+                                lambda: self._resumen_por_operador(usuario_id), usuario_id))
 
-        # Formatear columnas
-        df['operando1'] = df['operando1'].apply(format_numero)
-        df['operando2'] = df['operando2'].apply(format_numero)
-        df['resultado'] = df['resultado'].apply(format_numero)
+    def estadisticas_cache(self):
+        """Aciertos, fallos, invalidaciones y memoria de la caché de informes ({} si está desactivada)."""
+        return estadisticas_cache_consultas()
 
-        print(f"\nOperaciones con el operador '{operador}':")
-        print(df)
+    def operaciones_por_usuario(self, usuario_id):
+        """
+        Operaciones registradas para un usuario (por ID), como ResultadoConsulta
+        (no se lee nada hasta usarlo; mostrar() las imprime página a página).
+        """
+        return ResultadoConsulta(
+            self, f"Operaciones para el usuario con ID {usuario_id}", usuario_id=usuario_id,
+            vacio=f"No hay operaciones registradas para el usuario con ID {usuario_id}."
+        )
+
+    def operaciones_por_operador(self, operador):
+        """
+        Operaciones que utilizan el 'operador' especificado, como ResultadoConsulta.
+        """
+        return ResultadoConsulta(
+            self, f"\nOperaciones con el operador '{operador}':", operador=operador,
+            vacio=f"No hay operaciones registradas con el operador: {operador}"
+        )
 
-        print(f"\nImporte total de operaciones: {format_numero(total)}")
-        
     def operaciones_por_usuario_y_operador(self, usuario_id, operador):
         """
-        Muestra las operaciones de un usuario específico con un operador específico.
-        """
-        # Obtenemos todas las operaciones del usuario
-        data = obtener_operaciones(usuario_id=usuario_id)
-        if not data:
-            print(f"No hay operaciones registradas para el usuario con ID {usuario_id}.")
-            return
-            
-        # Filtramos por operador
-        operaciones_filtradas = [op for op in data if op['operador'] == operador]
-        if not operaciones_filtradas:
-            print(f"No hay operaciones del usuario con ID {usuario_id} usando el operador '{operador}'.")
-            return
-            
-        df = pd.DataFrame(operaciones_filtradas)
-        
-        # Sumar antes de formatear
-        total = df['resultado'].sum()
-        
-        # Formatear columnas
-        df['operando1'] = df['operando1'].apply(format_numero)
-        df['operando2'] = df['operando2'].apply(format_numero)
-        df['resultado'] = df['resultado'].apply(format_numero)
-        
-        print(f"\nOperaciones del usuario ID {usuario_id} con el operador '{operador}':")
-        print(df)
-        
-        print(f"\nImporte total de operaciones: {format_numero(total)}")
\ No newline at end of file
+        Operaciones de un usuario específico con un operador específico, como ResultadoConsulta.
+        """
+        def vacio():
+            if not hay_operaciones(usuario_id=usuario_id):
+                return f"No hay operaciones registradas para el usuario con ID {usuario_id}."
+            return f"No hay operaciones del usuario con ID {usuario_id} usando el operador '{operador}'."
+
+        return ResultadoConsulta(
+            self, f"\nOperaciones del usuario ID {usuario_id} con el operador '{operador}':",
+            usuario_id=usuario_id, operador=operador, vacio=vacio
+        )
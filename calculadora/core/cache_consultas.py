@@ -0,0 +1,226 @@
+# calculadora/core/cache_consultas.py
+
+"""
+Caché de los informes de Consultas.
+
+Guarda el resultado de cada informe (el texto del resumen o los datos de cada
+página) con una clave formada por el tipo de informe y sus parámetros. Cada entrada recuerda el filtro
+(usuario_id, operador) de las operaciones que resume, y la caché se invalida con
+precisión al escribir operaciones: una escritura del usuario U con el operador O
+solo descarta las entradas cuyo filtro la incluye (mismo usuario o todos, mismo
+operador o todos). Quien escribe avisa a través del observador de
+calculadora/db/models.py (ver calculadora/consultas.py).
+
+Cada filtro tiene además un número de generación que cambia al invalidarlo. calcular
+lo lee antes de consultar la base de datos y no guarda el resultado si ha cambiado
+mientras tanto: una escritura que llega entre la lectura y el guardado no deja en la
+caché un informe sin ella.
+
+El tamaño se limita en bytes aproximados; al superarlo se descartan las entradas
+menos usadas. La caché es local al proceso: como las escrituras de otros procesos
+no la invalidan, las entradas caducan además tras 'max_edad' segundos.
+
+Variables de entorno:
+    CALCULADORA_CACHE_CONSULTAS_MB: memoria máxima en MB (por defecto 32; 0 la desactiva)
+    CALCULADORA_CACHE_CONSULTAS_TTL: segundos de vida de cada entrada (por defecto 60; 0 = sin caducidad)
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _tamano_aproximado(valor):
+    """Bytes aproximados que ocupa un valor (recorre tuplas, listas y diccionarios)."""
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_tamano_aproximado(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamano_aproximado(k) + _tamano_aproximado(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+def _afecta(filtro, usuario_id, operador):
+    """True si una operación de (usuario_id, operador) entra en el filtro de una entrada."""
+    filtro_usuario, filtro_operador = filtro
+    return ((filtro_usuario is None or filtro_usuario == usuario_id)
+            and (filtro_operador is None or filtro_operador == operador))
+
+
+class CacheConsultas:
+    """
+    Caché LRU limitada en bytes, con invalidación por (usuario_id, operador) y
+    contadores de aciertos, fallos, invalidaciones y desalojos.
+    """
+    def __init__(self, capacidad_bytes=32 * 1024 * 1024, max_edad=60):
+        """
+        Args:
+            capacidad_bytes: Memoria máxima aproximada; al superarla se descartan las entradas menos usadas
+            max_edad: Segundos de vida de cada entrada (None o 0 = sin caducidad)
+        """
+        self.capacidad_bytes = capacidad_bytes
+        self.max_edad = max_edad or None
+        # clave -> (valor, filtro, bytes, instante de creación)
+        self._entradas = OrderedDict()
+        # filtro -> claves con ese filtro, para invalidar sin recorrer todas las entradas
+        self._por_filtro = {}
+        # filtro -> generación (valores únicos de _contador), cambia al invalidar el filtro
+        self._generaciones = {}
+        self._contador = itertools.count()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.desalojos = 0
+        self.caducadas = 0
+
+    def _quitar(self, clave):
+        _, filtro, tamano, _ = self._entradas.pop(clave)
+        self._bytes -= tamano
+        claves = self._por_filtro[filtro]
+        claves.discard(clave)
+        if not claves:
+            del self._por_filtro[filtro]
+
+    def obtener(self, clave):
+        """Retorna el valor guardado con 'clave' o None si no está (o ha caducado)."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and self.max_edad and time.monotonic() - entrada[3] > self.max_edad:
+                self._quitar(clave)
+                self.caducadas += 1
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def generacion(self, usuario_id=None, operador=None):
+        """Generación actual del filtro (usuario_id, operador), para pasarla a guardar."""
+        filtro = (usuario_id, operador)
+        with self._lock:
+            if filtro not in self._generaciones:
+                self._generaciones[filtro] = next(self._contador)
+            return self._generaciones[filtro]
+
+    def guardar(self, clave, valor, usuario_id=None, operador=None, generacion=None):
+        """
+        Guarda 'valor' (no None) con 'clave'. usuario_id y operador son el filtro de
+        las operaciones de las que depende el valor (None = todos). Con 'generacion'
+        (ver generacion()) no se guarda si el filtro se ha invalidado desde entonces.
+        """
+        tamano = _tamano_aproximado(clave) + _tamano_aproximado(valor)
+        if valor is None or tamano > self.capacidad_bytes:
+            return
+        filtro = (usuario_id, operador)
+        with self._lock:
+            if generacion is not None and self._generaciones.get(filtro) != generacion:
+                return
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (valor, filtro, tamano, time.monotonic())
+            self._por_filtro.setdefault(filtro, set()).add(clave)
+            self._bytes += tamano
+            while self._bytes > self.capacidad_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.desalojos += 1
+
+    def calcular(self, clave, funcion, usuario_id=None, operador=None):
+        """Retorna el valor guardado con 'clave' o, si no está, funcion() (y lo guarda)."""
+        valor = self.obtener(clave)
+        if valor is None:
+            generacion = self.generacion(usuario_id, operador)
+            valor = funcion()
+            self.guardar(clave, valor, usuario_id, operador, generacion)
+        return valor
+
+    def invalidar(self, pares):
+        """
+        Descarta las entradas que dependen de alguna de las operaciones escritas.
+
+        Args:
+            pares: Iterable de tuplas (usuario_id, operador) de las operaciones escritas
+        """
+        pares = set(pares)
+        with self._lock:
+            # También los filtros sin entradas, que pueden tener un calcular en curso
+            afectados = [
+                filtro for filtro in self._por_filtro.keys() | self._generaciones.keys()
+                if any(_afecta(filtro, usuario_id, operador) for usuario_id, operador in pares)
+            ]
+            for filtro in afectados:
+                if filtro in self._generaciones:
+                    self._generaciones[filtro] = next(self._contador)
+                for clave in list(self._por_filtro.get(filtro, ())):
+                    self._quitar(clave)
+                    self.invalidaciones += 1
+
+    def limpiar(self):
+        """Vacía la caché."""
+        with self._lock:
+            self._entradas.clear()
+            self._por_filtro.clear()
+            # Los calcular en curso ya no encontrarán su generación y no guardarán
+            self._generaciones.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        """Aciertos, fallos, invalidaciones, desalojos, caducadas, entradas y memoria usada."""
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "invalidaciones": self.invalidaciones,
+            "desalojos": self.desalojos,
+            "caducadas": self.caducadas,
+            "entradas": len(self._entradas),
+            "bytes": self._bytes,
+            "capacidad_bytes": self.capacidad_bytes,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+        }
+
+
+# === CACHÉ GLOBAL ===
+_cache = None
+_cache_creada = False
+_cache_lock = threading.Lock()
+
+
+def obtener_cache_consultas():
+    """
+    Retorna la caché global según la configuración de entorno, o None si está desactivada.
+    """
+    global _cache, _cache_creada
+    if not _cache_creada:
+        with _cache_lock:
+            if not _cache_creada:
+                megas = float(os.getenv("CALCULADORA_CACHE_CONSULTAS_MB", "32"))
+                max_edad = float(os.getenv("CALCULADORA_CACHE_CONSULTAS_TTL", "60"))
+                if megas > 0:
+                    _cache = CacheConsultas(int(megas * 1024 * 1024), max_edad)
+                _cache_creada = True
+    return _cache
+
+
+def configurar_cache_consultas(capacidad_bytes=32 * 1024 * 1024, max_edad=60):
+    """
+    Sustituye la caché global (capacidad 0 la desactiva). Retorna la nueva caché.
+    """
+    global _cache, _cache_creada
+    with _cache_lock:
+        _cache = CacheConsultas(capacidad_bytes, max_edad) if capacidad_bytes > 0 else None
+        _cache_creada = True
+    return _cache
+
+
+def estadisticas_cache_consultas():
+    """Estadísticas de la caché global ({} si está desactivada)."""
+    cache = obtener_cache_consultas()
+    return cache.estadisticas() if cache is not None else {}
@@ -0,0 +1,211 @@
+# calculadora/core/cache_resultados.py
+
+"""
+Caché de resultados de operaciones.
+
+Todos los operadores de calculadora/core/operators.py son funciones puras, así que
+el resultado de (operando1, operador, operando2) se puede reutilizar. La caché tiene
+dos niveles:
+
+  1. Local: LRU en memoria del proceso con un número máximo de entradas.
+  2. Compartido (opcional): un fichero SQLite que consultan y alimentan todos los
+     procesos que apuntan a él, de modo que el acierto de uno sirve a los demás.
+     Solo se usa con los operadores caros (OPERADORES_COMPARTIDOS): para una suma,
+     consultar el fichero cuesta más que volver a calcularla.
+
+Variables de entorno:
+    CALCULADORA_CACHE_RESULTADOS: entradas de la caché local (por defecto 0: desactivada)
+    CALCULADORA_CACHE_COMPARTIDA: ruta del fichero SQLite compartido (vacío = sin nivel compartido)
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Operadores cuyo resultado se comparte entre procesos
+OPERADORES_COMPARTIDOS = ('^', 'sqrt')
+
+_NO_ENCONTRADO = object()
+
+
+class CacheCompartida:
+    """
+    Nivel compartido entre procesos sobre un fichero SQLite en modo WAL.
+    Cuando supera 'capacidad' filas se eliminan las más antiguas.
+    """
+    def __init__(self, ruta, capacidad=100000):
+        self.ruta = ruta
+        self.capacidad = capacidad
+        self._local = threading.local()
+        self._inserciones = 0
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso (no se reutiliza tras un fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=OFF;")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS resultados (
+                    operando1 REAL NOT NULL,
+                    operador TEXT NOT NULL,
+                    operando2 REAL NOT NULL,
+                    resultado REAL NOT NULL,
+                    UNIQUE (operando1, operador, operando2)
+                );
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def obtener(self, clave):
+        try:
+            fila = self._conexion().execute(
+                "SELECT resultado FROM resultados WHERE operando1 = ? AND operador = ? AND operando2 = ?;",
+                clave
+            ).fetchone()
+        except sqlite3.Error:
+            # La caché nunca debe impedir calcular
+            return _NO_ENCONTRADO
+        return fila[0] if fila is not None else _NO_ENCONTRADO
+
+    def guardar(self, clave, resultado):
+        try:
+            conn = self._conexion()
+            conn.execute("INSERT OR IGNORE INTO resultados VALUES (?, ?, ?, ?);", (*clave, resultado))
+            self._inserciones += 1
+            if self._inserciones % 1000 == 0:
+                conn.execute(
+                    "DELETE FROM resultados WHERE rowid <= (SELECT MAX(rowid) FROM resultados) - ?;",
+                    (self.capacidad,)
+                )
+        except sqlite3.Error:
+            pass
+
+
+class CacheResultados:
+    """
+    Caché LRU de resultados con contadores de aciertos y fallos y un nivel compartido opcional.
+    """
+    def __init__(self, capacidad=4096, compartida=None):
+        """
+        Args:
+            capacidad: Máximo de entradas en memoria; al superarlo se descarta la menos usada
+            compartida: CacheCompartida opcional
+        """
+        self.capacidad = capacidad
+        self.compartida = compartida
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.aciertos = 0
+        self.aciertos_compartidos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    @staticmethod
+    def clave(operando1, operador, operando2):
+        """Clave normalizada: sqrt ignora el segundo operando y 2 == 2.0."""
+        return (float(operando1), operador, 0.0 if operador == 'sqrt' else float(operando2))
+
+    def _guardar_local(self, clave, resultado):
+        with self._lock:
+            self._entradas[clave] = resultado
+            self._entradas.move_to_end(clave)
+            if len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def calcular(self, operando1, operador, operando2, funcion):
+        """
+        Retorna funcion(operando1, operando2) usando la caché. Las excepciones de
+        'funcion' se propagan y no se guardan.
+        """
+        clave = self.clave(operando1, operador, operando2)
+
+        with self._lock:
+            resultado = self._entradas.get(clave, _NO_ENCONTRADO)
+            if resultado is not _NO_ENCONTRADO:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return resultado
+
+        compartir = self.compartida is not None and operador in OPERADORES_COMPARTIDOS
+        if compartir:
+            resultado = self.compartida.obtener(clave)
+            if resultado is not _NO_ENCONTRADO:
+                with self._lock:
+                    self.aciertos_compartidos += 1
+                self._guardar_local(clave, resultado)
+                return resultado
+
+        with self._lock:
+            self.fallos += 1
+        resultado = funcion(operando1, operando2)
+        self._guardar_local(clave, resultado)
+        # Solo se comparten resultados reales (p. ej. no los complejos de ^)
+        if compartir and isinstance(resultado, (int, float)):
+            self.compartida.guardar(clave, resultado)
+        return resultado
+
+    def limpiar(self):
+        """Vacía el nivel local."""
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """Aciertos (locales y compartidos), fallos, desalojos y tamaño actual."""
+        total = self.aciertos + self.aciertos_compartidos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "aciertos_compartidos": self.aciertos_compartidos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "entradas": len(self._entradas),
+            "capacidad": self.capacidad,
+            "tasa_aciertos": (self.aciertos + self.aciertos_compartidos) / total if total else 0.0,
+        }
+
+
+# === CACHÉ GLOBAL ===
+_cache = None
+_cache_creada = False
+_cache_lock = threading.Lock()
+
+
+def obtener_cache_resultados():
+    """
+    Retorna la caché global según la configuración de entorno, o None si está desactivada.
+    """
+    global _cache, _cache_creada
+    if not _cache_creada:
+        with _cache_lock:
+            if not _cache_creada:
+                capacidad = int(os.getenv("CALCULADORA_CACHE_RESULTADOS", "0"))
+                ruta = os.getenv("CALCULADORA_CACHE_COMPARTIDA", "")
+                if capacidad > 0:
+                    _cache = CacheResultados(capacidad, CacheCompartida(ruta) if ruta else None)
+                _cache_creada = True
+    return _cache
+
+
+def configurar_cache_resultados(capacidad=4096, ruta_compartida=None):
+    """
+    Sustituye la caché global (capacidad 0 la desactiva). Retorna la nueva caché.
+    """
+    global _cache, _cache_creada
+    with _cache_lock:
+        _cache = None
+        if capacidad > 0:
+            _cache = CacheResultados(capacidad, CacheCompartida(ruta_compartida) if ruta_compartida else None)
+        _cache_creada = True
+    return _cache
+
+
+def estadisticas_cache_resultados():
+    """Estadísticas de la caché global ({} si está desactivada)."""
+    cache = obtener_cache_resultados()
+    return cache.estadisticas() if cache is not None else {}
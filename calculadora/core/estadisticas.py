@@ -0,0 +1,101 @@
+# calculadora/core/estadisticas.py
+
+"""
+Operadores estadísticos sobre un conjunto de números (una lista introducida por el
+usuario o los resultados guardados de su historial), calculados con NumPy.
+
+A diferencia de los operadores de calculadora/core/operators.py no son binarios:
+reciben un array y devuelven un valor. resumen_estadistico calcula todos a la vez
+sobre el mismo array, que es lo que usan la CLI y los backends sin agregados
+estadísticos en SQL (PostgreSQL los calcula en la base de datos, ver
+models.estadisticas_resultados).
+
+La desviación típica es la muestral (n - 1), igual que stddev_samp de PostgreSQL.
+"""
+
+import re
+
+import numpy as np
+
+# Percentiles por defecto de resumen_estadistico
+PERCENTILES = (25, 50, 75, 90, 99)
+
+operadores_estadisticos = {
+    'suma': np.sum,
+    'media': np.mean,
+    'mediana': np.median,
+    'desviacion': lambda valores: np.std(valores, ddof=1),
+    'min': np.min,
+    'max': np.max,
+}
+
+_SEPARADORES = re.compile(r"[\s,;]+")
+
+
+def leer_numeros(texto):
+    """
+    Convierte un texto con números separados por espacios, comas o punto y coma
+    ('1, 2.5 3;4') en un array float64. Lanza ValueError si alguno no es numérico.
+    """
+    partes = [p for p in _SEPARADORES.split(texto.strip()) if p]
+    try:
+        return np.array([float(p) for p in partes], dtype=np.float64)
+    except ValueError:
+        raise ValueError("La lista solo puede contener números separados por espacios o comas.") from None
+
+
+def _validar(valores):
+    valores = np.asarray(valores, dtype=np.float64).reshape(-1)
+    if len(valores) == 0:
+        raise ValueError("No hay valores sobre los que calcular estadísticas.")
+    if not np.isfinite(valores).all():
+        raise ValueError("Los valores deben ser números finitos.")
+    return valores
+
+
+def _validar_percentiles(percentiles):
+    percentiles = tuple(float(p) for p in percentiles)
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError("Los percentiles deben estar entre 0 y 100.")
+    return percentiles
+
+
+def calcular_estadistica(operador, valores, percentil=None):
+    """
+    Aplica un operador estadístico ('media', 'mediana', 'desviacion', 'suma', 'min',
+    'max' o 'percentil' con el valor de 'percentil' entre 0 y 100) a los valores.
+    """
+    valores = _validar(valores)
+    if operador == 'percentil':
+        if percentil is None:
+            raise ValueError("Indique el percentil (0-100).")
+        return float(np.percentile(valores, _validar_percentiles([percentil])[0]))
+    if operador not in operadores_estadisticos:
+        raise ValueError("Operador estadístico inválido.")
+    if operador == 'desviacion' and len(valores) < 2:
+        raise ValueError("La desviación típica necesita al menos dos valores.")
+    return float(operadores_estadisticos[operador](valores))
+
+
+def resumen_estadistico(valores, percentiles=PERCENTILES):
+    """
+    Calcula de una vez cantidad, suma, media, mediana, desviación típica (None con
+    un solo valor), mínimo, máximo y los percentiles indicados.
+
+    Returns:
+        Diccionario con esas claves; 'percentiles' es {percentil: valor}
+    """
+    valores = _validar(valores)
+    percentiles = _validar_percentiles(percentiles)
+    # Un único cálculo (con ordenación parcial) para la mediana y todos los percentiles
+    cortes = np.percentile(valores, (50.0,) + percentiles)
+    return {
+        "cantidad": len(valores),
+        "suma": float(valores.sum()),
+        "media": float(valores.mean()),
+        "mediana": float(cortes[0]),
+        "desviacion": float(valores.std(ddof=1)) if len(valores) > 1 else None,
+        "minimo": float(valores.min()),
+        "maximo": float(valores.max()),
+        "percentiles": {p: float(v) for p, v in zip(percentiles, cortes[1:])},
+    }
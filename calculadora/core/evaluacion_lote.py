@@ -0,0 +1,114 @@
+# calculadora/core/evaluacion_lote.py
+
+"""
+Evaluación vectorizada de muchas operaciones a la vez con NumPy.
+
+Es la versión por lotes de los operadores de calculadora/core/operators.py: las
+operaciones se agrupan por operador y cada grupo se calcula con una ufunc de NumPy
+sobre todo el array. Los casos que en la versión escalar lanzan una excepción
+(división entre cero, raíz de un negativo, desbordamiento...) no interrumpen el
+lote: se marcan con un código de error y su resultado queda como NaN.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# Operadores soportados; el código de un operador es su posición en esta tupla
+CODIGOS_OPERADOR = ('+', '-', '*', '/', '^', 'sqrt')
+_CODIGO = {operador: codigo for codigo, operador in enumerate(CODIGOS_OPERADOR)}
+
+_UFUNCS = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+    '^': np.power,
+    'sqrt': lambda a, _: np.sqrt(a),
+}
+
+# Códigos de error por operación
+ERROR_NINGUNO = 0
+ERROR_OPERADOR = 1
+ERROR_DIVISION_CERO = 2
+ERROR_RAIZ_NEGATIVA = 3
+ERROR_DOMINIO = 4
+ERROR_DESBORDAMIENTO = 5
+ERROR_OPERANDO = 6
+
+MENSAJES_ERROR = {
+    ERROR_OPERADOR: "Operador inválido.",
+    ERROR_DIVISION_CERO: "División por cero no permitida.",
+    ERROR_RAIZ_NEGATIVA: "Raíz cuadrada de un número negativo.",
+    ERROR_DOMINIO: "Resultado no real (base negativa con exponente no entero).",
+    ERROR_DESBORDAMIENTO: "Resultado demasiado grande (desbordamiento).",
+    ERROR_OPERANDO: "Operando no válido (vacío, no numérico o infinito).",
+}
+
+# resultados: float64 (NaN donde hay error); errores: int8 con los códigos ERROR_*
+ResultadoLote = namedtuple("ResultadoLote", ["resultados", "errores"])
+
+
+def codificar_operadores(operadores):
+    """
+    Convierte una secuencia de operadores ('+', 'sqrt', ...) en un array int8 de códigos.
+    Los operadores desconocidos reciben el código -1. Si ya es un array de enteros
+    se devuelve tal cual.
+    """
+    operadores = np.asarray(operadores)
+    if operadores.dtype.kind in "iu":
+        return operadores.astype(np.int8, copy=False)
+    # Se traduce cada operador distinto una sola vez, no cada fila
+    distintos, inversa = np.unique(operadores, return_inverse=True)
+    tabla = np.array([_CODIGO.get(op, -1) for op in distintos.tolist()], dtype=np.int8)
+    return tabla[inversa.reshape(-1)]
+
+
+def evaluar_lote(operandos1, operadores, operandos2=None):
+    """
+    Evalúa un lote de operaciones.
+
+    Args:
+        operandos1: Secuencia o array de primeros operandos
+        operadores: Secuencia de operadores ('+', '-', ...) o array de códigos (CODIGOS_OPERADOR)
+        operandos2: Secuencia o array de segundos operandos (None = ceros, p. ej. solo 'sqrt')
+
+    Returns:
+        ResultadoLote con los arrays 'resultados' y 'errores'
+    """
+    a = np.asarray(operandos1, dtype=np.float64).reshape(-1)
+    b = np.zeros_like(a) if operandos2 is None else np.asarray(operandos2, dtype=np.float64).reshape(-1)
+    codigos = codificar_operadores(operadores).reshape(-1)
+    if not (len(a) == len(b) == len(codigos)):
+        raise ValueError("Los operandos y los operadores deben tener la misma longitud.")
+
+    resultados = np.full(len(a), np.nan)
+    errores = np.full(len(a), ERROR_OPERADOR, dtype=np.int8)
+
+    with np.errstate(all="ignore"):
+        for codigo, operador in enumerate(CODIGOS_OPERADOR):
+            indices = np.flatnonzero(codigos == codigo)
+            if len(indices) == 0:
+                continue
+            x, y = a[indices], b[indices]
+            r = _UFUNCS[operador](x, y)
+
+            error = np.full(len(indices), ERROR_NINGUNO, dtype=np.int8)
+            # Entradas finitas con resultado infinito o NaN: desbordamiento o fuera de dominio
+            entradas_finitas = np.isfinite(x) if operador == 'sqrt' else np.isfinite(x) & np.isfinite(y)
+            error[entradas_finitas & np.isinf(r)] = ERROR_DESBORDAMIENTO
+            error[entradas_finitas & np.isnan(r)] = ERROR_DOMINIO
+            # Casos que la versión escalar rechaza con una excepción concreta
+            if operador == '/':
+                error[y == 0] = ERROR_DIVISION_CERO
+            elif operador == '^':
+                error[(x == 0) & (y < 0)] = ERROR_DIVISION_CERO
+            elif operador == 'sqrt':
+                error[x < 0] = ERROR_RAIZ_NEGATIVA
+            error[~entradas_finitas] = ERROR_OPERANDO
+
+            r[error != ERROR_NINGUNO] = np.nan
+            resultados[indices] = r
+            errores[indices] = error
+
+    return ResultadoLote(resultados, errores)
@@ -2,18 +2,61 @@
 
 import pandas as pd
 import pickle
-from calculadora.core.serialization_utils import serialize_data
+from openpyxl import Workbook
+from calculadora.core.utils import format_numeros
+from calculadora.core.serialization_utils import serialize_data, serialize_data_por_lotes
+
+def _lotes_de_datos(data):
+    """
+    Normaliza los datos de exportación a una secuencia de DataFrames.
+    Acepta una lista de diccionarios, un DataFrame o un iterador de lotes (listas de
+    diccionarios o DataFrames), como el que devuelven iterar_operaciones(por_lotes=True)
+    o iterar_todas_las_operaciones_unidas(por_lotes=True).
+    """
+    if isinstance(data, (list, pd.DataFrame)):
+        data = [data]
+    for lote in data:
+        if len(lote) > 0:
+            yield lote if isinstance(lote, pd.DataFrame) else pd.DataFrame(lote)
+
+def _formatear_fechas(df):
+    """
+    Convierte las columnas de fecha a formato legible.
+    Busca cualquier columna que contenga 'creado_en' en el nombre.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if 'creado_en' in col:
+            df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df
+
+def _formatear_numeros(df):
+    """
+    Escribe las columnas float como format_numero (sin '.0' en los enteros), de una
+    vez por columna. Los valores nulos se quedan vacíos.
+    """
+    for col in df.columns:
+        if df[col].dtype.kind == 'f':
+            textos = format_numeros(df[col])
+            textos[df[col].isna().to_numpy()] = None
+            df[col] = textos
+    return df
 
 def export_to_binary(data, filename='export.pkl'):
     """
     Exporta una lista de diccionarios a un archivo pickle serializado.
     Útil para exportar grandes volúmenes de datos para respaldo.
+    Si se recibe un iterador de lotes, se serializa lote a lote sin cargarlo entero en memoria.
     """
-    if not data:
-        print("No hay datos para exportar.")
-        return False
+    if isinstance(data, list):
+        if not data:
+            print("No hay datos para exportar.")
+            return False
+        exito = serialize_data(data, filename)
+    else:
+        exito = serialize_data_por_lotes(data, filename)
 
-    if serialize_data(data, filename):
+    if exito:
         print(f"Datos exportados correctamente a {filename}")
         return True
     else:
@@ -22,40 +65,41 @@ def export_to_binary(data, filename='export.pkl'):
 
 def export_to_csv(data, filename='export.csv'):
     """
-    Exporta una lista de diccionarios a un archivo CSV.
-    Convierte las columnas de fecha a formato legible.
+    Exporta una lista de diccionarios, un DataFrame o un iterador de lotes a un archivo CSV.
+    Convierte las columnas de fecha a formato legible y los números como en Consultas.
+    Los lotes se escriben uno a uno, así que la memoria no depende del total de filas.
     """
-    if not data:
+    escritas = 0
+    for lote in _lotes_de_datos(data):
+        df = _formatear_numeros(_formatear_fechas(lote))
+        df.to_csv(filename, index=False, mode='w' if escritas == 0 else 'a', header=escritas == 0)
+        escritas += len(df)
+
+    if escritas == 0:
         print("No hay datos para exportar.")
         return
 
-    df = pd.DataFrame(data)
-    
-    # Convertir las columnas de fecha a formato legible
-    # Busca cualquier columna que contenga 'creado_en' en el nombre
-    for col in df.columns:
-        if 'creado_en' in col:
-            df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    df.to_csv(filename, index=False)
     print(f"Datos exportados correctamente a {filename}")
 
 def export_to_excel(data, filename='export.xlsx'):
     """
-    Exporta una lista de diccionarios a un archivo Excel.
+    Exporta una lista de diccionarios, un DataFrame o un iterador de lotes a un archivo Excel.
     Convierte las columnas de fecha a formato legible.
+    Usa el modo de solo escritura de openpyxl para no mantener todas las filas en memoria.
     """
-    if not data:
+    wb = None
+    for lote in _lotes_de_datos(data):
+        df = _formatear_fechas(lote)
+        if wb is None:
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet(title="Sheet1")
+            ws.append(list(df.columns))
+        for fila in df.itertuples(index=False, name=None):
+            ws.append([None if pd.isna(valor) else valor for valor in fila])
+
+    if wb is None:
         print("No hay datos para exportar.")
         return
 
-    df = pd.DataFrame(data)
-    
-    # Convertir las columnas de fecha a formato legible
-    # Busca cualquier columna que contenga 'creado_en' en el nombre
-    for col in df.columns:
-        if 'creado_en' in col:
-            df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    df.to_excel(filename, index=False)
-    print(f"Datos exportados correctamente a {filename}")
\ No newline at end of file
+    wb.save(filename)
+    print(f"Datos exportados correctamente a {filename}")
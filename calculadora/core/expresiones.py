@@ -0,0 +1,279 @@
+# calculadora/core/expresiones.py
+
+"""
+Motor de expresiones: permite evaluar fórmulas completas como '2 * (x + 1) ^ 2 - sqrt y'
+en lugar de una única operación binaria.
+
+La expresión se divide en tokens, se analiza (descenso recursivo) a un árbol
+sintáctico y se compila a una cadena de funciones de Python que se evalúa sin
+volver a analizar el texto. Las subexpresiones constantes se calculan al compilar.
+Las expresiones compiladas se guardan en una caché LRU indexada por el texto
+normalizado, así que '2*x' y '2 * x' comparten entrada.
+
+Precedencia (de menor a mayor):
+    +  -            (binarios, asociativos a la izquierda)
+    *  /            (asociativos a la izquierda)
+    -  sqrt         (unarios prefijos: 'sqrt x' o 'sqrt(x)')
+    ^               (asociativo a la derecha: 2 ^ 3 ^ 2 = 2 ^ 9; -2 ^ 2 = -4)
+
+La semántica de cada operador es la de calculadora/core/operators.py, con los mismos
+errores que realizar_operacion: ZeroDivisionError al dividir entre cero y ValueError
+para resultados no reales o demasiado grandes.
+"""
+
+import math
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from calculadora.core.operators import operators
+
+# Tamaño de la caché de expresiones compiladas
+TAMANO_CACHE_EXPRESIONES = 256
+
+_PATRON_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<numero>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<nombre>[A-Za-z_][A-Za-z_0-9]*)
+      | (?P<simbolo>[-+*/^()])
+    )
+""", re.VERBOSE)
+
+# Nodos del árbol sintáctico
+Numero = namedtuple("Numero", ["valor"])
+Variable = namedtuple("Variable", ["nombre"])
+Unaria = namedtuple("Unaria", ["operador", "operando"])
+Binaria = namedtuple("Binaria", ["operador", "izquierda", "derecha"])
+
+
+def tokenizar(fuente):
+    """
+    Divide la expresión en tokens (tipo, texto). Lanza ValueError ante un carácter no válido.
+    """
+    tokens = []
+    posicion = 0
+    fuente = fuente.rstrip()
+    while posicion < len(fuente):
+        coincidencia = _PATRON_TOKEN.match(fuente, posicion)
+        if coincidencia is None:
+            raise ValueError(f"Carácter no válido en la expresión: '{fuente[posicion:].strip()[0]}'")
+        tipo = coincidencia.lastgroup
+        texto = coincidencia.group(tipo)
+        if tipo == "numero":
+            valor = float(texto)
+            if math.isinf(valor):
+                raise ValueError(f"Número demasiado grande en la expresión: '{texto}'")
+            # 2, 2.0 y 2e0 son el mismo número
+            texto = repr(valor)
+            if texto.endswith(".0"):
+                texto = texto[:-2]
+        elif tipo == "nombre" and texto.lower() == "sqrt":
+            tipo, texto = "simbolo", "sqrt"
+        tokens.append((tipo, texto))
+        posicion = coincidencia.end()
+    if not tokens:
+        raise ValueError("La expresión está vacía.")
+    return tokens
+
+
+def normalizar(fuente):
+    """Texto canónico de la expresión (tokens separados por un espacio)."""
+    return " ".join(texto for _, texto in tokenizar(fuente))
+
+
+class _Analizador:
+    """Analizador de descenso recursivo sobre la lista de tokens."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.posicion = 0
+
+    def _actual(self):
+        return self.tokens[self.posicion] if self.posicion < len(self.tokens) else (None, None)
+
+    def _consumir_simbolo(self, *simbolos):
+        tipo, texto = self._actual()
+        if tipo == "simbolo" and texto in simbolos:
+            self.posicion += 1
+            return texto
+        return None
+
+    def analizar(self):
+        arbol = self._suma()
+        if self.posicion < len(self.tokens):
+            raise ValueError(f"Token inesperado en la expresión: '{self.tokens[self.posicion][1]}'")
+        return arbol
+
+    def _suma(self):
+        nodo = self._producto()
+        while True:
+            operador = self._consumir_simbolo('+', '-')
+            if operador is None:
+                return nodo
+            nodo = Binaria(operador, nodo, self._producto())
+
+    def _producto(self):
+        nodo = self._unaria()
+        while True:
+            operador = self._consumir_simbolo('*', '/')
+            if operador is None:
+                return nodo
+            nodo = Binaria(operador, nodo, self._unaria())
+
+    def _unaria(self):
+        operador = self._consumir_simbolo('-', '+', 'sqrt')
+        if operador == '+':
+            return self._unaria()
+        if operador is not None:
+            return Unaria(operador, self._unaria())
+        return self._potencia()
+
+    def _potencia(self):
+        base = self._atomo()
+        if self._consumir_simbolo('^'):
+            # El exponente admite signo: 2 ^ -1
+            return Binaria('^', base, self._unaria())
+        return base
+
+    def _atomo(self):
+        tipo, texto = self._actual()
+        if tipo is None:
+            raise ValueError("La expresión termina de forma inesperada.")
+        self.posicion += 1
+        if tipo == "numero":
+            return Numero(float(texto))
+        if tipo == "nombre":
+            return Variable(texto)
+        if texto == '(':
+            nodo = self._suma()
+            if not self._consumir_simbolo(')'):
+                raise ValueError("Falta un paréntesis de cierre ')'.")
+            return nodo
+        raise ValueError(f"Token inesperado en la expresión: '{texto}'")
+
+
+def analizar(fuente):
+    """Retorna el árbol sintáctico de la expresión."""
+    return _Analizador(tokenizar(fuente)).analizar()
+
+
+def _aplicar(operador, a, b=0):
+    """Aplica un operador de la tabla 'operators' con los errores de realizar_operacion."""
+    if operador == '/' and b == 0:
+        raise ZeroDivisionError("División por cero no permitida.")
+    try:
+        resultado = operators[operador](a, b)
+    except OverflowError:
+        raise ValueError("Resultado demasiado grande (desbordamiento).") from None
+    except ZeroDivisionError:
+        raise ZeroDivisionError("División por cero no permitida.") from None
+    except ValueError:
+        raise ValueError(f"Operación fuera de dominio: {operador} {a}.") from None
+    if isinstance(resultado, complex):
+        raise ValueError("Resultado no real (base negativa con exponente no entero).")
+    return resultado
+
+
+def _compilar_nodo(nodo):
+    """
+    Convierte un nodo en una función f(variables) -> float.
+    Retorna (funcion, constante) donde 'constante' es el valor si el nodo no depende
+    de variables y se pudo calcular al compilar, o None.
+    """
+    if isinstance(nodo, Numero):
+        valor = nodo.valor
+        return (lambda variables: valor), valor
+
+    if isinstance(nodo, Variable):
+        nombre = nodo.nombre
+
+        def variable(variables):
+            try:
+                return variables[nombre]
+            except KeyError:
+                raise ValueError(f"Falta el valor de la variable '{nombre}'.") from None
+        return variable, None
+
+    if isinstance(nodo, Unaria):
+        f, constante = _compilar_nodo(nodo.operando)
+        if nodo.operador == 'sqrt':
+            funcion = lambda variables: _aplicar('sqrt', f(variables))
+        else:
+            funcion = lambda variables: _aplicar('-', 0, f(variables))
+        return _plegar(funcion, constante is not None)
+
+    f, constante_f = _compilar_nodo(nodo.izquierda)
+    g, constante_g = _compilar_nodo(nodo.derecha)
+    operador = nodo.operador
+    funcion = lambda variables: _aplicar(operador, f(variables), g(variables))
+    return _plegar(funcion, constante_f is not None and constante_g is not None)
+
+
+def _plegar(funcion, es_constante):
+    """Precalcula las subexpresiones constantes (si no producen error)."""
+    if es_constante:
+        try:
+            valor = funcion({})
+        except (ArithmeticError, ValueError):
+            # El error se producirá (y se informará) al evaluar
+            return funcion, None
+        return (lambda variables: valor), valor
+    return funcion, None
+
+
+def _variables(nodo):
+    if isinstance(nodo, Variable):
+        return {nodo.nombre}
+    if isinstance(nodo, Unaria):
+        return _variables(nodo.operando)
+    if isinstance(nodo, Binaria):
+        return _variables(nodo.izquierda) | _variables(nodo.derecha)
+    return set()
+
+
+class ExpresionCompilada:
+    """
+    Expresión lista para evaluarse repetidamente con distintos valores de sus variables.
+    """
+    def __init__(self, fuente):
+        self.fuente = fuente
+        self.arbol = analizar(fuente)
+        self.variables = tuple(sorted(_variables(self.arbol)))
+        self._funcion, _ = _compilar_nodo(self.arbol)
+
+    def evaluar(self, variables=None, **valores):
+        """
+        Evalúa la expresión. Las variables se pasan como diccionario o como argumentos:
+            expresion.evaluar({'x': 2})  o  expresion.evaluar(x=2)
+        """
+        if variables:
+            valores = {**variables, **valores}
+        return self._funcion(valores)
+
+    __call__ = evaluar
+
+    def __repr__(self):
+        return f"ExpresionCompilada({self.fuente!r})"
+
+
+@lru_cache(maxsize=TAMANO_CACHE_EXPRESIONES)
+def _compilar_normalizada(fuente_normalizada):
+    return ExpresionCompilada(fuente_normalizada)
+
+
+def compilar(fuente):
+    """
+    Retorna la expresión compilada, reutilizando la de la caché si ya se compiló
+    una expresión con el mismo texto normalizado.
+    """
+    return _compilar_normalizada(normalizar(fuente))
+
+
+def evaluar_expresion(fuente, variables=None):
+    """Compila (o toma de la caché) y evalúa la expresión."""
+    return compilar(fuente).evaluar(variables)
+
+
+def estadisticas_cache_expresiones():
+    """Aciertos, fallos y tamaño de la caché de expresiones compiladas."""
+    return _compilar_normalizada.cache_info()._asdict()
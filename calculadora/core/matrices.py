@@ -0,0 +1,113 @@
+# calculadora/core/matrices.py
+
+"""
+Operaciones con vectores y matrices.
+
+Los operandos son arrays de NumPy de una o dos dimensiones y los operadores son los
+de 'operadores_matriciales' (calculadora/core/operators.py), que NumPy resuelve con
+BLAS/LAPACK. Como en las operaciones escalares, los casos no válidos se comunican
+con ValueError (dimensiones incompatibles, matriz singular...) y ZeroDivisionError.
+
+Para guardarlos, los arrays se serializan en formato .npy (np.save, sin pickle):
+binario compacto que conserva tipo y forma y se guarda en una columna BYTEA.
+"""
+
+import io
+import re
+
+import numpy as np
+
+from calculadora.core.operators import operadores_matriciales
+
+# Operadores que solo usan el primer operando
+OPERADORES_UNARIOS = ('det', 'inv')
+
+# Operadores que necesitan una matriz cuadrada como primer operando
+_CUADRADA = ('det', 'inv', 'solve')
+
+_SEPARADOR_ELEMENTOS = re.compile(r"[\s,]+")
+
+
+def leer_matriz(texto):
+    """
+    Convierte un texto en un vector o una matriz float64. Las filas se separan con ';'
+    y los elementos con espacios o comas: '1 2 3' es un vector y '1 2; 3 4' una matriz 2x2.
+    Lanza ValueError si el texto está vacío, no es numérico o las filas tienen distinta longitud.
+    """
+    texto = texto.strip().strip("[]")
+    filas = [f for f in (fila.strip() for fila in texto.split(";")) if f]
+    if not filas:
+        raise ValueError("La matriz está vacía.")
+    try:
+        valores = [[float(x) for x in _SEPARADOR_ELEMENTOS.split(fila) if x] for fila in filas]
+    except ValueError:
+        raise ValueError("Los elementos deben ser números separados por espacios o comas.") from None
+    if len({len(fila) for fila in valores}) != 1:
+        raise ValueError("Todas las filas deben tener el mismo número de elementos.")
+
+    matriz = np.array(valores, dtype=np.float64)
+    if not np.isfinite(matriz).all():
+        raise ValueError("Los elementos deben ser números finitos.")
+    return matriz[0] if len(valores) == 1 else matriz
+
+
+def formatear_matriz(valor, formato=str):
+    """
+    Texto de un resultado en la misma notación que leer_matriz ('[1 2; 3 4]');
+    los escalares se formatean tal cual. 'formato' convierte cada número.
+    """
+    valor = np.asarray(valor)
+    if valor.ndim == 0:
+        return formato(valor.item())
+    if valor.ndim == 1:
+        return "[" + " ".join(formato(x) for x in valor.tolist()) + "]"
+    return "[" + "; ".join(" ".join(formato(x) for x in fila) for fila in valor.tolist()) + "]"
+
+
+def calcular_matricial(operador, a, b=None):
+    """
+    Aplica un operador matricial. Retorna un array (o un float si el resultado es
+    un escalar, p. ej. 'det' o 'dot' de dos vectores).
+    """
+    if operador not in operadores_matriciales:
+        raise ValueError("Operador matricial inválido.")
+    a = np.asarray(a, dtype=np.float64)
+    if operador in OPERADORES_UNARIOS:
+        b = None
+    elif b is None:
+        raise ValueError(f"El operador '{operador}' necesita dos operandos.")
+    else:
+        b = np.asarray(b, dtype=np.float64)
+
+    if operador in _CUADRADA and (a.ndim != 2 or a.shape[0] != a.shape[1]):
+        raise ValueError(f"El operador '{operador}' necesita una matriz cuadrada.")
+    if operador == './' and (b == 0).any():
+        raise ZeroDivisionError("División por cero no permitida.")
+
+    try:
+        with np.errstate(all="ignore"):
+            resultado = operadores_matriciales[operador](a, b)
+    except np.linalg.LinAlgError:
+        raise ValueError("La matriz es singular (no tiene inversa).") from None
+    except ValueError:
+        raise ValueError(f"Dimensiones incompatibles para '{operador}': {a.shape} y {b.shape}.") from None
+
+    if not np.isfinite(resultado).all():
+        raise ValueError("Resultado demasiado grande (desbordamiento).")
+    return float(resultado) if np.ndim(resultado) == 0 else resultado
+
+
+def a_bytes(valor):
+    """Serializa un array (o escalar) en formato .npy, sin pickle."""
+    if valor is None:
+        return None
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(valor), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def de_bytes(datos):
+    """Recupera un array serializado con a_bytes (None si no hay datos)."""
+    if datos is None:
+        return None
+    return np.load(io.BytesIO(bytes(datos)), allow_pickle=False)
@@ -2,6 +2,8 @@
 
 import math
 
+import numpy as np
+
 operators = {
     '+': lambda a, b: a + b,
     '-': lambda a, b: a - b,
@@ -10,3 +12,16 @@ operators = {
     '^': lambda a, b: a ** b,             # Potencia
     'sqrt': lambda a, _: math.sqrt(a)     # Raíz cuadrada (unario, segundo parámetro ignorado)
 }
+
+# Operadores sobre vectores y matrices (arrays de NumPy); ver calculadora/core/matrices.py
+operadores_matriciales = {
+    'dot': lambda a, b: np.dot(a, b),                # Producto escalar (o matricial si son matrices)
+    '@': lambda a, b: np.matmul(a, b),               # Producto matricial
+    '.+': lambda a, b: np.add(a, b),                 # Operaciones elemento a elemento
+    '.-': lambda a, b: np.subtract(a, b),
+    '.*': lambda a, b: np.multiply(a, b),
+    './': lambda a, b: np.divide(a, b),
+    'det': lambda a, _: np.linalg.det(a),            # Determinante (unario)
+    'inv': lambda a, _: np.linalg.inv(a),            # Inversa (unario)
+    'solve': lambda a, b: np.linalg.solve(a, b),     # Resuelve a · x = b
+}
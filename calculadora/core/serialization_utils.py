@@ -2,8 +2,12 @@
 
 import pickle
 import os
+from collections.abc import Iterator
 from datetime import datetime
 
+# Cabecera que identifica un archivo serializado por lotes (varios pickles seguidos)
+MARCA_LOTES = "__calculadora_lotes__"
+
 def serialize_data(data, filename):
     """
     Serializa datos en un archivo usando pickle.
@@ -23,9 +27,61 @@ def serialize_data(data, filename):
         print(f"Error al serializar datos: {e}")
         return False
 
+def serialize_data_por_lotes(data, filename):
+    """
+    Serializa datos lote a lote, sin necesidad de tenerlos completos en memoria.
+    
+    El archivo contiene una cabecera seguida de un pickle por cada fragmento
+    (clave, valor, es_lote). deserialize_data reconstruye el objeto original.
+    
+    Args:
+        data: Un iterador de lotes (listas), o un diccionario cuyos valores pueden
+              ser iteradores de lotes (p. ej. iterar_operaciones(por_lotes=True))
+        filename: Nombre del archivo donde se guardará
+    
+    Returns:
+        bool: True si la operación fue exitosa, False en caso contrario
+    """
+    try:
+        with open(filename, 'wb') as f:
+            pickle.dump({MARCA_LOTES: 1}, f)
+            if isinstance(data, dict):
+                for clave, valor in data.items():
+                    if isinstance(valor, Iterator):
+                        # Fragmento vacío para que la clave exista aunque no haya filas
+                        pickle.dump((clave, [], True), f)
+                        for lote in valor:
+                            pickle.dump((clave, lote, True), f)
+                    else:
+                        pickle.dump((clave, valor, False), f)
+            else:
+                pickle.dump((None, [], True), f)
+                for lote in data:
+                    pickle.dump((None, lote, True), f)
+        return True
+    except Exception as e:
+        print(f"Error al serializar datos: {e}")
+        return False
+
+def iterar_fragmentos(filename):
+    """
+    Recorre un archivo creado con serialize_data_por_lotes entregando tuplas
+    (clave, valor, es_lote) de una en una. La clave es None si se serializó una lista.
+    """
+    with open(filename, 'rb') as f:
+        cabecera = pickle.load(f)
+        if not (isinstance(cabecera, dict) and MARCA_LOTES in cabecera):
+            raise ValueError(f"{filename} no es un archivo serializado por lotes.")
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
 def deserialize_data(filename):
     """
     Deserializa datos desde un archivo pickle.
+    Admite tanto archivos de un solo pickle como los creados por serialize_data_por_lotes.
     
     Args:
         filename: Nombre del archivo a deserializar
@@ -38,7 +94,23 @@ def deserialize_data(filename):
             return None
         
         with open(filename, 'rb') as f:
-            return pickle.load(f)
+            datos = pickle.load(f)
+        if not (isinstance(datos, dict) and MARCA_LOTES in datos):
+            return datos
+
+        # Reconstruir el objeto a partir de los fragmentos
+        resultado = None
+        for clave, valor, es_lote in iterar_fragmentos(filename):
+            if clave is None:
+                resultado = resultado if resultado is not None else []
+                resultado.extend(valor)
+                continue
+            resultado = resultado if resultado is not None else {}
+            if es_lote:
+                resultado.setdefault(clave, []).extend(valor)
+            else:
+                resultado[clave] = valor
+        return resultado
     except Exception as e:
         print(f"Error al deserializar datos: {e}")
         return None
@@ -49,7 +121,7 @@ def backup_user_data(user_id, data, backup_dir="backups"):
     
     Args:
         user_id: ID del usuario
-        data: Datos a respaldar
+        data: Datos a respaldar (los valores pueden ser iteradores de lotes)
         backup_dir: Directorio para las copias de seguridad
     
     Returns:
@@ -64,8 +136,10 @@ def backup_user_data(user_id, data, backup_dir="backups"):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{backup_dir}/user_{user_id}_{timestamp}.pkl"
         
-        # Serializar datos
-        if serialize_data(data, filename):
+        # Serializar datos (por lotes si alguna sección es un iterador)
+        por_lotes = isinstance(data, dict) and any(isinstance(v, Iterator) for v in data.values())
+        serializar = serialize_data_por_lotes if por_lotes else serialize_data
+        if serializar(data, filename):
             return filename
         return None
     except Exception as e:
@@ -2,6 +2,8 @@
 
 import os
 
+import numpy as np
+
 def limpiar_pantalla():
     """
     Limpia la consola para Windows o Linux/Mac.
@@ -37,3 +39,29 @@ def format_numero(num):
         return str(int(valor))  # Elimina la parte decimal .0
     else:
         return str(valor)
+
+
+def format_numeros(valores):
+    """
+    Versión vectorizada de format_numero para columnas completas (lista, array de
+    NumPy o Series de pandas). Devuelve un array de strings (dtype object) con el
+    mismo texto que format_numero para cada valor.
+
+    Cada valor distinto se formatea una sola vez; los enteros se detectan con una
+    máscara (valor % 1 == 0) y se convierten en bloque a int64, y solo el resto
+    pasa por la representación de float de Python.
+    """
+    valores = np.asarray(valores, dtype=np.float64).reshape(-1)
+    distintos, inversa = np.unique(valores, return_inverse=True)
+
+    with np.errstate(invalid="ignore"):
+        enteros = np.mod(distintos, 1) == 0
+    # Fuera del rango de int64 (muy raro) se convierten uno a uno con int()
+    cabe_en_int64 = enteros & (np.abs(distintos) < 2.0 ** 63)
+    grandes = enteros & ~cabe_en_int64
+
+    textos = np.empty(len(distintos), dtype=object)
+    textos[cabe_en_int64] = list(map(str, distintos[cabe_en_int64].astype(np.int64).tolist()))
+    textos[grandes] = [str(int(valor)) for valor in distintos[grandes].tolist()]
+    textos[~enteros] = list(map(str, distintos[~enteros].tolist()))
+    return textos[inversa.reshape(-1)]
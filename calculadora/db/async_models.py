@@ -0,0 +1,356 @@
+# calculadora/db/async_models.py
+
+"""
+Acceso asíncrono (asyncio) a la base de datos con asyncpg.
+
+Replica la API de calculadora/db/models.py (usuarios, operaciones e historial) con
+funciones 'async' que comparten un pool de conexiones asyncpg propio. Así varias
+sesiones pueden esperar a la base de datos a la vez en un mismo proceso, sin un
+hilo por petición. Los filtros, el orden y los cursores de paginación son los
+mismos que en models.py, y los resultados tienen la misma forma.
+
+asyncpg prepara y guarda en caché cada consulta por conexión, así que aquí no hace
+falta el registro de calculadora/db/sentencias.py.
+
+Variables de entorno: las mismas POSTGRES_* que el pool síncrono
+(POSTGRES_POOL_MIN y POSTGRES_POOL_MAX fijan el tamaño del pool).
+"""
+
+import asyncio
+import datetime
+import os
+from contextlib import asynccontextmanager
+from decimal import Decimal
+
+import asyncpg
+from dotenv import load_dotenv
+
+from calculadora.db.models import (
+    _consulta_lista_agregados,
+    _consulta_operaciones,
+    _consulta_pagina_con_totales,
+    _consulta_resumen,
+    _codificar_cursor,
+    _decodificar_cursor,
+    _notificar_operaciones,
+    _pares_lote,
+    _pares_operacion,
+    _resultado_consulta,
+    _separar_totales,
+    FORMATO_DICTS,
+    TAMANO_LOTE_STREAMING,
+    TAMANO_PAGINA
+)
+from calculadora.db.sentencias import SENTENCIAS, _sql_preparado
+
+# Cargar las variables de entorno desde el archivo .env
+load_dotenv()
+
+# El pool y su lock pertenecen al bucle de eventos que los creó; otro bucle (un
+# segundo asyncio.run() en el mismo proceso) crea los suyos
+_pool = None
+_pool_lock = None
+_pool_bucle = None
+
+
+async def get_pool_async():
+    """
+    Retorna el pool asyncpg del bucle de eventos actual, creándolo la primera vez.
+    """
+    global _pool, _pool_lock, _pool_bucle
+    bucle = asyncio.get_running_loop()
+    if _pool_bucle is not bucle:
+        # El pool anterior es de un bucle ya terminado: no se puede esperar su
+        # cierre, así que se cierran sus conexiones sin más
+        if _pool is not None:
+            _pool.terminate()
+        _pool, _pool_lock, _pool_bucle = None, asyncio.Lock(), bucle
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    database=os.getenv("POSTGRES_DB"),
+                    user=os.getenv("POSTGRES_USER"),
+                    password=os.getenv("POSTGRES_PASSWORD"),
+                    host=os.getenv("POSTGRES_HOST"),
+                    port=os.getenv("POSTGRES_PORT"),
+                    min_size=int(os.getenv("POSTGRES_POOL_MIN", "1")),
+                    max_size=int(os.getenv("POSTGRES_POOL_MAX", "10")),
+                )
+    return _pool
+
+
+async def cerrar_pool_async():
+    """Cierra el pool asyncpg global (si es de otro bucle, sin esperar a sus conexiones)."""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        if _pool_bucle is asyncio.get_running_loop():
+            await pool.close()
+        else:
+            pool.terminate()
+
+
+@asynccontextmanager
+async def conexion_async():
+    """
+    Presta una conexión del pool asyncpg durante el bloque 'async with'.
+    """
+    pool = await get_pool_async()
+    async with pool.acquire() as conn:
+        yield conn
+
+
+def _numero(valor):
+    """asyncpg codifica NUMERIC a partir de Decimal."""
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def _numero_opcional(valor):
+    return None if valor is None else _numero(valor)
+
+
+# === USUARIOS ===
+
+async def insertar_usuario(nombre, password, es_superusuario=False):
+    """
+    Inserta un nuevo usuario con nombre, contraseña y flag de superusuario.
+    Retorna el ID generado.
+    """
+    async with conexion_async() as conn:
+        return await conn.fetchval("""
+            INSERT INTO usuarios (nombre, password, es_superusuario)
+            VALUES ($1, $2, $3) RETURNING id;
+        """, nombre, password, es_superusuario)
+
+
+async def obtener_usuario_por_nombre(nombre):
+    """
+    Retorna una tupla (id, nombre, password, es_superusuario) si existe un usuario con ese nombre,
+    o None si no existe.
+    """
+    async with conexion_async() as conn:
+        fila = await conn.fetchrow(_sql_preparado(SENTENCIAS["usuario_por_nombre"][1]), nombre)
+    return tuple(fila) if fila is not None else None
+
+
+async def obtener_usuario_por_id(usuario_id):
+    """
+    Retorna una tupla (id, nombre, password, es_superusuario) si existe un usuario con ese ID,
+    o None si no existe.
+    """
+    async with conexion_async() as conn:
+        fila = await conn.fetchrow(
+            "SELECT id, nombre, password, es_superusuario FROM usuarios WHERE id = $1;", usuario_id
+        )
+    return tuple(fila) if fila is not None else None
+
+
+async def obtener_todos_usuarios():
+    """
+    Retorna una lista de todos los usuarios registrados.
+    """
+    async with conexion_async() as conn:
+        filas = await conn.fetch("SELECT id, nombre, es_superusuario, creado_en FROM usuarios ORDER BY id;")
+    return [dict(fila) for fila in filas]
+
+
+async def marcar_superusuario(usuario_id):
+    """
+    Marca al usuario indicado como superusuario.
+    """
+    async with conexion_async() as conn:
+        await conn.execute("UPDATE usuarios SET es_superusuario = TRUE WHERE id = $1;", usuario_id)
+
+
+# === OPERACIONES ===
+
+@_notificar_operaciones(_pares_operacion)
+async def insertar_operacion(usuario_id, operando1, operador, operando2, resultado):
+    """
+    Inserta una nueva operación en la tabla 'operaciones'.
+    """
+    async with conexion_async() as conn:
+        await conn.execute(
+            _sql_preparado(SENTENCIAS["insertar_operacion"][1]),
+            usuario_id, _numero(operando1), operador, _numero(operando2), _numero(resultado)
+        )
+
+
+@_notificar_operaciones(_pares_lote)
+async def insertar_operaciones_lote(filas):
+    """
+    Inserta varias operaciones en una sola transacción.
+
+    Args:
+        filas: Lista de tuplas (usuario_id, operando1, operador, operando2, resultado, creado_en, expresion)
+
+    Returns:
+        Número de filas insertadas
+    """
+    if not filas:
+        return 0
+    valores = [
+        (usuario_id, _numero(op1), operador, _numero(op2), _numero(resultado), creado_en, expresion)
+        for usuario_id, op1, operador, op2, resultado, creado_en, expresion in filas
+    ]
+    async with conexion_async() as conn:
+        async with conn.transaction():
+            await conn.executemany(_sql_preparado(SENTENCIAS["insertar_operacion_con_fecha"][1]), valores)
+    return len(filas)
+
+
+async def obtener_operaciones(usuario_id=None, operando=None, operador=None):
+    """
+    Retorna una lista de operaciones (diccionarios) con los mismos filtros que
+    models.obtener_operaciones.
+    """
+    query, params = _consulta_operaciones(usuario_id, _numero_opcional(operando), operador)
+    async with conexion_async() as conn:
+        filas = await conn.fetch(_sql_preparado(query), *params)
+    return [dict(fila) for fila in filas]
+
+
+async def hay_operaciones(usuario_id=None):
+    """
+    Indica si existe al menos una operación (del usuario indicado, o de cualquiera).
+    """
+    async with conexion_async() as conn:
+        if usuario_id is None:
+            return await conn.fetchval("SELECT EXISTS (SELECT 1 FROM operaciones);")
+        return await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM operaciones WHERE usuario_id = $1);", usuario_id
+        )
+
+
+async def iterar_operaciones(usuario_id=None, operando=None, operador=None,
+                             tamano_lote=TAMANO_LOTE_STREAMING, por_lotes=False):
+    """
+    Versión en streaming de obtener_operaciones (generador asíncrono con un cursor
+    del servidor). Ver models.iterar_operaciones para 'tamano_lote' y 'por_lotes'.
+    """
+    query, params = _consulta_operaciones(usuario_id, _numero_opcional(operando), operador)
+    async with conexion_async() as conn:
+        async with conn.transaction():
+            cursor = await conn.cursor(_sql_preparado(query), *params)
+            while True:
+                filas = await cursor.fetch(tamano_lote)
+                if not filas:
+                    break
+                lote = [dict(fila) for fila in filas]
+                if por_lotes:
+                    yield lote
+                else:
+                    for registro in lote:
+                        yield registro
+
+
+async def obtener_pagina_operaciones(usuario_id=None, operador=None, tamano_pagina=TAMANO_PAGINA, cursor=None):
+    """
+    Retorna una página de operaciones, de la más reciente a la más antigua.
+    Mismos parámetros, resultado y cursores que models.obtener_pagina_operaciones.
+    """
+    query, params = _consulta_operaciones(usuario_id=usuario_id, operador=operador)
+    params = list(params)
+
+    if cursor is not None:
+        query += " AND" if params else " WHERE"
+        query += " (creado_en, id) < (%s, %s)"
+        params.extend(_decodificar_cursor(cursor))
+
+    query += " ORDER BY creado_en DESC, id DESC LIMIT %s;"
+    params.append(tamano_pagina + 1)
+
+    async with conexion_async() as conn:
+        filas = await conn.fetch(_sql_preparado(query), *params)
+
+    operaciones = [dict(fila) for fila in filas[:tamano_pagina]]
+    siguiente_cursor = None
+    if len(filas) > tamano_pagina:
+        ultima = operaciones[-1]
+        siguiente_cursor = _codificar_cursor(ultima["creado_en"], ultima["id"])
+
+    return {"operaciones": operaciones, "siguiente_cursor": siguiente_cursor}
+
+
+async def consultar_operaciones(usuario_id=None, operador=None, desde=None, hasta=None, columnas=None,
+                                ascendente=False, tamano_pagina=TAMANO_PAGINA, cursor=None, con_totales=True):
+    """
+    Página de operaciones con sus totales en una sola sentencia.
+    Mismos parámetros y resultado que models.consultar_operaciones.
+    """
+    query, params = _consulta_pagina_con_totales(usuario_id, operador, desde, hasta, columnas, ascendente,
+                                                 tamano_pagina, cursor, con_totales)
+    async with conexion_async() as conn:
+        filas = await conn.fetch(_sql_preparado(query), *params)
+
+    cols = list(filas[0].keys()) if filas else []
+    rows = [tuple(fila) for fila in filas]
+    totales = None
+    if con_totales:
+        rows, cols, totales = _separar_totales(rows, cols)
+    return _resultado_consulta(rows, cols, columnas, tamano_pagina, FORMATO_DICTS, totales)
+
+
+async def resumen_operaciones(usuario_id=None, operador=None):
+    """
+    Retorna un diccionario con 'cantidad', 'total', 'minimo' y 'maximo' de las
+    operaciones que cumplen los filtros, leídos de 'agregados_operaciones'.
+    """
+    query, params = _consulta_resumen(usuario_id=usuario_id, operador=operador)
+    async with conexion_async() as conn:
+        cantidad, total, minimo, maximo = await conn.fetchrow(_sql_preparado(query), *params)
+    return {"cantidad": cantidad, "total": total, "minimo": minimo, "maximo": maximo}
+
+
+async def obtener_agregados_operaciones(usuario_id=None, operador=None, por_dia=False, desde=None, hasta=None):
+    """
+    Retorna los agregados por usuario y operador (y día si por_dia); ver
+    models.obtener_agregados_operaciones.
+    """
+    query, params = _consulta_lista_agregados(usuario_id, operador, por_dia, desde, hasta)
+    async with conexion_async() as conn:
+        filas = await conn.fetch(_sql_preparado(query), *params)
+    return [dict(fila) for fila in filas]
+
+
+# === HISTORIAL ===
+
+async def guardar_en_historial(usuario_id, fecha_hora, descripcion):
+    """
+    Guarda una entrada de historial en la base de datos.
+    """
+    async with conexion_async() as conn:
+        await conn.execute(
+            _sql_preparado(SENTENCIAS["guardar_historial"][1]), usuario_id, fecha_hora, descripcion
+        )
+
+
+async def guardar_en_historial_lote(filas):
+    """
+    Guarda varias entradas de historial (tuplas (usuario_id, fecha_hora, descripcion))
+    en una sola transacción. Retorna el número de filas insertadas.
+    """
+    if not filas:
+        return 0
+    async with conexion_async() as conn:
+        async with conn.transaction():
+            await conn.executemany(_sql_preparado(SENTENCIAS["guardar_historial"][1]), filas)
+    return len(filas)
+
+
+async def obtener_historial(usuario_id=None, horas_limite=24):
+    """
+    Obtiene el historial de las últimas horas_limite para un usuario específico o todos.
+    Retorna una lista de diccionarios como models.obtener_historial.
+    """
+    fecha_limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
+
+    if usuario_id is not None:
+        nombre, params = "historial_usuario", (fecha_limite, usuario_id)
+    else:
+        nombre, params = "historial_todos", (fecha_limite,)
+
+    async with conexion_async() as conn:
+        filas = await conn.fetch(_sql_preparado(SENTENCIAS[nombre][1]), *params)
+    return [dict(fila) for fila in filas]
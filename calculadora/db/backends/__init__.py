@@ -0,0 +1,70 @@
+# calculadora/db/backends/__init__.py
+
+"""
+Backends de almacenamiento intercambiables para calculadora/db/models.py.
+
+    postgres: PostgreSQL (por defecto), con el pool de calculadora/db/connection.py
+    sqlite:   fichero SQLite local en modo WAL, para instalaciones de un solo nodo
+    memoria:  estructuras en memoria del proceso, sin persistencia (pruebas y benchmarks)
+
+Variables de entorno:
+    CALCULADORA_BACKEND: 'postgres', 'sqlite' o 'memoria'
+    CALCULADORA_SQLITE_RUTA: fichero de la base de datos SQLite (por defecto 'calculadora.db')
+"""
+
+import importlib
+import os
+import threading
+
+# nombre -> (módulo, clase); se importan al elegirse para no cargar drivers innecesarios
+BACKENDS = {
+    "postgres": ("calculadora.db.backends.postgres", "BackendPostgres"),
+    "sqlite": ("calculadora.db.backends.sqlite", "BackendSQLite"),
+    "memoria": ("calculadora.db.backends.memoria", "BackendMemoria"),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def crear_backend(nombre, **opciones):
+    """Crea una instancia del backend 'nombre'."""
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de almacenamiento desconocido: {nombre}")
+    modulo, clase = BACKENDS[nombre]
+    return getattr(importlib.import_module(modulo), clase)(**opciones)
+
+
+def obtener_backend():
+    """
+    Retorna el backend global, creándolo la primera vez según CALCULADORA_BACKEND.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = crear_backend(os.getenv("CALCULADORA_BACKEND", "postgres"))
+    return _backend
+
+
+def configurar_backend(nombre, **opciones):
+    """
+    Sustituye el backend global (por ejemplo, 'memoria' en pruebas o benchmarks).
+    Cierra el anterior y retorna el nuevo.
+    """
+    global _backend
+    nuevo = crear_backend(nombre, **opciones)
+    with _backend_lock:
+        anterior, _backend = _backend, nuevo
+    if anterior is not None:
+        anterior.cerrar()
+    return nuevo
+
+
+def cerrar_backend():
+    """Cierra el backend global."""
+    global _backend
+    with _backend_lock:
+        anterior, _backend = _backend, None
+    if anterior is not None:
+        anterior.cerrar()
@@ -0,0 +1,153 @@
+# calculadora/db/backends/base.py
+
+"""
+Interfaz común de los backends de almacenamiento.
+"""
+
+# Columnas de la tabla 'operaciones', en el orden de SELECT *
+COLUMNAS_OPERACIONES = [
+    "id", "usuario_id", "operando1", "operador", "operando2", "resultado", "creado_en", "expresion"
+]
+
+# Columnas de las operaciones unidas con el nombre de usuario
+COLUMNAS_OPERACIONES_UNIDAS = [
+    "operacion_id", "usuario_id", "usuario", "operando1",
+    "operador", "operando2", "resultado", "operacion_creado_en"
+]
+
+# Columnas de 'operaciones_matriciales' (operandos y resultado en formato .npy)
+COLUMNAS_OPERACIONES_MATRICIALES = [
+    "id", "usuario_id", "operador", "operando1", "operando2", "resultado", "creado_en"
+]
+
+# Columnas de una entrada de historial con el nombre de usuario
+COLUMNAS_HISTORIAL = ["id", "usuario_id", "usuario_nombre", "fecha_hora", "descripcion"]
+
+COLUMNAS_USUARIOS = ["id", "nombre", "es_superusuario", "creado_en"]
+
+
+def comprobar_iteracion(formato, por_lotes, formato_dicts="dicts"):
+    """Los formatos columnares solo tienen sentido al leer por lotes."""
+    if formato != formato_dicts and not por_lotes:
+        raise ValueError("Los formatos columnares solo pueden leerse por lotes (por_lotes=True).")
+
+
+class BackendAlmacenamiento:
+    """
+    Almacenamiento de usuarios, operaciones e historial.
+
+    Cada método recibe los mismos parámetros y retorna lo mismo que la función
+    homónima de calculadora/db/models.py, que delega en el backend configurado.
+    """
+    nombre = None
+
+    # Si es True, models.py ejecuta su propia implementación (PostgreSQL)
+    usa_models = False
+
+    def crear_tablas(self):
+        raise NotImplementedError
+
+    def mantener_historial(self):
+        raise NotImplementedError
+
+    # === USUARIOS ===
+
+    def insertar_usuario(self, nombre, password, es_superusuario=False):
+        raise NotImplementedError
+
+    def obtener_usuario_por_nombre(self, nombre):
+        raise NotImplementedError
+
+    def obtener_usuario_por_id(self, usuario_id):
+        raise NotImplementedError
+
+    def obtener_todos_usuarios(self):
+        raise NotImplementedError
+
+    def marcar_superusuario(self, usuario_id):
+        raise NotImplementedError
+
+    # === OPERACIONES ===
+
+    def insertar_operacion(self, usuario_id, operando1, operador, operando2, resultado):
+        raise NotImplementedError
+
+    def insertar_operaciones_lote(self, filas):
+        raise NotImplementedError
+
+    def obtener_operaciones(self, usuario_id=None, operando=None, operador=None, formato="dicts"):
+        raise NotImplementedError
+
+    def hay_operaciones(self, usuario_id=None):
+        raise NotImplementedError
+
+    def iterar_operaciones(self, usuario_id=None, operando=None, operador=None,
+                           tamano_lote=None, por_lotes=False, formato="dicts"):
+        raise NotImplementedError
+
+    def obtener_pagina_operaciones(self, usuario_id=None, operador=None, tamano_pagina=None,
+                                   cursor=None, formato="dicts"):
+        raise NotImplementedError
+
+    def consultar_operaciones(self, usuario_id=None, operador=None, desde=None, hasta=None, columnas=None,
+                              ascendente=False, tamano_pagina=None, cursor=None, con_totales=True,
+                              formato="dicts"):
+        raise NotImplementedError
+
+    def resumen_operaciones(self, usuario_id=None, operador=None):
+        raise NotImplementedError
+
+    def obtener_agregados_operaciones(self, usuario_id=None, operador=None, por_dia=False, desde=None, hasta=None):
+        raise NotImplementedError
+
+    def estadisticas_resultados(self, usuario_id=None, operador=None, percentiles=(25, 50, 75, 90, 99)):
+        raise NotImplementedError
+
+    def rango_ids_operaciones(self):
+        raise NotImplementedError
+
+    def obtener_operaciones_por_ids(self, desde_id, hasta_id, formato="dicts"):
+        raise NotImplementedError
+
+    def insertar_operacion_matricial(self, usuario_id, operando1, operador, operando2, resultado):
+        raise NotImplementedError
+
+    def obtener_operaciones_matriciales(self, usuario_id=None, operador=None):
+        raise NotImplementedError
+
+    def obtener_todas_las_operaciones_unidas(self, formato="dicts"):
+        raise NotImplementedError
+
+    def iterar_todas_las_operaciones_unidas(self, tamano_lote=None, por_lotes=False, formato="dicts"):
+        raise NotImplementedError
+
+    # === ANALÍTICA ===
+
+    def actualizar_analitica(self, reconstruir=False):
+        raise NotImplementedError
+
+    def estado_analitica(self):
+        raise NotImplementedError
+
+    def obtener_analitica_por_hora(self, desde=None, hasta=None):
+        raise NotImplementedError
+
+    def obtener_analitica_por_usuario(self, limite=None):
+        raise NotImplementedError
+
+    # === HISTORIAL ===
+
+    def guardar_en_historial(self, usuario_id, fecha_hora, descripcion):
+        raise NotImplementedError
+
+    def guardar_en_historial_lote(self, filas):
+        raise NotImplementedError
+
+    def obtener_historial(self, usuario_id=None, horas_limite=24):
+        raise NotImplementedError
+
+    def limpiar_historial_antiguo(self, horas_limite=24):
+        raise NotImplementedError
+
+    def cerrar(self):
+        """Libera los recursos del backend (conexiones, ficheros...)."""
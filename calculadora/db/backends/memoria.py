@@ -0,0 +1,383 @@
+# calculadora/db/backends/memoria.py
+
+"""
+Backend en memoria: listas y diccionarios de Python protegidos por un lock.
+
+No persiste nada ni necesita servidor; sirve para pruebas y benchmarks que solo
+quieren medir la lógica de la aplicación. Respeta los mismos filtros, órdenes y
+formatos de resultado que models.py.
+"""
+
+import datetime
+import itertools
+import threading
+
+from calculadora.core.estadisticas import PERCENTILES, resumen_estadistico
+from calculadora.core.matrices import a_bytes
+from calculadora.db.backends.base import (
+    BackendAlmacenamiento,
+    comprobar_iteracion,
+    COLUMNAS_OPERACIONES,
+    COLUMNAS_OPERACIONES_UNIDAS,
+    COLUMNAS_OPERACIONES_MATRICIALES,
+    COLUMNAS_HISTORIAL,
+    COLUMNAS_USUARIOS
+)
+from calculadora.db.models import (
+    _convertir_filas,
+    _codificar_cursor,
+    _decodificar_cursor,
+    _fila_matricial,
+    _resultado_consulta,
+    TAMANO_LOTE_STREAMING,
+    TAMANO_PAGINA,
+    FORMATO_DICTS
+)
+
+class BackendMemoria(BackendAlmacenamiento):
+    nombre = "memoria"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._usuarios = {}             # id -> [id, nombre, password, es_superusuario, creado_en]
+        self._usuarios_por_nombre = {}  # nombre -> id
+        self._operaciones = []          # tuplas en el orden de COLUMNAS_OPERACIONES (por id)
+        self._historial = []            # tuplas (id, usuario_id, fecha_hora, descripcion)
+        self._matriciales = []          # tuplas según COLUMNAS_OPERACIONES_MATRICIALES (arrays en .npy)
+        # (usuario_id, operador, dia) -> [cantidad, suma, minimo, maximo], actualizado al insertar
+        self._agregados = {}
+        # Resúmenes analíticos hasta la marca de agua (ver actualizar_analitica)
+        self._analitica_hora = {}     # (hora, operador) -> [cantidad, suma, minimo, maximo]
+        self._analitica_usuario = {}  # usuario_id -> [cantidad, suma, primera, ultima]
+        self._analitica_marca = [0, None]  # [ultimo_id, actualizado_en]
+        self._ids = {tabla: itertools.count(1) for tabla in ("usuarios", "operaciones", "historial", "matriciales")}
+
+    def crear_tablas(self):
+        return []
+
+    def mantener_historial(self):
+        return []
+
+    # === USUARIOS ===
+
+    def insertar_usuario(self, nombre, password, es_superusuario=False):
+        with self._lock:
+            if nombre in self._usuarios_por_nombre:
+                raise ValueError(f"Ya existe un usuario con el nombre '{nombre}'.")
+            usuario_id = next(self._ids["usuarios"])
+            self._usuarios[usuario_id] = [
+                usuario_id, nombre, password, bool(es_superusuario), datetime.datetime.now()
+            ]
+            self._usuarios_por_nombre[nombre] = usuario_id
+        return usuario_id
+
+    def obtener_usuario_por_nombre(self, nombre):
+        with self._lock:
+            usuario_id = self._usuarios_por_nombre.get(nombre)
+            return self.obtener_usuario_por_id(usuario_id) if usuario_id is not None else None
+
+    def obtener_usuario_por_id(self, usuario_id):
+        with self._lock:
+            usuario = self._usuarios.get(usuario_id)
+            return tuple(usuario[:4]) if usuario is not None else None
+
+    def obtener_todos_usuarios(self):
+        with self._lock:
+            return [
+                dict(zip(COLUMNAS_USUARIOS, (u[0], u[1], u[3], u[4])))
+                for _, u in sorted(self._usuarios.items())
+            ]
+
+    def marcar_superusuario(self, usuario_id):
+        with self._lock:
+            if usuario_id in self._usuarios:
+                self._usuarios[usuario_id][3] = True
+
+    # === OPERACIONES ===
+
+    def insertar_operacion(self, usuario_id, operando1, operador, operando2, resultado):
+        self.insertar_operaciones_lote(
+            [(usuario_id, operando1, operador, operando2, resultado, datetime.datetime.now(), None)]
+        )
+
+    def insertar_operaciones_lote(self, filas):
+        with self._lock:
+            # Todo o nada, como la transacción de los otros backends: se valida el
+            # lote entero antes de guardar ninguna fila
+            for usuario_id, *_, creado_en, _ in filas:
+                if usuario_id not in self._usuarios:
+                    raise ValueError(f"No existe el usuario con ID {usuario_id}.")
+                if creado_en is None:
+                    raise ValueError("La fecha de creación de la operación es obligatoria.")
+            for usuario_id, operando1, operador, operando2, resultado, creado_en, expresion in filas:
+                self._operaciones.append((
+                    next(self._ids["operaciones"]), usuario_id, operando1,
+                    operador, operando2, resultado, creado_en, expresion
+                ))
+                resultado = float(resultado)
+                clave = (usuario_id, operador, creado_en.date())
+                agregado = self._agregados.get(clave)
+                if agregado is None:
+                    self._agregados[clave] = [1, resultado, resultado, resultado]
+                else:
+                    agregado[0] += 1
+                    agregado[1] += resultado
+                    agregado[2] = min(agregado[2], resultado)
+                    agregado[3] = max(agregado[3], resultado)
+        return len(filas)
+
+    def _filtrar(self, usuario_id=None, operando=None, operador=None):
+        """Copia de las operaciones que cumplen los filtros (en orden de id)."""
+        with self._lock:
+            return [
+                op for op in self._operaciones
+                if (usuario_id is None or op[1] == usuario_id)
+                and (operando is None or op[2] == operando or op[4] == operando)
+                and (operador is None or op[3] == operador)
+            ]
+
+    def obtener_operaciones(self, usuario_id=None, operando=None, operador=None, formato=FORMATO_DICTS):
+        return _convertir_filas(self._filtrar(usuario_id, operando, operador), COLUMNAS_OPERACIONES, formato)
+
+    def hay_operaciones(self, usuario_id=None):
+        with self._lock:
+            return any(usuario_id is None or op[1] == usuario_id for op in self._operaciones)
+
+    def _iterar(self, filas, cols, tamano_lote, por_lotes, formato):
+        for i in range(0, len(filas), tamano_lote):
+            lote = _convertir_filas(filas[i:i + tamano_lote], cols, formato)
+            if por_lotes:
+                yield lote
+            else:
+                yield from lote
+
+    def iterar_operaciones(self, usuario_id=None, operando=None, operador=None,
+                           tamano_lote=TAMANO_LOTE_STREAMING, por_lotes=False, formato=FORMATO_DICTS):
+        comprobar_iteracion(formato, por_lotes)
+        filas = self._filtrar(usuario_id, operando, operador)
+        return self._iterar(filas, COLUMNAS_OPERACIONES, tamano_lote, por_lotes, formato)
+
+    def obtener_pagina_operaciones(self, usuario_id=None, operador=None, tamano_pagina=TAMANO_PAGINA,
+                                   cursor=None, formato=FORMATO_DICTS):
+        filas = self._filtrar(usuario_id=usuario_id, operador=operador)
+        if cursor is not None:
+            posicion = _decodificar_cursor(cursor)
+            filas = [op for op in filas if (op[6], op[0]) < posicion]
+        filas.sort(key=lambda op: (op[6], op[0]), reverse=True)
+
+        siguiente_cursor = None
+        if len(filas) > tamano_pagina:
+            ultima = filas[tamano_pagina - 1]
+            siguiente_cursor = _codificar_cursor(ultima[6], ultima[0])
+        operaciones = _convertir_filas(filas[:tamano_pagina], COLUMNAS_OPERACIONES, formato)
+        return {"operaciones": operaciones, "siguiente_cursor": siguiente_cursor}
+
+    def consultar_operaciones(self, usuario_id=None, operador=None, desde=None, hasta=None, columnas=None,
+                              ascendente=False, tamano_pagina=TAMANO_PAGINA, cursor=None, con_totales=True,
+                              formato=FORMATO_DICTS):
+        filas = [
+            op for op in self._filtrar(usuario_id=usuario_id, operador=operador)
+            if (desde is None or op[6] >= desde) and (hasta is None or op[6] < hasta)
+        ]
+        totales = None
+        if con_totales and desde is None and hasta is None:
+            totales = self.resumen_operaciones(usuario_id=usuario_id, operador=operador)
+        elif con_totales:
+            resultados = [op[5] for op in filas]
+            totales = {
+                "cantidad": len(resultados),
+                "total": float(sum(resultados)),
+                "minimo": min(resultados, default=None),
+                "maximo": max(resultados, default=None),
+            }
+
+        if cursor is not None:
+            posicion = _decodificar_cursor(cursor)
+            if ascendente:
+                filas = [op for op in filas if (op[6], op[0]) > posicion]
+            else:
+                filas = [op for op in filas if (op[6], op[0]) < posicion]
+        filas.sort(key=lambda op: (op[6], op[0]), reverse=not ascendente)
+        return _resultado_consulta(filas[:tamano_pagina + 1], COLUMNAS_OPERACIONES, columnas, tamano_pagina,
+                                   formato, totales)
+
+    def obtener_agregados_operaciones(self, usuario_id=None, operador=None, por_dia=False, desde=None, hasta=None):
+        grupos = {}
+        with self._lock:
+            for (usuario, op, dia), (cantidad, suma, minimo, maximo) in self._agregados.items():
+                if ((usuario_id is not None and usuario != usuario_id)
+                        or (operador is not None and op != operador)
+                        or (desde is not None and dia < desde)
+                        or (hasta is not None and dia > hasta)):
+                    continue
+                clave = (usuario, op, dia) if por_dia else (usuario, op)
+                grupo = grupos.get(clave)
+                if grupo is None:
+                    grupos[clave] = [cantidad, suma, minimo, maximo]
+                else:
+                    grupo[0] += cantidad
+                    grupo[1] += suma
+                    grupo[2] = min(grupo[2], minimo)
+                    grupo[3] = max(grupo[3], maximo)
+
+        claves = ["usuario_id", "operador", "dia"] if por_dia else ["usuario_id", "operador"]
+        return [
+            dict(zip(claves + ["cantidad", "suma", "minimo", "maximo"], clave + tuple(valores)))
+            for clave, valores in sorted(grupos.items())
+        ]
+
+    def resumen_operaciones(self, usuario_id=None, operador=None):
+        grupos = self.obtener_agregados_operaciones(usuario_id=usuario_id, operador=operador)
+        return {
+            "cantidad": sum(g["cantidad"] for g in grupos),
+            "total": float(sum(g["suma"] for g in grupos)),
+            "minimo": min((g["minimo"] for g in grupos), default=None),
+            "maximo": max((g["maximo"] for g in grupos), default=None),
+        }
+
+    def estadisticas_resultados(self, usuario_id=None, operador=None, percentiles=PERCENTILES):
+        filas = self._filtrar(usuario_id=usuario_id, operador=operador)
+        if not filas:
+            return None
+        return resumen_estadistico([op[5] for op in filas], percentiles)
+
+    # === ANALÍTICA ===
+
+    def actualizar_analitica(self, reconstruir=False):
+        with self._lock:
+            desde_id = 0 if reconstruir else self._analitica_marca[0]
+            if reconstruir:
+                self._analitica_hora.clear()
+                self._analitica_usuario.clear()
+            # Los ids son consecutivos desde 1 y no se borran: la posición desde_id es el id desde_id + 1
+            for op_id, usuario_id, _, operador, _, resultado, creado_en, _ in self._operaciones[desde_id:]:
+                resultado = float(resultado)
+                clave = (creado_en.replace(minute=0, second=0, microsecond=0), operador)
+                grupo = self._analitica_hora.get(clave)
+                if grupo is None:
+                    self._analitica_hora[clave] = [1, resultado, resultado, resultado]
+                else:
+                    grupo[0] += 1
+                    grupo[1] += resultado
+                    grupo[2] = min(grupo[2], resultado)
+                    grupo[3] = max(grupo[3], resultado)
+                grupo = self._analitica_usuario.get(usuario_id)
+                if grupo is None:
+                    self._analitica_usuario[usuario_id] = [1, resultado, creado_en, creado_en]
+                else:
+                    grupo[0] += 1
+                    grupo[1] += resultado
+                    grupo[2] = min(grupo[2], creado_en)
+                    grupo[3] = max(grupo[3], creado_en)
+            hasta_id = self._operaciones[-1][0] if self._operaciones else desde_id
+            self._analitica_marca = [hasta_id, datetime.datetime.now()]
+        return {"desde_id": desde_id, "hasta_id": hasta_id}
+
+    def estado_analitica(self):
+        with self._lock:
+            ultimo_id, actualizado_en = self._analitica_marca
+            return {"ultimo_id": ultimo_id, "actualizado_en": actualizado_en,
+                    "pendientes": len(self._operaciones) - ultimo_id}
+
+    def obtener_analitica_por_hora(self, desde=None, hasta=None):
+        with self._lock:
+            grupos = [
+                (clave, list(valores)) for clave, valores in self._analitica_hora.items()
+                if (desde is None or clave[0] >= desde) and (hasta is None or clave[0] < hasta)
+            ]
+        return [
+            dict(zip(("hora", "operador", "cantidad", "suma", "minimo", "maximo"), clave + tuple(valores)))
+            for clave, valores in sorted(grupos)
+        ]
+
+    def obtener_analitica_por_usuario(self, limite=None):
+        with self._lock:
+            filas = [
+                (usuario_id, self._usuarios[usuario_id][1], *valores)
+                for usuario_id, valores in self._analitica_usuario.items()
+            ]
+        filas.sort(key=lambda fila: (-fila[2], fila[0]))
+        return [
+            dict(zip(("usuario_id", "nombre", "cantidad", "suma", "primera", "ultima"), fila))
+            for fila in filas[:limite]
+        ]
+
+    def insertar_operacion_matricial(self, usuario_id, operando1, operador, operando2, resultado):
+        with self._lock:
+            if usuario_id not in self._usuarios:
+                raise ValueError(f"No existe el usuario con ID {usuario_id}.")
+            operacion_id = next(self._ids["matriciales"])
+            self._matriciales.append((
+                operacion_id, usuario_id, operador, a_bytes(operando1), a_bytes(operando2),
+                a_bytes(resultado), datetime.datetime.now()
+            ))
+        return operacion_id
+
+    def obtener_operaciones_matriciales(self, usuario_id=None, operador=None):
+        with self._lock:
+            filas = [
+                op for op in self._matriciales
+                if (usuario_id is None or op[1] == usuario_id) and (operador is None or op[2] == operador)
+            ]
+        filas.sort(key=lambda op: (op[6], op[0]), reverse=True)
+        return [_fila_matricial(op, COLUMNAS_OPERACIONES_MATRICIALES) for op in filas]
+
+    def _operaciones_unidas(self):
+        with self._lock:
+            return [
+                (op[0], op[1], self._usuarios[op[1]][1], op[2], op[3], op[4], op[5], op[6])
+                for op in self._operaciones
+            ]
+
+    def rango_ids_operaciones(self):
+        with self._lock:
+            if not self._operaciones:
+                return None, None
+            return self._operaciones[0][0], self._operaciones[-1][0]
+
+    def obtener_operaciones_por_ids(self, desde_id, hasta_id, formato=FORMATO_DICTS):
+        with self._lock:
+            filas = [op for op in self._operaciones if desde_id <= op[0] < hasta_id]
+        return _convertir_filas(filas, COLUMNAS_OPERACIONES, formato)
+
+    def obtener_todas_las_operaciones_unidas(self, formato=FORMATO_DICTS):
+        return _convertir_filas(self._operaciones_unidas(), COLUMNAS_OPERACIONES_UNIDAS, formato)
+
+    def iterar_todas_las_operaciones_unidas(self, tamano_lote=TAMANO_LOTE_STREAMING, por_lotes=False,
+                                            formato=FORMATO_DICTS):
+        comprobar_iteracion(formato, por_lotes)
+        return self._iterar(self._operaciones_unidas(), COLUMNAS_OPERACIONES_UNIDAS,
+                            tamano_lote, por_lotes, formato)
+
+    # === HISTORIAL ===
+
+    def guardar_en_historial(self, usuario_id, fecha_hora, descripcion):
+        self.guardar_en_historial_lote([(usuario_id, fecha_hora, descripcion)])
+
+    def guardar_en_historial_lote(self, filas):
+        with self._lock:
+            # Como la clave foránea de los otros backends: todo el lote o nada
+            for usuario_id, _, _ in filas:
+                if usuario_id not in self._usuarios:
+                    raise ValueError(f"No existe el usuario con ID {usuario_id}.")
+            for usuario_id, fecha_hora, descripcion in filas:
+                self._historial.append((next(self._ids["historial"]), usuario_id, fecha_hora, descripcion))
+        return len(filas)
+
+    def obtener_historial(self, usuario_id=None, horas_limite=24):
+        fecha_limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
+        with self._lock:
+            filas = [
+                (h[0], h[1], self._usuarios[h[1]][1], h[2], h[3])
+                for h in self._historial
+                if h[2] > fecha_limite and (usuario_id is None or h[1] == usuario_id)
+            ]
+        filas.sort(key=lambda h: h[3], reverse=True)
+        return [dict(zip(COLUMNAS_HISTORIAL, fila)) for fila in filas]
+
+    def limpiar_historial_antiguo(self, horas_limite=24):
+        fecha_limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
+        with self._lock:
+            antes = len(self._historial)
+            self._historial = [h for h in self._historial if h[2] >= fecha_limite]
+            return antes - len(self._historial)
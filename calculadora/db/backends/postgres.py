@@ -0,0 +1,35 @@
+# calculadora/db/backends/postgres.py
+
+"""
+Backend PostgreSQL: es la implementación de calculadora/db/models.py.
+"""
+
+from calculadora.db.backends.base import BackendAlmacenamiento
+from calculadora.db.connection import cerrar_pool
+
+
+class BackendPostgres(BackendAlmacenamiento):
+    """
+    Las funciones de models.py ejecutan directamente su SQL de PostgreSQL cuando
+    este es el backend activo; los métodos de esta clase llaman a esas mismas
+    implementaciones para poder usarlo también a través de la interfaz.
+    """
+    nombre = "postgres"
+    usa_models = True
+
+    def cerrar(self):
+        cerrar_pool()
+
+
+def _delegar_en_models(nombre):
+    def metodo(self, *args, **kwargs):
+        from calculadora.db import models
+        return getattr(models, nombre).__wrapped__(*args, **kwargs)
+    metodo.__name__ = nombre
+    metodo.__doc__ = f"Ver calculadora.db.models.{nombre}."
+    return metodo
+
+
+for _nombre, _valor in vars(BackendAlmacenamiento).items():
+    if callable(_valor) and not _nombre.startswith("_") and _nombre != "cerrar":
+        setattr(BackendPostgres, _nombre, _delegar_en_models(_nombre))
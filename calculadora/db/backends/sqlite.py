@@ -0,0 +1,577 @@
+# calculadora/db/backends/sqlite.py
+
+"""
+Backend SQLite para instalaciones de un solo nodo.
+
+Usa un fichero local en modo WAL (lectores y escritor no se bloquean entre sí) con
+una conexión por hilo. Las consultas son las mismas que en models.py, cambiando los
+marcadores %s por ?; los tipos NUMERIC se guardan como REAL y las fechas como texto
+ISO de ancho fijo, de modo que se ordenan y comparan correctamente.
+"""
+
+import datetime
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from calculadora.core.estadisticas import PERCENTILES, resumen_estadistico
+from calculadora.core.matrices import a_bytes
+from calculadora.db.backends.base import (
+    BackendAlmacenamiento,
+    comprobar_iteracion,
+    COLUMNAS_USUARIOS
+)
+from calculadora.db.models import (
+    _consulta_analitica_por_hora,
+    _consulta_analitica_por_usuario,
+    _consulta_lista_agregados,
+    _consulta_operaciones,
+    _consulta_resumen,
+    _consulta_operaciones_unidas,
+    _consulta_pagina_con_totales,
+    _convertir_filas,
+    _codificar_cursor,
+    _decodificar_cursor,
+    _fila_matricial,
+    _resultado_consulta,
+    _sentencias_analitica,
+    _separar_totales,
+    TAMANO_LOTE_STREAMING,
+    TAMANO_PAGINA,
+    FORMATO_DICTS
+)
+from calculadora.db.sentencias import SENTENCIAS
+
+# Fechas como texto de ancho fijo (con microsegundos) y conversión de vuelta por tipo declarado
+sqlite3.register_adapter(datetime.datetime, lambda d: d.isoformat(" ", timespec="microseconds"))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.datetime.fromisoformat(b.decode()))
+sqlite3.register_adapter(datetime.date, lambda d: d.isoformat())
+sqlite3.register_converter("DATE", lambda b: datetime.date.fromisoformat(b.decode()))
+sqlite3.register_converter("BOOLEAN", lambda b: bool(int(b)))
+
+_AHORA = "(strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))"
+
+# Suma una fila a un grupo de agregados ('{tabla}' y las claves del grupo)
+_SUMAR_AGREGADO = """
+    INSERT INTO {tabla} ({claves}, cantidad, suma, minimo, maximo)
+    VALUES ({valores}, 1, NEW.resultado, NEW.resultado, NEW.resultado)
+    ON CONFLICT ({claves}) DO UPDATE SET
+        cantidad = cantidad + 1,
+        suma = suma + excluded.suma,
+        minimo = MIN(minimo, excluded.minimo),
+        maximo = MAX(maximo, excluded.maximo);
+"""
+
+# Recalcula desde 'operaciones' el grupo de una fila borrada (si queda vacío, no se inserta)
+_RECALCULAR_AGREGADO = """
+    DELETE FROM {tabla} WHERE ({claves}) = ({valores});
+    INSERT INTO {tabla} ({claves}, cantidad, suma, minimo, maximo)
+    SELECT {valores}, COUNT(*), SUM(resultado), MIN(resultado), MAX(resultado)
+    FROM operaciones
+    WHERE {filtro}
+    GROUP BY usuario_id;
+"""
+
+_DIA = "substr({}.creado_en, 1, 10)"
+
+_GRUPOS_AGREGADOS = [
+    # (tabla, claves, valores de la fila, filtro de las operaciones del grupo)
+    ("agregados_operaciones", "usuario_id, operador", "OLD.usuario_id, OLD.operador",
+     "usuario_id = OLD.usuario_id AND operador = OLD.operador"),
+    ("agregados_operaciones_diarios", "usuario_id, operador, dia",
+     f"OLD.usuario_id, OLD.operador, {_DIA.format('OLD')}",
+     f"usuario_id = OLD.usuario_id AND operador = OLD.operador AND {_DIA.format('operaciones')} = {_DIA.format('OLD')}"),
+]
+
+# (version, [sentencias]); la versión aplicada se guarda en PRAGMA user_version
+MIGRACIONES_SQLITE = [
+    (1, [
+        f"""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            password TEXT NOT NULL,
+            es_superusuario BOOLEAN DEFAULT 0,
+            creado_en TIMESTAMP DEFAULT {_AHORA}
+        );
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS operaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            operando1 REAL NOT NULL,
+            operador TEXT NOT NULL,
+            operando2 REAL NOT NULL,
+            resultado REAL NOT NULL,
+            creado_en TIMESTAMP DEFAULT {_AHORA}
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS historial_memoria (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            fecha_hora TIMESTAMP NOT NULL,
+            descripcion TEXT NOT NULL
+        );
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_nombre ON usuarios (nombre);",
+        "CREATE INDEX IF NOT EXISTS idx_operaciones_usuario_operador_creado ON operaciones (usuario_id, operador, creado_en);",
+        "CREATE INDEX IF NOT EXISTS idx_operaciones_usuario_creado_id ON operaciones (usuario_id, creado_en, id);",
+        "CREATE INDEX IF NOT EXISTS idx_operaciones_operador_creado_id ON operaciones (operador, creado_en, id);",
+        "CREATE INDEX IF NOT EXISTS idx_historial_usuario_fecha ON historial_memoria (usuario_id, fecha_hora);",
+        "CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial_memoria (fecha_hora);",
+    ]),
+    (2, [
+        "ALTER TABLE operaciones ADD COLUMN expresion TEXT;",
+    ]),
+    (3, [
+        """
+        CREATE TABLE agregados_operaciones (
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            operador TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            suma REAL NOT NULL,
+            minimo REAL NOT NULL,
+            maximo REAL NOT NULL,
+            PRIMARY KEY (usuario_id, operador)
+        );
+        """,
+        """
+        CREATE TABLE agregados_operaciones_diarios (
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            operador TEXT NOT NULL,
+            dia DATE NOT NULL,
+            cantidad INTEGER NOT NULL,
+            suma REAL NOT NULL,
+            minimo REAL NOT NULL,
+            maximo REAL NOT NULL,
+            PRIMARY KEY (usuario_id, operador, dia)
+        );
+        """,
+        "CREATE INDEX idx_agregados_diarios_dia ON agregados_operaciones_diarios (dia);",
+        # SQLite solo tiene triggers por fila
+        f"""
+        CREATE TRIGGER trg_operaciones_agregados_insert AFTER INSERT ON operaciones
+        BEGIN
+            {_SUMAR_AGREGADO.format(tabla="agregados_operaciones", claves="usuario_id, operador",
+                                    valores="NEW.usuario_id, NEW.operador")}
+            {_SUMAR_AGREGADO.format(tabla="agregados_operaciones_diarios", claves="usuario_id, operador, dia",
+                                    valores=f"NEW.usuario_id, NEW.operador, {_DIA.format('NEW')}")}
+        END;
+        """,
+        f"""
+        CREATE TRIGGER trg_operaciones_agregados_delete AFTER DELETE ON operaciones
+        BEGIN
+            {"".join(_RECALCULAR_AGREGADO.format(tabla=t, claves=c, valores=v, filtro=f)
+                     for t, c, v, f in _GRUPOS_AGREGADOS)}
+        END;
+        """,
+        """
+        INSERT INTO agregados_operaciones (usuario_id, operador, cantidad, suma, minimo, maximo)
+        SELECT usuario_id, operador, COUNT(*), SUM(resultado), MIN(resultado), MAX(resultado)
+        FROM operaciones
+        GROUP BY usuario_id, operador;
+        """,
+        """
+        INSERT INTO agregados_operaciones_diarios (usuario_id, operador, dia, cantidad, suma, minimo, maximo)
+        SELECT usuario_id, operador, substr(creado_en, 1, 10), COUNT(*), SUM(resultado),
+               MIN(resultado), MAX(resultado)
+        FROM operaciones
+        GROUP BY usuario_id, operador, substr(creado_en, 1, 10);
+        """,
+    ]),
+    (4, [
+        f"""
+        CREATE TABLE operaciones_matriciales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            operador TEXT NOT NULL,
+            operando1 BLOB NOT NULL,
+            operando2 BLOB,
+            resultado BLOB NOT NULL,
+            creado_en TIMESTAMP DEFAULT {_AHORA}
+        );
+        """,
+        "CREATE INDEX idx_operaciones_matriciales_usuario_creado ON operaciones_matriciales (usuario_id, creado_en);",
+    ]),
+    (5, [
+        """
+        CREATE TABLE analitica_por_hora (
+            hora TIMESTAMP NOT NULL,
+            operador TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            suma REAL NOT NULL,
+            minimo REAL NOT NULL,
+            maximo REAL NOT NULL,
+            PRIMARY KEY (hora, operador)
+        );
+        """,
+        """
+        CREATE TABLE analitica_por_usuario (
+            usuario_id INTEGER PRIMARY KEY REFERENCES usuarios(id),
+            cantidad INTEGER NOT NULL,
+            suma REAL NOT NULL,
+            primera TIMESTAMP NOT NULL,
+            ultima TIMESTAMP NOT NULL
+        );
+        """,
+        """
+        CREATE TABLE analitica_marca (
+            unica BOOLEAN PRIMARY KEY DEFAULT 1 CHECK (unica),
+            ultimo_id INTEGER NOT NULL DEFAULT 0,
+            actualizado_en TIMESTAMP
+        );
+        """,
+        "INSERT INTO analitica_marca (ultimo_id) VALUES (0);",
+    ]),
+    # SQLite no puede añadir NOT NULL a una columna existente: triggers equivalentes
+    (6, [
+        """
+        UPDATE operaciones
+        SET creado_en = COALESCE((SELECT u.creado_en FROM usuarios u WHERE u.id = operaciones.usuario_id),
+                                 strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+        WHERE creado_en IS NULL;
+        """,
+        """
+        CREATE TRIGGER trg_operaciones_creado_en_insert BEFORE INSERT ON operaciones
+        WHEN NEW.creado_en IS NULL
+        BEGIN
+            SELECT RAISE(ABORT, 'NOT NULL constraint failed: operaciones.creado_en');
+        END;
+        """,
+        """
+        CREATE TRIGGER trg_operaciones_creado_en_update BEFORE UPDATE OF creado_en ON operaciones
+        WHEN NEW.creado_en IS NULL
+        BEGIN
+            SELECT RAISE(ABORT, 'NOT NULL constraint failed: operaciones.creado_en');
+        END;
+        """,
+    ]),
+]
+
+# Resúmenes analíticos: hora truncada como texto ISO y MIN/MAX escalares de SQLite
+_SENTENCIAS_ANALITICA = _sentencias_analitica(hora="substr(creado_en, 1, 13) || ':00:00'", menor="MIN", mayor="MAX")
+
+
+def _sql(query):
+    """Adapta una consulta de models.py (marcadores %s) a sqlite3."""
+    return query.replace("%s", "?")
+
+
+class BackendSQLite(BackendAlmacenamiento):
+    nombre = "sqlite"
+
+    def __init__(self, ruta=None):
+        """
+        Args:
+            ruta: Fichero de la base de datos (por defecto CALCULADORA_SQLITE_RUTA o 'calculadora.db').
+                  Debe ser un fichero: cada hilo abre su propia conexión.
+        """
+        self.ruta = ruta or os.getenv("CALCULADORA_SQLITE_RUTA", "calculadora.db")
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        conn = sqlite3.connect(
+            self.ruta,
+            timeout=30,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL;")
+        # En modo WAL, NORMAL solo sincroniza el disco en los checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        return conn
+
+    def _conexion(self):
+        """Conexión del hilo actual (se abre la primera vez)."""
+        conn = getattr(self._local, "conn", None)
+        # Tras un fork no se reutiliza la conexión del proceso padre
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._abrir()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            with self._lock:
+                self._conexiones.append(conn)
+        return conn
+
+    def _consultar(self, query, params=()):
+        conn = self._conexion()
+        with conn:
+            cur = conn.execute(_sql(query), params)
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+        return rows, cols
+
+    def _ejecutar(self, query, params=()):
+        conn = self._conexion()
+        with conn:
+            cur = conn.execute(_sql(query), params)
+        return cur
+
+    def crear_tablas(self):
+        conn = self._conexion()
+        version = conn.execute("PRAGMA user_version;").fetchone()[0]
+        aplicadas = []
+        for numero, sentencias in MIGRACIONES_SQLITE:
+            if numero <= version:
+                continue
+            # sqlite3 no abre su transacción implícita para el DDL: se abre a mano
+            # para que cada migración, con su user_version, entre entera o no entre
+            conn.execute("BEGIN;")
+            try:
+                for sentencia in sentencias:
+                    conn.execute(sentencia)
+                conn.execute(f"PRAGMA user_version = {numero};")
+                conn.execute("COMMIT;")
+            except BaseException:
+                conn.rollback()
+                raise
+            aplicadas.append(numero)
+        return aplicadas
+
+    def mantener_historial(self):
+        # Sin particiones: la limpieza es un DELETE por el índice de fecha
+        return []
+
+    # === USUARIOS ===
+
+    def insertar_usuario(self, nombre, password, es_superusuario=False):
+        return self._ejecutar("""
+            INSERT INTO usuarios (nombre, password, es_superusuario, creado_en)
+            VALUES (%s, %s, %s, %s);
+        """, (nombre, password, es_superusuario, datetime.datetime.now())).lastrowid
+
+    def obtener_usuario_por_nombre(self, nombre):
+        rows, _ = self._consultar(SENTENCIAS["usuario_por_nombre"][1], (nombre,))
+        return rows[0] if rows else None
+
+    def obtener_usuario_por_id(self, usuario_id):
+        rows, _ = self._consultar(
+            "SELECT id, nombre, password, es_superusuario FROM usuarios WHERE id = %s;", (usuario_id,)
+        )
+        return rows[0] if rows else None
+
+    def obtener_todos_usuarios(self):
+        rows, _ = self._consultar(f"SELECT {', '.join(COLUMNAS_USUARIOS)} FROM usuarios ORDER BY id;")
+        return [dict(zip(COLUMNAS_USUARIOS, row)) for row in rows]
+
+    def marcar_superusuario(self, usuario_id):
+        self._ejecutar("UPDATE usuarios SET es_superusuario = 1 WHERE id = %s;", (usuario_id,))
+
+    # === OPERACIONES ===
+
+    def insertar_operacion(self, usuario_id, operando1, operador, operando2, resultado):
+        self.insertar_operaciones_lote(
+            [(usuario_id, operando1, operador, operando2, resultado, datetime.datetime.now(), None)]
+        )
+
+    def insertar_operaciones_lote(self, filas):
+        if not filas:
+            return 0
+        conn = self._conexion()
+        with conn:
+            conn.executemany(_sql(SENTENCIAS["insertar_operacion_con_fecha"][1]), filas)
+        return len(filas)
+
+    def obtener_operaciones(self, usuario_id=None, operando=None, operador=None, formato=FORMATO_DICTS):
+        # Las columnas ya son REAL: no hace falta la proyección con conversiones de PostgreSQL
+        rows, cols = self._consultar(*_consulta_operaciones(usuario_id, operando, operador))
+        return _convertir_filas(rows, cols, formato)
+
+    def hay_operaciones(self, usuario_id=None):
+        if usuario_id is None:
+            rows, _ = self._consultar("SELECT EXISTS (SELECT 1 FROM operaciones);")
+        else:
+            rows, _ = self._consultar(
+                "SELECT EXISTS (SELECT 1 FROM operaciones WHERE usuario_id = %s);", (usuario_id,)
+            )
+        return bool(rows[0][0])
+
+    def _iterar(self, query, params, tamano_lote, por_lotes, formato):
+        # Conexión propia: el cursor queda abierto mientras se consume el generador
+        conn = self._abrir()
+        try:
+            cur = conn.execute(_sql(query), params)
+            cols = [desc[0] for desc in cur.description]
+            while True:
+                rows = cur.fetchmany(tamano_lote)
+                if not rows:
+                    break
+                lote = _convertir_filas(rows, cols, formato)
+                if por_lotes:
+                    yield lote
+                else:
+                    yield from lote
+        finally:
+            conn.close()
+
+    def iterar_operaciones(self, usuario_id=None, operando=None, operador=None,
+                           tamano_lote=TAMANO_LOTE_STREAMING, por_lotes=False, formato=FORMATO_DICTS):
+        comprobar_iteracion(formato, por_lotes)
+        query, params = _consulta_operaciones(usuario_id, operando, operador)
+        return self._iterar(query, params, tamano_lote, por_lotes, formato)
+
+    def obtener_pagina_operaciones(self, usuario_id=None, operador=None, tamano_pagina=TAMANO_PAGINA,
+                                   cursor=None, formato=FORMATO_DICTS):
+        query, params = _consulta_operaciones(usuario_id=usuario_id, operador=operador)
+        params = list(params)
+        if cursor is not None:
+            query += " AND" if params else " WHERE"
+            query += " (creado_en, id) < (%s, %s)"
+            params.extend(_decodificar_cursor(cursor))
+        query += " ORDER BY creado_en DESC, id DESC LIMIT %s;"
+        params.append(tamano_pagina + 1)
+
+        rows, cols = self._consultar(query, tuple(params))
+        siguiente_cursor = None
+        if len(rows) > tamano_pagina:
+            ultima = dict(zip(cols, rows[tamano_pagina - 1]))
+            siguiente_cursor = _codificar_cursor(ultima["creado_en"], ultima["id"])
+        operaciones = _convertir_filas(rows[:tamano_pagina], cols, formato)
+        return {"operaciones": operaciones, "siguiente_cursor": siguiente_cursor}
+
+    def consultar_operaciones(self, usuario_id=None, operador=None, desde=None, hasta=None, columnas=None,
+                              ascendente=False, tamano_pagina=TAMANO_PAGINA, cursor=None, con_totales=True,
+                              formato=FORMATO_DICTS):
+        rows, cols = self._consultar(*_consulta_pagina_con_totales(
+            usuario_id, operador, desde, hasta, columnas, ascendente, tamano_pagina, cursor, con_totales,
+            convertir=False
+        ))
+        totales = None
+        if con_totales:
+            rows, cols, totales = _separar_totales(rows, cols)
+        return _resultado_consulta(rows, cols, columnas, tamano_pagina, formato, totales)
+
+    def resumen_operaciones(self, usuario_id=None, operador=None):
+        rows, _ = self._consultar(*_consulta_resumen(usuario_id, operador, convertir=False))
+        cantidad, total, minimo, maximo = rows[0]
+        return {"cantidad": cantidad, "total": float(total), "minimo": minimo, "maximo": maximo}
+
+    def obtener_agregados_operaciones(self, usuario_id=None, operador=None, por_dia=False, desde=None, hasta=None):
+        rows, cols = self._consultar(
+            *_consulta_lista_agregados(usuario_id, operador, por_dia, desde, hasta, convertir=False)
+        )
+        agregados = [dict(zip(cols, row)) for row in rows]
+        if por_dia:
+            # 'dia' es una expresión agrupada: llega como texto
+            for agregado in agregados:
+                agregado["dia"] = datetime.date.fromisoformat(str(agregado["dia"]))
+        return agregados
+
+    def estadisticas_resultados(self, usuario_id=None, operador=None, percentiles=PERCENTILES):
+        # SQLite no tiene percentiles ni desviación típica: se calculan con NumPy
+        query, params = _consulta_operaciones(usuario_id=usuario_id, operador=operador)
+        rows, _ = self._consultar(query.replace("SELECT *", "SELECT resultado", 1), params)
+        if not rows:
+            return None
+        return resumen_estadistico(np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows)),
+                                   percentiles)
+
+    # === ANALÍTICA ===
+
+    def actualizar_analitica(self, reconstruir=False):
+        conn = self._conexion()
+        with conn:
+            # BEGIN IMMEDIATE toma el bloqueo de escritura: no hay inserciones a medias
+            conn.execute("BEGIN IMMEDIATE;")
+            desde_id = conn.execute("SELECT ultimo_id FROM analitica_marca;").fetchone()[0]
+            hasta_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM operaciones;").fetchone()[0]
+            if reconstruir:
+                conn.execute("DELETE FROM analitica_por_hora;")
+                conn.execute("DELETE FROM analitica_por_usuario;")
+                desde_id = 0
+            if hasta_id > desde_id:
+                for sentencia in _SENTENCIAS_ANALITICA:
+                    conn.execute(_sql(sentencia), (desde_id, hasta_id))
+            hasta_id = max(desde_id, hasta_id)
+            conn.execute("UPDATE analitica_marca SET ultimo_id = ?, actualizado_en = ?;",
+                         (hasta_id, datetime.datetime.now()))
+        return {"desde_id": desde_id, "hasta_id": hasta_id}
+
+    def estado_analitica(self):
+        rows, _ = self._consultar("""
+            SELECT m.ultimo_id, m.actualizado_en,
+                   (SELECT COUNT(*) FROM operaciones WHERE id > m.ultimo_id)
+            FROM analitica_marca m;
+        """)
+        ultimo_id, actualizado_en, pendientes = rows[0]
+        return {"ultimo_id": ultimo_id, "actualizado_en": actualizado_en, "pendientes": pendientes}
+
+    def obtener_analitica_por_hora(self, desde=None, hasta=None):
+        rows, cols = self._consultar(*_consulta_analitica_por_hora(desde, hasta, convertir=False))
+        return [dict(zip(cols, row)) for row in rows]
+
+    def obtener_analitica_por_usuario(self, limite=None):
+        rows, cols = self._consultar(*_consulta_analitica_por_usuario(limite, convertir=False))
+        return [dict(zip(cols, row)) for row in rows]
+
+    def insertar_operacion_matricial(self, usuario_id, operando1, operador, operando2, resultado):
+        return self._ejecutar("""
+            INSERT INTO operaciones_matriciales (usuario_id, operador, operando1, operando2, resultado, creado_en)
+            VALUES (%s, %s, %s, %s, %s, %s);
+        """, (usuario_id, operador, a_bytes(operando1), a_bytes(operando2), a_bytes(resultado),
+              datetime.datetime.now())).lastrowid
+
+    def obtener_operaciones_matriciales(self, usuario_id=None, operador=None):
+        query, params = _consulta_operaciones(usuario_id=usuario_id, operador=operador)
+        query = query.replace("FROM operaciones", "FROM operaciones_matriciales", 1)
+        rows, cols = self._consultar(query + " ORDER BY creado_en DESC, id DESC;", params)
+        return [_fila_matricial(row, cols) for row in rows]
+
+    def obtener_todas_las_operaciones_unidas(self, formato=FORMATO_DICTS):
+        rows, cols = self._consultar(_consulta_operaciones_unidas())
+        return _convertir_filas(rows, cols, formato)
+
+    def rango_ids_operaciones(self):
+        rows, _ = self._consultar("SELECT MIN(id), MAX(id) FROM operaciones;")
+        return rows[0]
+
+    def obtener_operaciones_por_ids(self, desde_id, hasta_id, formato=FORMATO_DICTS):
+        query, _ = _consulta_operaciones()
+        rows, cols = self._consultar(query + " WHERE id >= %s AND id < %s ORDER BY id;", (desde_id, hasta_id))
+        return _convertir_filas(rows, cols, formato)
+
+    def iterar_todas_las_operaciones_unidas(self, tamano_lote=TAMANO_LOTE_STREAMING, por_lotes=False,
+                                            formato=FORMATO_DICTS):
+        comprobar_iteracion(formato, por_lotes)
+        return self._iterar(_consulta_operaciones_unidas(), (), tamano_lote, por_lotes, formato)
+
+    # === HISTORIAL ===
+
+    def guardar_en_historial(self, usuario_id, fecha_hora, descripcion):
+        self.guardar_en_historial_lote([(usuario_id, fecha_hora, descripcion)])
+
+    def guardar_en_historial_lote(self, filas):
+        if not filas:
+            return 0
+        conn = self._conexion()
+        with conn:
+            conn.executemany(_sql(SENTENCIAS["guardar_historial"][1]), filas)
+        return len(filas)
+
+    def obtener_historial(self, usuario_id=None, horas_limite=24):
+        fecha_limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
+        if usuario_id is not None:
+            nombre, params = "historial_usuario", (fecha_limite, usuario_id)
+        else:
+            nombre, params = "historial_todos", (fecha_limite,)
+        rows, cols = self._consultar(SENTENCIAS[nombre][1], params)
+        return [dict(zip(cols, row)) for row in rows]
+
+    def limpiar_historial_antiguo(self, horas_limite=24):
+        fecha_limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
+        return self._ejecutar(
+            "DELETE FROM historial_memoria WHERE fecha_hora < %s;", (fecha_limite,)
+        ).rowcount
+
+    def cerrar(self):
+        with self._lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conn in conexiones:
+            conn.close()
+        self._local = threading.local()
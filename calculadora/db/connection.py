@@ -1,15 +1,27 @@
 # calculadora/db/connection.py
 
-import psycopg2
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
 from dotenv import load_dotenv
+from calculadora.db.sentencias import ConexionCalculadora, preparar_sentencias
 
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
 
-def get_connection():
+
+class PoolAgotadoError(Exception):
+    """Se lanza cuando no se obtiene una conexión del pool dentro del tiempo de espera."""
+
+
+def _crear_conexion():
     """
-    Retorna una conexión a la base de datos PostgreSQL usando variables de entorno.
+    Abre una conexión nueva a la base de datos PostgreSQL usando variables de entorno.
     """
     # Leemos los valores de entorno
     db_name = os.getenv("POSTGRES_DB")
@@ -24,6 +36,338 @@ def get_connection():
         user=db_user,
         password=db_pass,
         host=db_host,
-        port=db_port
+        port=db_port,
+        connection_factory=ConexionCalculadora
     )
     return conn
+
+
+class ConexionPool:
+    """
+    Envoltorio de una conexión psycopg2 prestada por el pool.
+    Se comporta como la conexión original, pero close() la devuelve al pool
+    en lugar de cerrarla, para que el código existente siga funcionando igual.
+    """
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._devuelta = False
+
+    @property
+    def conexion_real(self):
+        """Conexión psycopg2 subyacente."""
+        return self._conn
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def __enter__(self):
+        # 'with conn:' delimita una transacción igual que en psycopg2
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        """Devuelve la conexión al pool (solo la primera vez)."""
+        if not self._devuelta:
+            self._devuelta = True
+            self._pool.devolver(self._conn)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones thread-safe con tamaño mínimo/máximo, tiempo de espera
+    al solicitar una conexión y verificación de salud antes de entregarla.
+
+    Expone estadísticas (conexiones en uso, esperas, latencia de obtención)
+    para poder dimensionarlo bajo carga.
+    """
+    def __init__(self, minconn=1, maxconn=10, timeout=30.0, verificar_tras=30.0,
+                 fabrica=_crear_conexion, al_crear=None):
+        """
+        Args:
+            minconn: Conexiones que se abren al crear el pool
+            maxconn: Máximo de conexiones abiertas simultáneamente
+            timeout: Segundos máximos de espera por una conexión libre
+            verificar_tras: Segundos de inactividad tras los cuales se hace 'SELECT 1'
+                            antes de entregar la conexión (0 = verificar siempre)
+            fabrica: Función que abre una conexión nueva
+            al_crear: Lista de funciones que se ejecutan sobre cada conexión nueva
+        """
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Tamaños de pool inválidos.")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.verificar_tras = verificar_tras
+        self._fabrica = fabrica
+        self._al_crear = list(al_crear or [])
+
+        self._condicion = threading.Condition()
+        self._libres = deque()          # (conexion, instante_devolucion)
+        self._en_uso = set()
+        self._abiertas = 0
+        self._cerrado = False
+
+        # Estadísticas
+        self._solicitudes = 0
+        self._esperas = 0
+        self._timeouts = 0
+        self._descartadas = 0
+        self._latencia_total = 0.0
+        self._latencia_max = 0.0
+
+        for _ in range(minconn):
+            self._libres.append((self._abrir(), time.monotonic()))
+            self._abiertas += 1
+
+    def registrar_al_crear(self, funcion):
+        """
+        Registra una función que se ejecuta sobre cada conexión nueva del pool
+        (por ejemplo, para preparar sentencias). Recibe la conexión psycopg2.
+        """
+        self._al_crear.append(funcion)
+        return funcion
+
+    def _abrir(self):
+        """Abre una conexión y ejecuta los ganchos registrados (sin tomar el lock)."""
+        conn = self._fabrica()
+        try:
+            for funcion in self._al_crear:
+                funcion(conn)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _esta_sana(self, conn, inactiva_desde):
+        """Comprueba que la conexión siga utilizable antes de entregarla."""
+        if conn.closed:
+            return False
+        if time.monotonic() - inactiva_desde < self.verificar_tras:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _cerrar_silenciosamente(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def obtener(self, timeout=None):
+        """
+        Obtiene una conexión psycopg2 del pool. Si no hay libres y se alcanzó
+        el máximo, espera hasta 'timeout' segundos antes de lanzar PoolAgotadoError.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+        espero = False
+
+        with self._condicion:
+            self._solicitudes += 1
+
+        while True:
+            candidata = None
+            abrir_nueva = False
+
+            with self._condicion:
+                while True:
+                    if self._cerrado:
+                        raise PoolAgotadoError("El pool de conexiones está cerrado.")
+                    if self._libres:
+                        candidata = self._libres.pop()
+                        break
+                    if self._abiertas < self.maxconn:
+                        # Reservamos el hueco y abrimos fuera del lock
+                        self._abiertas += 1
+                        abrir_nueva = True
+                        break
+
+                    # Esperar a que alguien devuelva una conexión
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolAgotadoError(
+                            f"No hay conexiones libres tras esperar {timeout} segundos "
+                            f"(máximo {self.maxconn})."
+                        )
+                    if not espero:
+                        espero = True
+                        self._esperas += 1
+                    self._condicion.wait(restante)
+
+            # La apertura y la verificación de salud se hacen sin bloquear al resto
+            if abrir_nueva:
+                try:
+                    conn = self._abrir()
+                except Exception:
+                    with self._condicion:
+                        self._abiertas -= 1
+                        self._condicion.notify()
+                    raise
+            else:
+                conn, inactiva_desde = candidata
+                if not self._esta_sana(conn, inactiva_desde):
+                    self._cerrar_silenciosamente(conn)
+                    with self._condicion:
+                        self._abiertas -= 1
+                        self._descartadas += 1
+                        self._condicion.notify()
+                    continue
+
+            with self._condicion:
+                self._en_uso.add(conn)
+                latencia = time.monotonic() - inicio
+                self._latencia_total += latencia
+                self._latencia_max = max(self._latencia_max, latencia)
+            return conn
+
+    def devolver(self, conn):
+        """
+        Devuelve una conexión al pool. Si quedó con una transacción abierta se
+        deshace; si está rota se descarta.
+        """
+        with self._condicion:
+            if conn not in self._en_uso:
+                return
+            self._en_uso.discard(conn)
+
+            if self._cerrado or conn.closed:
+                self._descartar(conn)
+            else:
+                try:
+                    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    self._libres.append((conn, time.monotonic()))
+                except psycopg2.Error:
+                    self._descartar(conn)
+            self._condicion.notify()
+
+    @contextmanager
+    def conexion(self, timeout=None):
+        """
+        Context manager que presta una conexión y la devuelve al salir,
+        incluso si se produce una excepción.
+        """
+        conn = self.obtener(timeout)
+        try:
+            yield conn
+        finally:
+            self.devolver(conn)
+
+    def estadisticas(self):
+        """
+        Retorna un diccionario con el estado y las métricas del pool.
+        """
+        with self._condicion:
+            return {
+                "minimo": self.minconn,
+                "maximo": self.maxconn,
+                "abiertas": self._abiertas,
+                "en_uso": len(self._en_uso),
+                "libres": len(self._libres),
+                "solicitudes": self._solicitudes,
+                "esperas": self._esperas,
+                "timeouts": self._timeouts,
+                "descartadas": self._descartadas,
+                "latencia_media_ms": (self._latencia_total / self._solicitudes * 1000)
+                                     if self._solicitudes else 0.0,
+                "latencia_max_ms": self._latencia_max * 1000,
+            }
+
+    def _descartar(self, conn):
+        """Cierra una conexión y la descuenta del pool (llamar con el lock tomado)."""
+        self._abiertas -= 1
+        self._descartadas += 1
+        self._cerrar_silenciosamente(conn)
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres; las prestadas se cierran al devolverse."""
+        with self._condicion:
+            self._cerrado = True
+            while self._libres:
+                conn, _ = self._libres.pop()
+                self._descartar(conn)
+            self._condicion.notify_all()
+
+
+# === POOL GLOBAL DE LA APLICACIÓN ===
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Retorna el pool global, creándolo la primera vez con la configuración de entorno:
+    POSTGRES_POOL_MIN, POSTGRES_POOL_MAX, POSTGRES_POOL_TIMEOUT y POSTGRES_POOL_VERIFICAR.
+
+    En un proceso hijo creado con fork, el pool heredado se abandona (sin cerrar
+    sus conexiones, que siguen siendo del padre) y se crea uno nuevo.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is not None and _pool_pid != os.getpid():
+                _pool = None
+            if _pool is None:
+                _pool_pid = os.getpid()
+                _pool = PoolConexiones(
+                    minconn=int(os.getenv("POSTGRES_POOL_MIN", "1")),
+                    maxconn=int(os.getenv("POSTGRES_POOL_MAX", "10")),
+                    timeout=float(os.getenv("POSTGRES_POOL_TIMEOUT", "30")),
+                    verificar_tras=float(os.getenv("POSTGRES_POOL_VERIFICAR", "30")),
+                    # Cada conexión prepara una vez las sentencias más frecuentes
+                    al_crear=[preparar_sentencias],
+                )
+    return _pool
+
+
+def cerrar_pool():
+    """Cierra el pool global (por ejemplo, al salir de la aplicación)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            # Las conexiones heredadas de otro proceso no se cierran desde aquí
+            if _pool_pid == os.getpid():
+                _pool.cerrar()
+            _pool = None
+
+
+def estadisticas_pool():
+    """Estadísticas del pool global (conexiones en uso, esperas, latencia...)."""
+    return get_pool().estadisticas()
+
+
+@contextmanager
+def conexion(timeout=None):
+    """
+    Presta una conexión del pool global durante el bloque 'with'.
+
+    Ejemplo:
+        with conexion() as conn:
+            with conn:
+                with conn.cursor() as cur:
+                    ...
+    """
+    with get_pool().conexion(timeout) as conn:
+        yield conn
+
+
+def get_connection():
+    """
+    Retorna una conexión del pool global. Llamar a close() la devuelve al pool
+    en lugar de cerrarla, así que el código que ya la usaba sigue funcionando.
+    """
+    pool = get_pool()
+    return ConexionPool(pool, pool.obtener())
@@ -0,0 +1,295 @@
+# calculadora/db/escritura_diferida.py
+
+"""
+Escritura diferida (write-behind) para las tablas 'operaciones' e 'historial_memoria'.
+
+En lugar de hacer un INSERT con commit por cada cálculo, las filas se acumulan
+en memoria y se vuelcan con un INSERT multi-fila cuando se alcanza un tamaño de
+lote o pasa un intervalo de tiempo. Al cerrar sesión o salir se vacía todo lo
+pendiente. El modo síncrono escribe cada fila al momento (útil para pruebas).
+
+Si un lote falla por los datos de alguna fila (ERRORES_DE_DATOS: un valor fuera de
+rango, un usuario que no existe...) se divide por la mitad hasta aislar las filas
+que fallan (cada lote se escribe en una transacción: o entra entero o no entra); el
+resto se escribe y solo esas filas se reintentan en el siguiente volcado. Tras
+CALCULADORA_LOTE_REINTENTOS intentos fallidos una fila se descarta: se aparta en
+la lista 'descartadas' del escritor y se informa, para que no bloquee las demás.
+
+Cualquier otro error (conexión caída, pool agotado...) no es culpa de las filas: el
+volcado se detiene y todo lo que no se ha escrito queda para el siguiente, sin
+contar intentos, así que una caída de la base de datos no descarta operaciones.
+
+Variables de entorno:
+    CALCULADORA_ESCRITURA_SINCRONA: '1' para escribir cada fila inmediatamente
+    CALCULADORA_LOTE_TAMANO: filas por lote (por defecto 500)
+    CALCULADORA_LOTE_INTERVALO: segundos máximos antes de volcar (por defecto 1.0)
+    CALCULADORA_LOTE_REINTENTOS: intentos de cada fila antes de descartarla (por defecto 3)
+"""
+
+import atexit
+import datetime
+import os
+import sqlite3
+import threading
+from collections import deque
+
+import psycopg2
+
+from calculadora.db.models import insertar_operaciones_lote, guardar_en_historial_lote
+
+
+# Errores causados por los datos de una fila (el backend en memoria lanza ValueError)
+ERRORES_DE_DATOS = (
+    psycopg2.DataError,
+    psycopg2.IntegrityError,
+    sqlite3.DataError,
+    sqlite3.IntegrityError,
+    ValueError,
+)
+
+
+class EscritorDiferido:
+    """
+    Acumula filas y las vuelca en lote mediante 'funcion_lote' desde un hilo en segundo plano.
+    """
+    def __init__(self, funcion_lote, tamano_lote=500, intervalo=1.0, sincrono=False, nombre="escritor",
+                 max_intentos=3):
+        """
+        Args:
+            funcion_lote: Función que recibe una lista de filas y las persiste (todas o ninguna)
+            tamano_lote: Número de filas que dispara un volcado
+            intervalo: Segundos máximos que una fila puede esperar en el búfer
+            sincrono: Si es True, cada fila se escribe al momento sin búfer
+            nombre: Nombre del hilo (para depuración)
+            max_intentos: Intentos fallidos tras los que una fila se descarta
+        """
+        self.funcion_lote = funcion_lote
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.sincrono = sincrono
+        self.nombre = nombre
+        self.max_intentos = max_intentos
+
+        self._buffer = []
+        # Filas que ya fallaron, como (fila, intentos); se escriben antes que el búfer
+        self._reintentos = []
+        # Filas descartadas tras max_intentos fallos, como (fila, error)
+        self.descartadas = []
+        self._condicion = threading.Condition()
+        # Serializa los volcados para conservar el orden de inserción
+        self._lock_volcado = threading.RLock()
+        self._hilo = None
+        self._detener = False
+
+        # Estadísticas
+        self.filas_escritas = 0
+        self.lotes_escritos = 0
+        self.errores = 0
+
+    def _iniciar_hilo(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener = False
+            self._hilo = threading.Thread(target=self._bucle, name=self.nombre, daemon=True)
+            self._hilo.start()
+
+    def agregar(self, fila):
+        """
+        Añade una fila al búfer (o la escribe directamente en modo síncrono).
+        """
+        if self.sincrono:
+            self._escribir([fila])
+            return
+
+        with self._condicion:
+            self._buffer.append(fila)
+            self._iniciar_hilo()
+            if len(self._buffer) >= self.tamano_lote:
+                self._condicion.notify()
+
+    def _bucle(self):
+        """Hilo de fondo: vuelca al llenarse el lote o al vencer el intervalo."""
+        while True:
+            with self._condicion:
+                if not self._detener and len(self._buffer) < self.tamano_lote:
+                    self._condicion.wait(self.intervalo)
+                if self._detener and not self._buffer:
+                    return
+            self.vaciar()
+
+    def _escribir(self, filas):
+        with self._lock_volcado:
+            self.funcion_lote(filas)
+            self.filas_escritas += len(filas)
+            self.lotes_escritos += 1
+
+    def _escribir_aislando(self, entradas):
+        """
+        Escribe las entradas (fila, intentos) en lotes de 'tamano_lote'. Si un lote
+        falla por sus datos, lo divide por la mitad hasta aislar las filas que fallan;
+        ante cualquier otro error deja de escribir.
+
+        Returns:
+            Tupla (filas escritas, lista de (fila, intentos, error) que fallaron por
+            sus datos, entradas sin escribir por otro error, ese error o None)
+        """
+        lotes = deque(entradas[i:i + self.tamano_lote] for i in range(0, len(entradas), self.tamano_lote))
+        escritas = 0
+        fallidas = []
+        while lotes:
+            lote = lotes.popleft()
+            try:
+                self._escribir([fila for fila, _ in lote])
+                escritas += len(lote)
+            except ERRORES_DE_DATOS as e:
+                if len(lote) == 1:
+                    fila, intentos = lote[0]
+                    fallidas.append((fila, intentos, e))
+                else:
+                    mitad = len(lote) // 2
+                    lotes.extendleft((lote[mitad:], lote[:mitad]))
+            except Exception as e:
+                return escritas, fallidas, [entrada for resto in (lote, *lotes) for entrada in resto], e
+        return escritas, fallidas, [], None
+
+    def vaciar(self):
+        """
+        Escribe de inmediato todas las filas pendientes. Las filas que fallan por
+        sus datos quedan para el siguiente volcado (sin retener a las demás) y, tras
+        'max_intentos' fallos, se descartan. Si falla la conexión, lo que no se ha
+        escrito queda entero para el siguiente volcado sin contar el intento.
+
+        Returns:
+            Número de filas escritas
+        """
+        # El lock de volcado se mantiene desde que se toman las filas hasta que se
+        # escriben, para que los lotes lleguen a la base de datos en orden
+        with self._lock_volcado:
+            with self._condicion:
+                pendientes = self._reintentos + [(fila, 0) for fila in self._buffer]
+                self._reintentos = []
+                self._buffer = []
+
+            escritas, fallidas, sin_escribir, error = self._escribir_aislando(pendientes)
+            reintentos = []
+            if fallidas:
+                self.errores += 1
+                print(f"Error al volcar {len(fallidas)} filas de '{self.nombre}': {fallidas[0][2]}")
+                for fila, intentos, error_fila in fallidas:
+                    if intentos + 1 >= self.max_intentos:
+                        self.descartadas.append((fila, error_fila))
+                        print(f"Fila descartada de '{self.nombre}' tras {intentos + 1} intentos: {fila}")
+                    else:
+                        reintentos.append((fila, intentos + 1))
+            if error is not None:
+                self.errores += 1
+                print(f"Error al volcar '{self.nombre}' ({len(sin_escribir)} filas pendientes): {error}")
+            with self._condicion:
+                self._reintentos = reintentos + sin_escribir
+            return escritas
+
+    def pendientes(self):
+        """Número de filas que aún no se han escrito (incluidas las que se reintentarán)."""
+        with self._condicion:
+            return len(self._buffer) + len(self._reintentos)
+
+    def cerrar(self):
+        """Detiene el hilo de fondo tras vaciar el búfer."""
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+        if self._hilo is not None:
+            self._hilo.join(timeout=max(self.intervalo, 1.0) * 5)
+        self.vaciar()
+
+
+# === ESCRITORES GLOBALES ===
+_escritores = {}
+_escritores_lock = threading.Lock()
+# Valores fijados con configurar_escritura(); tienen prioridad sobre el entorno
+_configuracion = {}
+
+
+def _configuracion_entorno():
+    configuracion = {
+        "tamano_lote": int(os.getenv("CALCULADORA_LOTE_TAMANO", "500")),
+        "intervalo": float(os.getenv("CALCULADORA_LOTE_INTERVALO", "1.0")),
+        "sincrono": os.getenv("CALCULADORA_ESCRITURA_SINCRONA", "0") == "1",
+        "max_intentos": int(os.getenv("CALCULADORA_LOTE_REINTENTOS", "3")),
+    }
+    configuracion.update(_configuracion)
+    return configuracion
+
+
+def _obtener_escritor(nombre, funcion_lote):
+    escritor = _escritores.get(nombre)
+    if escritor is None:
+        with _escritores_lock:
+            escritor = _escritores.get(nombre)
+            if escritor is None:
+                escritor = EscritorDiferido(funcion_lote, nombre=nombre, **_configuracion_entorno())
+                _escritores[nombre] = escritor
+    return escritor
+
+
+def configurar_escritura(sincrona=None, tamano_lote=None, intervalo=None):
+    """
+    Cambia la configuración de los escritores globales (por ejemplo, modo síncrono en pruebas).
+    Vacía lo pendiente antes de aplicar el cambio.
+    """
+    vaciar_escrituras()
+    cambios = {
+        clave: valor
+        for clave, valor in (("sincrono", sincrona), ("tamano_lote", tamano_lote), ("intervalo", intervalo))
+        if valor is not None
+    }
+    with _escritores_lock:
+        _configuracion.update(cambios)
+        for escritor in _escritores.values():
+            for clave, valor in cambios.items():
+                setattr(escritor, clave, valor)
+
+
+def encolar_operacion(usuario_id, operando1, operador, operando2, resultado, expresion=None):
+    """
+    Encola una operación para insertarla en lote. La fecha de creación se toma ahora,
+    no en el momento del volcado.
+    """
+    escritor = _obtener_escritor("operaciones", insertar_operaciones_lote)
+    escritor.agregar((usuario_id, operando1, operador, operando2, resultado, datetime.datetime.now(), expresion))
+
+
+def encolar_historial(usuario_id, fecha_hora, descripcion):
+    """
+    Encola una entrada de historial para insertarla en lote.
+    """
+    escritor = _obtener_escritor("historial", guardar_en_historial_lote)
+    escritor.agregar((usuario_id, fecha_hora, descripcion))
+
+
+def vaciar_escrituras():
+    """
+    Escribe todo lo pendiente en todos los escritores. Se llama al cerrar sesión,
+    al salir y antes de leer datos que deban incluir las últimas operaciones.
+    """
+    total = 0
+    for escritor in list(_escritores.values()):
+        total += escritor.vaciar()
+    return total
+
+
+def estadisticas_escritura():
+    """Filas escritas, lotes, errores, pendientes y descartadas por escritor."""
+    return {
+        nombre: {
+            "filas_escritas": escritor.filas_escritas,
+            "lotes_escritos": escritor.lotes_escritos,
+            "errores": escritor.errores,
+            "pendientes": escritor.pendientes(),
+            "descartadas": len(escritor.descartadas),
+        }
+        for nombre, escritor in _escritores.items()
+    }
+
+
+# Garantizar el volcado al terminar el proceso
+atexit.register(vaciar_escrituras)
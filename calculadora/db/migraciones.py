@@ -0,0 +1,411 @@
+# calculadora/db/migraciones.py
+
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+Cada migración tiene un número de versión y se aplica una única vez; las versiones
+aplicadas se registran en la tabla 'schema_version'. Si el esquema ya está al día,
+el arranque solo hace una consulta de lectura y no ejecuta ningún DDL.
+
+Para cambiar el esquema se añade una nueva entrada al final de MIGRACIONES
+(nunca se modifican las ya publicadas).
+"""
+
+from calculadora.db.connection import conexion
+
+# Clave del advisory lock que evita que dos procesos migren a la vez
+_CLAVE_LOCK_MIGRACIONES = 7152025
+
+# (version, descripcion, [sentencias SQL])
+MIGRACIONES = [
+    (1, "Esquema base: usuarios, operaciones e historial_memoria", [
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            password VARCHAR(100) NOT NULL,
+            es_superusuario BOOLEAN DEFAULT FALSE,
+            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        # Instalaciones antiguas se crearon sin la columna es_superusuario
+        """
+        ALTER TABLE usuarios
+        ADD COLUMN IF NOT EXISTS es_superusuario BOOLEAN DEFAULT FALSE;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS operaciones (
+            id SERIAL PRIMARY KEY,
+            usuario_id INT NOT NULL,
+            operando1 NUMERIC NOT NULL,
+            operador VARCHAR(10) NOT NULL,
+            operando2 NUMERIC NOT NULL,
+            resultado NUMERIC NOT NULL,
+            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS historial_memoria (
+            id SERIAL PRIMARY KEY,
+            usuario_id INT NOT NULL,
+            fecha_hora TIMESTAMP NOT NULL,
+            descripcion TEXT NOT NULL,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+        );
+        """,
+    ]),
+    (2, "Índices para login, filtros de operaciones e historial", [
+        # Login (obtener_usuario_por_nombre); además impide nombres duplicados.
+        # Antes se comprueba que no los haya (ver _comprobar_nombres_unicos)
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_nombre ON usuarios (nombre);",
+        # obtener_operaciones por usuario y/o operador
+        """
+        CREATE INDEX IF NOT EXISTS idx_operaciones_usuario_operador_creado
+        ON operaciones (usuario_id, operador, creado_en);
+        """,
+        # Consultas por operador sin usuario (menú de superusuario)
+        "CREATE INDEX IF NOT EXISTS idx_operaciones_operador ON operaciones (operador);",
+        # obtener_historial de un usuario
+        """
+        CREATE INDEX IF NOT EXISTS idx_historial_usuario_fecha
+        ON historial_memoria (usuario_id, fecha_hora);
+        """,
+        # obtener_historial de todos los usuarios y limpiar_historial_antiguo
+        "CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial_memoria (fecha_hora);",
+    ]),
+    (3, "Fecha de creación obligatoria en operaciones", [
+        # La paginación por (creado_en, id), los agregados diarios y la analítica
+        # necesitan la fecha de todas las operaciones. Las instalaciones antiguas
+        # podían tener filas sin fecha: reciben la de creación del usuario (la más
+        # antigua posible)
+        """
+        UPDATE operaciones o SET creado_en = COALESCE(u.creado_en, CURRENT_TIMESTAMP)
+        FROM usuarios u
+        WHERE o.usuario_id = u.id AND o.creado_en IS NULL;
+        """,
+        "ALTER TABLE operaciones ALTER COLUMN creado_en SET NOT NULL;",
+    ]),
+    (4, "Índices para la paginación por (creado_en, id)", [
+        # obtener_pagina_operaciones de un usuario: filtro + orden servidos por el índice
+        """
+        CREATE INDEX IF NOT EXISTS idx_operaciones_usuario_creado_id
+        ON operaciones (usuario_id, creado_en, id);
+        """,
+        # Paginación por operador; sustituye al índice simple de la versión 2
+        "DROP INDEX IF EXISTS idx_operaciones_operador;",
+        """
+        CREATE INDEX IF NOT EXISTS idx_operaciones_operador_creado_id
+        ON operaciones (operador, creado_en, id);
+        """,
+    ]),
+    (5, "historial_memoria particionada por día (fecha_hora)", [
+        # La tabla original se renombra (con su índice de clave primaria) y su
+        # secuencia pasa a la nueva tabla, para que los IDs continúen
+        "ALTER TABLE historial_memoria RENAME TO historial_memoria_anterior;",
+        "ALTER INDEX historial_memoria_pkey RENAME TO historial_memoria_anterior_pkey;",
+        "DROP INDEX IF EXISTS idx_historial_usuario_fecha;",
+        "DROP INDEX IF EXISTS idx_historial_fecha;",
+        "ALTER SEQUENCE historial_memoria_id_seq OWNED BY NONE;",
+        """
+        CREATE TABLE historial_memoria (
+            id INT NOT NULL DEFAULT nextval('historial_memoria_id_seq'),
+            usuario_id INT NOT NULL,
+            fecha_hora TIMESTAMP NOT NULL,
+            descripcion TEXT NOT NULL,
+            PRIMARY KEY (id, fecha_hora),
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+        ) PARTITION BY RANGE (fecha_hora);
+        """,
+        "ALTER SEQUENCE historial_memoria_id_seq OWNED BY historial_memoria.id;",
+        # Recoge las filas sin partición diaria (ver calculadora/db/particiones.py)
+        "CREATE TABLE historial_memoria_default PARTITION OF historial_memoria DEFAULT;",
+        """
+        CREATE INDEX idx_historial_usuario_fecha
+        ON historial_memoria (usuario_id, fecha_hora);
+        """,
+        "CREATE INDEX idx_historial_fecha ON historial_memoria (fecha_hora);",
+        # Una partición por cada día con datos, más la de hoy
+        """
+        DO $$
+        DECLARE
+            dia DATE;
+        BEGIN
+            FOR dia IN
+                SELECT DISTINCT fecha_hora::date FROM historial_memoria_anterior
+                UNION
+                SELECT current_date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF historial_memoria FOR VALUES FROM (%L) TO (%L)',
+                    'historial_memoria_p' || to_char(dia, 'YYYYMMDD'), dia, dia + 1
+                );
+            END LOOP;
+        END $$;
+        """,
+        """
+        INSERT INTO historial_memoria (id, usuario_id, fecha_hora, descripcion)
+        SELECT id, usuario_id, fecha_hora, descripcion FROM historial_memoria_anterior;
+        """,
+        "DROP TABLE historial_memoria_anterior;",
+    ]),
+    (6, "Columna 'expresion' en operaciones (operador 'expr')", [
+        "ALTER TABLE operaciones ADD COLUMN IF NOT EXISTS expresion TEXT;",
+    ]),
+    (7, "Agregados de operaciones por usuario y operador (total y por día)", [
+        """
+        CREATE TABLE agregados_operaciones (
+            usuario_id INT NOT NULL REFERENCES usuarios(id),
+            operador VARCHAR(10) NOT NULL,
+            cantidad BIGINT NOT NULL,
+            suma NUMERIC NOT NULL,
+            minimo NUMERIC NOT NULL,
+            maximo NUMERIC NOT NULL,
+            PRIMARY KEY (usuario_id, operador)
+        );
+        """,
+        """
+        CREATE TABLE agregados_operaciones_diarios (
+            usuario_id INT NOT NULL REFERENCES usuarios(id),
+            operador VARCHAR(10) NOT NULL,
+            dia DATE NOT NULL,
+            cantidad BIGINT NOT NULL,
+            suma NUMERIC NOT NULL,
+            minimo NUMERIC NOT NULL,
+            maximo NUMERIC NOT NULL,
+            PRIMARY KEY (usuario_id, operador, dia)
+        );
+        """,
+        # Totales de un operador sin usuario (menú de superusuario)
+        "CREATE INDEX idx_agregados_diarios_dia ON agregados_operaciones_diarios (dia);",
+        # Un único upsert por sentencia INSERT (no por fila) con las filas nuevas
+        # agrupadas; el orden fijo de las claves evita interbloqueos entre lotes
+        """
+        CREATE FUNCTION sumar_agregados_operaciones() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO agregados_operaciones AS a (usuario_id, operador, cantidad, suma, minimo, maximo)
+            SELECT usuario_id, operador, COUNT(*), SUM(resultado), MIN(resultado), MAX(resultado)
+            FROM nuevas
+            GROUP BY usuario_id, operador
+            ORDER BY usuario_id, operador
+            ON CONFLICT (usuario_id, operador) DO UPDATE SET
+                cantidad = a.cantidad + EXCLUDED.cantidad,
+                suma = a.suma + EXCLUDED.suma,
+                minimo = LEAST(a.minimo, EXCLUDED.minimo),
+                maximo = GREATEST(a.maximo, EXCLUDED.maximo);
+
+            INSERT INTO agregados_operaciones_diarios AS a (usuario_id, operador, dia, cantidad, suma, minimo, maximo)
+            SELECT usuario_id, operador, creado_en::date, COUNT(*), SUM(resultado), MIN(resultado), MAX(resultado)
+            FROM nuevas
+            GROUP BY usuario_id, operador, creado_en::date
+            ORDER BY usuario_id, operador, creado_en::date
+            ON CONFLICT (usuario_id, operador, dia) DO UPDATE SET
+                cantidad = a.cantidad + EXCLUDED.cantidad,
+                suma = a.suma + EXCLUDED.suma,
+                minimo = LEAST(a.minimo, EXCLUDED.minimo),
+                maximo = GREATEST(a.maximo, EXCLUDED.maximo);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        CREATE TRIGGER trg_operaciones_agregados_insert
+        AFTER INSERT ON operaciones
+        REFERENCING NEW TABLE AS nuevas
+        FOR EACH STATEMENT EXECUTE FUNCTION sumar_agregados_operaciones();
+        """,
+        # Los borrados no se pueden restar del mínimo y el máximo: se recalculan los
+        # grupos afectados desde 'operaciones'. No hay trigger de UPDATE porque la
+        # aplicación nunca modifica una operación guardada (las creado_en nulas se
+        # rellenan en la migración 3, antes de la carga inicial de abajo)
+        """
+        CREATE FUNCTION recalcular_agregados_operaciones() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM agregados_operaciones a
+            USING (SELECT DISTINCT usuario_id, operador FROM anteriores) g
+            WHERE a.usuario_id = g.usuario_id AND a.operador = g.operador;
+
+            INSERT INTO agregados_operaciones (usuario_id, operador, cantidad, suma, minimo, maximo)
+            SELECT o.usuario_id, o.operador, COUNT(*), SUM(o.resultado), MIN(o.resultado), MAX(o.resultado)
+            FROM operaciones o
+            JOIN (SELECT DISTINCT usuario_id, operador FROM anteriores) g
+              ON o.usuario_id = g.usuario_id AND o.operador = g.operador
+            GROUP BY o.usuario_id, o.operador;
+
+            DELETE FROM agregados_operaciones_diarios a
+            USING (SELECT DISTINCT usuario_id, operador, creado_en::date AS dia FROM anteriores) g
+            WHERE a.usuario_id = g.usuario_id AND a.operador = g.operador AND a.dia = g.dia;
+
+            INSERT INTO agregados_operaciones_diarios (usuario_id, operador, dia, cantidad, suma, minimo, maximo)
+            SELECT o.usuario_id, o.operador, o.creado_en::date, COUNT(*), SUM(o.resultado),
+                   MIN(o.resultado), MAX(o.resultado)
+            FROM operaciones o
+            JOIN (SELECT DISTINCT usuario_id, operador, creado_en::date AS dia FROM anteriores) g
+              ON o.usuario_id = g.usuario_id AND o.operador = g.operador
+             AND o.creado_en >= g.dia AND o.creado_en < g.dia + 1
+            GROUP BY o.usuario_id, o.operador, o.creado_en::date;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        CREATE TRIGGER trg_operaciones_agregados_delete
+        AFTER DELETE ON operaciones
+        REFERENCING OLD TABLE AS anteriores
+        FOR EACH STATEMENT EXECUTE FUNCTION recalcular_agregados_operaciones();
+        """,
+        # Carga inicial con las operaciones existentes
+        """
+        INSERT INTO agregados_operaciones (usuario_id, operador, cantidad, suma, minimo, maximo)
+        SELECT usuario_id, operador, COUNT(*), SUM(resultado), MIN(resultado), MAX(resultado)
+        FROM operaciones
+        GROUP BY usuario_id, operador;
+        """,
+        """
+        INSERT INTO agregados_operaciones_diarios (usuario_id, operador, dia, cantidad, suma, minimo, maximo)
+        SELECT usuario_id, operador, creado_en::date, COUNT(*), SUM(resultado), MIN(resultado), MAX(resultado)
+        FROM operaciones
+        GROUP BY usuario_id, operador, creado_en::date;
+        """,
+    ]),
+    (8, "Operaciones con vectores y matrices (operandos en formato .npy)", [
+        """
+        CREATE TABLE operaciones_matriciales (
+            id SERIAL PRIMARY KEY,
+            usuario_id INT NOT NULL REFERENCES usuarios(id),
+            operador VARCHAR(10) NOT NULL,
+            operando1 BYTEA NOT NULL,
+            operando2 BYTEA,
+            resultado BYTEA NOT NULL,
+            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE INDEX idx_operaciones_matriciales_usuario_creado
+        ON operaciones_matriciales (usuario_id, creado_en);
+        """,
+    ]),
+    (9, "Resúmenes analíticos por hora y por usuario con marca de agua", [
+        """
+        CREATE TABLE analitica_por_hora (
+            hora TIMESTAMP NOT NULL,
+            operador VARCHAR(10) NOT NULL,
+            cantidad BIGINT NOT NULL,
+            suma NUMERIC NOT NULL,
+            minimo NUMERIC NOT NULL,
+            maximo NUMERIC NOT NULL,
+            PRIMARY KEY (hora, operador)
+        );
+        """,
+        """
+        CREATE TABLE analitica_por_usuario (
+            usuario_id INT PRIMARY KEY REFERENCES usuarios(id),
+            cantidad BIGINT NOT NULL,
+            suma NUMERIC NOT NULL,
+            primera TIMESTAMP NOT NULL,
+            ultima TIMESTAMP NOT NULL
+        );
+        """,
+        # Una sola fila: último id de 'operaciones' incluido en los resúmenes
+        """
+        CREATE TABLE analitica_marca (
+            unica BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (unica),
+            ultimo_id BIGINT NOT NULL DEFAULT 0,
+            actualizado_en TIMESTAMP
+        );
+        """,
+        "INSERT INTO analitica_marca (ultimo_id) VALUES (0);",
+    ]),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def _comprobar_nombres_unicos(cur):
+    """
+    Antes del índice único de la migración 2: las instalaciones antiguas no impedían
+    nombres de usuario repetidos y el índice fallaría con un error poco claro.
+    """
+    cur.execute("""
+        SELECT nombre, COUNT(*) FROM usuarios
+        GROUP BY nombre HAVING COUNT(*) > 1
+        ORDER BY nombre;
+    """)
+    duplicados = cur.fetchall()
+    if duplicados:
+        lista = ", ".join(f"'{nombre}' ({veces} veces)" for nombre, veces in duplicados)
+        raise RuntimeError(
+            f"No se puede aplicar la migración 2: hay nombres de usuario duplicados: {lista}. "
+            "Renómbrelos antes de iniciar la aplicación (ver 'Nombres de usuario duplicados' en el README)."
+        )
+
+
+# Comprobaciones previas a una migración: versión -> función que recibe el cursor
+_COMPROBACIONES = {
+    2: _comprobar_nombres_unicos,
+}
+
+
+def _version_aplicada(cur):
+    """Retorna la última versión aplicada (0 si aún no existe 'schema_version')."""
+    cur.execute("SELECT to_regclass('public.schema_version') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version;")
+    return cur.fetchone()[0]
+
+
+def obtener_version_esquema():
+    """Retorna la versión del esquema instalada en la base de datos."""
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            return _version_aplicada(cur)
+
+
+def aplicar_migraciones():
+    """
+    Aplica, en orden y una sola vez, las migraciones pendientes.
+    Si el esquema ya está en VERSION_ACTUAL no ejecuta ningún DDL.
+
+    Returns:
+        Lista con las versiones aplicadas en esta llamada
+    """
+    with conexion() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                if _version_aplicada(cur) >= VERSION_ACTUAL:
+                    return []
+
+        aplicadas = []
+        with conn:
+            with conn.cursor() as cur:
+                # Bloqueo hasta el final de la transacción: otro proceso esperará
+                # y, al continuar, verá las migraciones ya registradas
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (_CLAVE_LOCK_MIGRACIONES,))
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INT PRIMARY KEY,
+                        descripcion TEXT NOT NULL,
+                        aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+                """)
+                version = _version_aplicada(cur)
+
+                # Todas las migraciones pendientes van en la misma transacción:
+                # si una falla, el esquema queda como estaba
+                for numero, descripcion, sentencias in MIGRACIONES:
+                    if numero <= version:
+                        continue
+                    if numero in _COMPROBACIONES:
+                        _COMPROBACIONES[numero](cur)
+                    for sentencia in sentencias:
+                        cur.execute(sentencia)
+                    cur.execute(
+                        "INSERT INTO schema_version (version, descripcion) VALUES (%s, %s);",
+                        (numero, descripcion)
+                    )
+                    aplicadas.append(numero)
+
+    for numero in aplicadas:
+        print(f"Migración {numero} aplicada.")
+    return aplicadas
@@ -1,122 +1,234 @@
 # calculadora/db/models.py
 
+import base64
 import datetime
-from calculadora.db.connection import get_connection
+import functools
+import inspect
+import json
+import uuid
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+from calculadora.core.estadisticas import PERCENTILES, _validar_percentiles
+from calculadora.core.matrices import a_bytes, de_bytes
+from calculadora.db.backends import obtener_backend
+from calculadora.db.connection import conexion
+from calculadora.db.migraciones import aplicar_migraciones
+from calculadora.db.particiones import asegurar_particiones_historial, purgar_particiones_historial
+from calculadora.db.sentencias import ejecutar_sentencia
 
+def _segun_backend(funcion):
+    """
+    Las funciones públicas de este módulo son la implementación PostgreSQL.
+    Si el backend configurado es otro (ver calculadora/db/backends), se delega
+    en su método homónimo.
+    """
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        backend = obtener_backend()
+        if backend.usa_models:
+            return funcion(*args, **kwargs)
+        return getattr(backend, funcion.__name__)(*args, **kwargs)
+    return envoltura
+
+# Funciones avisadas tras insertar operaciones (ver registrar_observador_operaciones)
+_observadores_operaciones = []
+
+def registrar_observador_operaciones(funcion):
+    """
+    Registra funcion(pares), que se llama después de cada inserción de operaciones
+    con el conjunto de (usuario_id, operador) escritos, sea cual sea el backend.
+    Sirve, por ejemplo, para invalidar cachés de informes.
+    """
+    if funcion not in _observadores_operaciones:
+        _observadores_operaciones.append(funcion)
+
+def _notificar_operaciones(pares_escritos):
+    """
+    Decorador de las funciones que insertan operaciones (también las 'async' de
+    async_models.py): tras insertar avisa a los observadores con los pares
+    (usuario_id, operador) que calcula pares_escritos(*args, **kwargs).
+    """
+    def avisar(args, kwargs):
+        if _observadores_operaciones:
+            pares = pares_escritos(*args, **kwargs)
+            for observador in list(_observadores_operaciones):
+                observador(pares)
+
+    def decorador(funcion):
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura_async(*args, **kwargs):
+                resultado = await funcion(*args, **kwargs)
+                avisar(args, kwargs)
+                return resultado
+            return envoltura_async
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            resultado = funcion(*args, **kwargs)
+            avisar(args, kwargs)
+            return resultado
+        return envoltura
+    return decorador
+
+def _pares_operacion(usuario_id, operando1, operador, *args, **kwargs):
+    """Par (usuario_id, operador) escrito por insertar_operacion."""
+    return {(usuario_id, operador)}
+
+def _pares_lote(filas):
+    """Pares (usuario_id, operador) escritos por insertar_operaciones_lote."""
+    return {(fila[0], fila[2]) for fila in filas}
+
+# Filas que se traen del servidor en cada viaje al leer en streaming
+TAMANO_LOTE_STREAMING = 2000
+
+# Tamaño de página por defecto para la paginación de operaciones
+TAMANO_PAGINA = 50
+
+# Formatos de resultado para las consultas de operaciones:
+#  - dicts:     lista de diccionarios (formato original)
+#  - columnas:  diccionario {columna: array NumPy} con tipos nativos
+#  - dataframe: pandas.DataFrame construido directamente desde esas columnas
+FORMATO_DICTS = "dicts"
+FORMATO_COLUMNAS = "columnas"
+FORMATO_DATAFRAME = "dataframe"
+
+# Tipos NumPy de las columnas conocidas en los formatos columnares (el resto queda como object)
+_TIPOS_COLUMNAS = {
+    "id": "int64",
+    "operacion_id": "int64",
+    "usuario_id": "int64",
+    "operando1": "float64",
+    "operando2": "float64",
+    "resultado": "float64",
+    "creado_en": "datetime64[us]",
+    "operacion_creado_en": "datetime64[us]",
+}
+
+# En los formatos columnares, las columnas NUMERIC se convierten a float8 en el servidor
+# para no crear un decimal.Decimal por celda
+_COLUMNAS_OPERACIONES_FLOAT = (
+    "id, usuario_id, operando1::float8 AS operando1, operador, "
+    "operando2::float8 AS operando2, resultado::float8 AS resultado, creado_en, expresion"
+)
+
+def _filas_a_columnas(rows, cols):
+    """
+    Convierte una lista de tuplas en un diccionario {columna: array NumPy}
+    usando los tipos de _TIPOS_COLUMNAS.
+    """
+    valores = list(zip(*rows)) if rows else [()] * len(cols)
+    return {
+        col: np.array(vals, dtype=_TIPOS_COLUMNAS.get(col, object))
+        for col, vals in zip(cols, valores)
+    }
+
+def _convertir_filas(rows, cols, formato):
+    """Convierte las filas de un cursor al formato de resultado pedido."""
+    if formato == FORMATO_DICTS:
+        return [dict(zip(cols, row)) for row in rows]
+    columnas = _filas_a_columnas(rows, cols)
+    if formato == FORMATO_COLUMNAS:
+        return columnas
+    if formato == FORMATO_DATAFRAME:
+        return pd.DataFrame(columnas, columns=cols)
+    raise ValueError(f"Formato de resultado no válido: {formato}")
+
+@_segun_backend
 def crear_tablas():
     """
-    Crea las tablas 'usuarios', 'operaciones' y 'historial_memoria' si no existen.
+    Deja el esquema al día aplicando las migraciones pendientes
+    (tablas 'usuarios', 'operaciones', 'historial_memoria' e índices).
+    Si el esquema ya está en la versión actual no ejecuta ningún DDL.
+    También crea las particiones de 'historial_memoria' de los próximos días.
     """
-    conn = get_connection()
-    with conn:
-        with conn.cursor() as cur:
-            # Código existente para tabla usuarios
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS usuarios (
-                    id SERIAL PRIMARY KEY,
-                    nombre VARCHAR(100) NOT NULL,
-                    password VARCHAR(100) NOT NULL,
-                    es_superusuario BOOLEAN DEFAULT FALSE,
-                    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            # Verificación de columna es_superusuario (código existente)
-            try:
-                cur.execute("""
-                    SELECT column_name FROM information_schema.columns
-                    WHERE table_name = 'usuarios' AND column_name = 'es_superusuario';
-                """)
-                if cur.fetchone() is None:
-                    cur.execute("""
-                        ALTER TABLE usuarios 
-                        ADD COLUMN es_superusuario BOOLEAN DEFAULT FALSE;
-                    """)
-                    print("Se añadió la columna 'es_superusuario' a la tabla usuarios.")
-            except Exception as e:
-                print(f"Error al verificar la columna: {e}")
-                
-            # Código existente para tabla operaciones
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS operaciones (
-                    id SERIAL PRIMARY KEY,
-                    usuario_id INT NOT NULL,
-                    operando1 NUMERIC NOT NULL,
-                    operador VARCHAR(10) NOT NULL,
-                    operando2 NUMERIC NOT NULL,
-                    resultado NUMERIC NOT NULL,
-                    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-                );
-            """)
-            
-            # NUEVA TABLA para historial persistente
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS historial_memoria (
-                    id SERIAL PRIMARY KEY,
-                    usuario_id INT NOT NULL,
-                    fecha_hora TIMESTAMP NOT NULL,
-                    descripcion TEXT NOT NULL,
-                    FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-                );
-            """)
-    conn.close()
+    aplicadas = aplicar_migraciones()
+    asegurar_particiones_historial()
+    return aplicadas
+
+@_segun_backend
+def mantener_historial():
+    """
+    Tareas periódicas del historial: crea con antelación las particiones diarias
+    de 'historial_memoria'. Retorna los nombres de las particiones creadas.
+    """
+    return asegurar_particiones_historial()
 
+@_segun_backend
 def insertar_usuario(nombre, password, es_superusuario=False):
     """
     Inserta un nuevo usuario con nombre, contraseña y flag de superusuario.
     Retorna el ID generado.
     """
-    conn = get_connection()
     new_id = None
-    with conn:
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
             cur.execute("""
                 INSERT INTO usuarios (nombre, password, es_superusuario) 
                 VALUES (%s, %s, %s) RETURNING id;
             """, (nombre, password, es_superusuario))
             new_id = cur.fetchone()[0]
-    conn.close()
     return new_id
 
+@_segun_backend
 def obtener_usuario_por_nombre(nombre):
     """
     Retorna una tupla (id, nombre, password, es_superusuario) si existe un usuario con ese nombre,
     o None si no existe.
     """
-    conn = get_connection()
     usuario = None
-    with conn:
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT id, nombre, password, es_superusuario FROM usuarios WHERE nombre = %s;", (nombre,))
+            ejecutar_sentencia(cur, "usuario_por_nombre", (nombre,))
             usuario = cur.fetchone()
-    conn.close()
     return usuario
 
+@_notificar_operaciones(_pares_operacion)
+@_segun_backend
 def insertar_operacion(usuario_id, operando1, operador, operando2, resultado):
     """
     Inserta una nueva operación en la tabla 'operaciones'.
     """
-    conn = get_connection()
-    with conn:
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO operaciones (usuario_id, operando1, operador, operando2, resultado)
-                VALUES (%s, %s, %s, %s, %s);
-            """, (usuario_id, operando1, operador, operando2, resultado))
-    conn.close()
+            ejecutar_sentencia(cur, "insertar_operacion",
+                               (usuario_id, operando1, operador, operando2, resultado))
 
-def obtener_operaciones(usuario_id=None, operando=None, operador=None):
+@_notificar_operaciones(_pares_lote)
+@_segun_backend
+def insertar_operaciones_lote(filas):
     """
-    Retorna una lista de operaciones de la tabla 'operaciones'.
+    Inserta varias operaciones con un único INSERT multi-fila.
     
-    Parámetros opcionales para filtrar:
-     - usuario_id: Filtra por el ID del usuario.
-     - operando:   Filtra donde 'operando' esté en operando1 o operando2.
-     - operador:   Filtra por el operador utilizado (+, -, *, /, ^, sqrt, etc.)
+    Args:
+        filas: Lista de tuplas (usuario_id, operando1, operador, operando2, resultado, creado_en, expresion),
+               con expresion None salvo en las operaciones 'expr'
+    
+    Returns:
+        Número de filas insertadas
+    """
+    if not filas:
+        return 0
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            if len(filas) == 1:
+                # Una sola fila (p. ej. modo síncrono): sentencia preparada
+                ejecutar_sentencia(cur, "insertar_operacion_con_fecha", filas[0])
+                return 1
+            execute_values(cur, """
+                INSERT INTO operaciones (usuario_id, operando1, operador, operando2, resultado, creado_en, expresion)
+                VALUES %s;
+            """, filas, page_size=len(filas))
+    return len(filas)
+
+def _consulta_operaciones(usuario_id=None, operando=None, operador=None, formato=FORMATO_DICTS):
     """
-    conn = get_connection()
-    query = "SELECT * FROM operaciones"
+    Construye la consulta de operaciones con los filtros indicados.
+    Retorna una tupla (query, params).
+    """
+    columnas = "*" if formato == FORMATO_DICTS else _COLUMNAS_OPERACIONES_FLOAT
+    query = f"SELECT {columnas} FROM operaciones"
     params = []
     conditions = []
 
@@ -133,55 +245,702 @@ def obtener_operaciones(usuario_id=None, operando=None, operador=None):
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
 
-    data = []
-    with conn:
+    return query, tuple(params)
+
+@_segun_backend
+def obtener_operaciones(usuario_id=None, operando=None, operador=None, formato=FORMATO_DICTS):
+    """
+    Retorna una lista de operaciones de la tabla 'operaciones'.
+    
+    Parámetros opcionales para filtrar:
+     - usuario_id: Filtra por el ID del usuario.
+     - operando:   Filtra donde 'operando' esté en operando1 o operando2.
+     - operador:   Filtra por el operador utilizado (+, -, *, /, ^, sqrt, etc.)
+     - formato:    FORMATO_DICTS (lista de diccionarios), FORMATO_COLUMNAS (arrays NumPy
+                   float64/datetime64) o FORMATO_DATAFRAME (pandas.DataFrame con esos tipos)
+    """
+    query, params = _consulta_operaciones(usuario_id, operando, operador, formato)
+
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+    return _convertir_filas(rows, cols, formato)
+
+@_segun_backend
+def hay_operaciones(usuario_id=None):
+    """
+    Indica si existe al menos una operación (del usuario indicado, o de cualquiera).
+    """
+    query = "SELECT EXISTS (SELECT 1 FROM operaciones"
+    params = ()
+    if usuario_id is not None:
+        query += " WHERE usuario_id = %s"
+        params = (usuario_id,)
+    query += ");"
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchone()[0]
+
+@_segun_backend
+def iterar_operaciones(usuario_id=None, operando=None, operador=None,
+                       tamano_lote=TAMANO_LOTE_STREAMING, por_lotes=False, formato=FORMATO_DICTS):
+    """
+    Versión en streaming de obtener_operaciones: usa un cursor del servidor y
+    va entregando los registros sin cargar toda la tabla en memoria.
+    
+    Params:
+        usuario_id, operando, operador: Mismos filtros que obtener_operaciones
+        tamano_lote: Filas que se traen del servidor en cada viaje
+        por_lotes: Si es True se entregan listas de hasta 'tamano_lote' diccionarios;
+                   si es False, un diccionario por fila
+        formato: Formato de cada lote (ver obtener_operaciones); los formatos
+                 columnares requieren por_lotes=True
+    """
+    query, params = _consulta_operaciones(usuario_id, operando, operador, formato)
+    return _iterar_consulta(query, params, tamano_lote, por_lotes, formato)
+
+def _codificar_cursor(creado_en, id_operacion):
+    """Codifica la posición (creado_en, id) como un cursor opaco."""
+    posicion = json.dumps([creado_en.isoformat(), id_operacion])
+    return base64.urlsafe_b64encode(posicion.encode()).decode()
+
+def _decodificar_cursor(cursor):
+    """Decodifica un cursor de paginación. Lanza ValueError si no es válido."""
+    try:
+        creado_en, id_operacion = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(creado_en), int(id_operacion)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor de paginación inválido.") from e
+
+@_segun_backend
+def obtener_pagina_operaciones(usuario_id=None, operador=None, tamano_pagina=TAMANO_PAGINA, cursor=None,
+                               formato=FORMATO_DICTS):
+    """
+    Retorna una página de operaciones, de la más reciente a la más antigua.
+    
+    Usa paginación por clave (creado_en, id) en lugar de OFFSET, así que pedir
+    la página N cuesta lo mismo que pedir la primera.
+    
+    Params:
+        usuario_id: Filtra por el ID del usuario
+        operador: Filtra por el operador utilizado
+        tamano_pagina: Número máximo de operaciones por página
+        cursor: Valor 'siguiente_cursor' de la página anterior (None para la primera)
+        formato: Formato de 'operaciones' (ver obtener_operaciones)
+    
+    Returns:
+        Diccionario con 'operaciones' y 'siguiente_cursor' (None si no hay más páginas)
+    """
+    query, params = _consulta_operaciones(usuario_id=usuario_id, operador=operador, formato=formato)
+    params = list(params)
+
+    if cursor is not None:
+        query += " AND" if params else " WHERE"
+        query += " (creado_en, id) < (%s, %s)"
+        params.extend(_decodificar_cursor(cursor))
+
+    # Pedimos una fila de más para saber si existe una página siguiente
+    query += " ORDER BY creado_en DESC, id DESC LIMIT %s;"
+    params.append(tamano_pagina + 1)
+
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
             cur.execute(query, tuple(params))
             rows = cur.fetchall()
             cols = [desc[0] for desc in cur.description]
-            for row in rows:
-                registro = dict(zip(cols, row))
-                data.append(registro)
-    conn.close()
-    return data
 
-def obtener_todas_las_operaciones_unidas():
+    siguiente_cursor = None
+    if len(rows) > tamano_pagina:
+        ultima = dict(zip(cols, rows[tamano_pagina - 1]))
+        siguiente_cursor = _codificar_cursor(ultima["creado_en"], ultima["id"])
+
+    operaciones = _convertir_filas(rows[:tamano_pagina], cols, formato)
+    return {"operaciones": operaciones, "siguiente_cursor": siguiente_cursor}
+
+# Columnas que se pueden pedir a consultar_operaciones (id va primero: ver _separar_totales)
+COLUMNAS_CONSULTA = ("id", "usuario_id", "operando1", "operador", "operando2", "resultado", "creado_en", "expresion")
+_COLUMNAS_NUMERIC = ("operando1", "operando2", "resultado")
+_COLUMNAS_TOTALES = ("total_cantidad", "total_suma", "total_minimo", "total_maximo")
+
+def _proyeccion_consulta(columnas=None):
     """
-    Retorna todas las operaciones unidas con el nombre de usuario (JOIN con la tabla 'usuarios').
+    Columnas de una página de consultar_operaciones, en el orden de COLUMNAS_CONSULTA.
+    Retorna una tupla (leídas, devueltas): las devueltas son las pedidas (todas si
+    None) y las leídas añaden id y creado_en, que forman la clave de paginación.
+    Lanza ValueError si se pide una columna desconocida.
     """
-    conn = get_connection()
-    data = []
-    with conn:
+    pedidas = COLUMNAS_CONSULTA if columnas is None else tuple(columnas)
+    desconocidas = set(pedidas) - set(COLUMNAS_CONSULTA)
+    if desconocidas:
+        raise ValueError(f"Columnas no válidas: {', '.join(sorted(desconocidas))}")
+    leidas = [c for c in COLUMNAS_CONSULTA if c in pedidas or c in ("id", "creado_en")]
+    return leidas, [c for c in COLUMNAS_CONSULTA if c in pedidas]
+
+def _consulta_pagina_con_totales(usuario_id=None, operador=None, desde=None, hasta=None, columnas=None,
+                                 ascendente=False, tamano_pagina=TAMANO_PAGINA, cursor=None,
+                                 con_totales=True, convertir=True):
+    """
+    Consulta de consultar_operaciones: una página de operaciones con solo las
+    columnas necesarias y, si con_totales, cantidad, suma, mínimo y máximo de
+    resultado de todas las operaciones que cumplen los filtros, en una sola
+    sentencia. Sin filtro de fechas los totales salen de 'agregados_operaciones';
+    con él se calculan sobre las filas del intervalo (índices por usuario/operador
+    y creado_en). Con 'convertir' los NUMERIC se devuelven como float8.
+
+    Returns:
+        Tupla (query, params)
+    """
+    proyeccion, _ = _proyeccion_consulta(columnas)
+    conditions = []
+    params = []
+    if usuario_id is not None:
+        conditions.append("usuario_id = %s")
+        params.append(usuario_id)
+    if operador is not None:
+        conditions.append("operador = %s")
+        params.append(operador)
+    if desde is not None:
+        conditions.append("creado_en >= %s")
+        params.append(desde)
+    if hasta is not None:
+        conditions.append("creado_en < %s")
+        params.append(hasta)
+    filtros = list(conditions)
+    filtros_params = list(params)
+
+    if cursor is not None:
+        conditions.append(f"(creado_en, id) {'>' if ascendente else '<'} (%s, %s)")
+        params.extend(_decodificar_cursor(cursor))
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    orden = "ASC" if ascendente else "DESC"
+    seleccion = ", ".join(
+        f"{c}::float8 AS {c}" if convertir and c in _COLUMNAS_NUMERIC else c for c in proyeccion
+    )
+    # Pedimos una fila de más para saber si existe una página siguiente
+    pagina = (f"SELECT {seleccion} FROM operaciones{where} "
+              f"ORDER BY creado_en {orden}, id {orden} LIMIT %s")
+    params.append(tamano_pagina + 1)
+
+    if not con_totales:
+        return pagina + ";", tuple(params)
+
+    if desde is None and hasta is None:
+        tabla, where_totales, params_totales = _filtros_agregados(usuario_id, operador)
+        expresiones = _columnas_agregadas(convertir)
+    else:
+        tabla = "operaciones"
+        where_totales = " WHERE " + " AND ".join(filtros)
+        params_totales = tuple(filtros_params)
+        expresiones = ("COUNT(*)", "COALESCE(SUM(resultado), 0)", "MIN(resultado)", "MAX(resultado)")
+        if convertir:
+            expresiones = tuple(f"{e}::{t}" for e, t in zip(expresiones, ("bigint", "float8", "float8", "float8")))
+    totales = ", ".join(f"{e} AS {c}" for e, c in zip(expresiones, _COLUMNAS_TOTALES))
+
+    # Los totales son siempre una fila; el LEFT JOIN la conserva aunque la página esté vacía
+    query = f"""
+        WITH totales AS (SELECT {totales} FROM {tabla}{where_totales}),
+             pagina AS ({pagina})
+        SELECT totales.*, pagina.* FROM totales LEFT JOIN pagina ON TRUE
+        ORDER BY pagina.creado_en {orden}, pagina.id {orden};
+    """
+    return query, tuple(params_totales) + tuple(params)
+
+def _separar_totales(rows, cols):
+    """
+    Separa las filas de _consulta_pagina_con_totales en (filas de la página,
+    columnas de la página, totales).
+    """
+    n = len(_COLUMNAS_TOTALES)
+    cantidad, total, minimo, maximo = rows[0][:n]
+    totales = {"cantidad": cantidad, "total": float(total), "minimo": minimo, "maximo": maximo}
+    # Con la página vacía queda una única fila con sus columnas a NULL (id va primero)
+    return [row[n:] for row in rows if row[n] is not None], cols[n:], totales
+
+def _resultado_consulta(rows, cols, columnas, tamano_pagina, formato, totales=None):
+    """
+    Resultado de consultar_operaciones a partir de las filas de la página (con una
+    fila de más si hay página siguiente) en el orden de la consulta.
+    """
+    siguiente_cursor = None
+    if len(rows) > tamano_pagina:
+        ultima = dict(zip(cols, rows[tamano_pagina - 1]))
+        siguiente_cursor = _codificar_cursor(ultima["creado_en"], ultima["id"])
+    rows = rows[:tamano_pagina]
+
+    # id y creado_en se leen siempre para el cursor, pero solo se devuelven si se pidieron
+    _, pedidas = _proyeccion_consulta(columnas)
+    if rows and pedidas != list(cols):
+        indices = [list(cols).index(c) for c in pedidas]
+        rows = [tuple(row[i] for i in indices) for row in rows]
+    return {
+        "operaciones": _convertir_filas(rows, pedidas, formato),
+        "siguiente_cursor": siguiente_cursor,
+        "totales": totales,
+    }
+
+@_segun_backend
+def consultar_operaciones(usuario_id=None, operador=None, desde=None, hasta=None, columnas=None,
+                          ascendente=False, tamano_pagina=TAMANO_PAGINA, cursor=None, con_totales=True,
+                          formato=FORMATO_DICTS):
+    """
+    Consulta de operaciones para informes: filtros, columnas, orden, paginación por
+    clave y totales resueltos en la base de datos con una sola sentencia, así que
+    el coste depende del tamaño de la página y no del historial completo.
+
+    Params:
+        usuario_id, operador: Filtros de igualdad
+        desde, hasta: Intervalo de creado_en (desde incluido, hasta excluido)
+        columnas: Columnas de COLUMNAS_CONSULTA a devolver (None = todas)
+        ascendente: Orden por (creado_en, id); por defecto de la más reciente a la más antigua
+        tamano_pagina: Número máximo de operaciones por página
+        cursor: Valor 'siguiente_cursor' de la página anterior (None para la primera)
+        con_totales: Calcular también los totales (basta con pedirlos en la primera página)
+        formato: Formato de 'operaciones' (ver obtener_operaciones)
+
+    Returns:
+        Diccionario con 'operaciones', 'siguiente_cursor' (None si no hay más páginas)
+        y 'totales' (None si no se pidieron; si no, como resumen_operaciones)
+    """
+    query, params = _consulta_pagina_con_totales(usuario_id, operador, desde, hasta, columnas, ascendente,
+                                                 tamano_pagina, cursor, con_totales)
+
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+
+    totales = None
+    if con_totales:
+        rows, cols, totales = _separar_totales(rows, cols)
+    return _resultado_consulta(rows, cols, columnas, tamano_pagina, formato, totales)
+
+def _filtros_agregados(usuario_id=None, operador=None, por_dia=False, desde=None, hasta=None):
+    """
+    Tabla de agregados y filtros para las consultas de resumen: 'agregados_operaciones'
+    o, si por_dia o hay filtro de fechas ('desde' y 'hasta' incluidas),
+    'agregados_operaciones_diarios'. Retorna una tupla (tabla, where, params).
+    """
+    diaria = por_dia or desde is not None or hasta is not None
+    tabla = "agregados_operaciones_diarios" if diaria else "agregados_operaciones"
+    params = []
+    conditions = []
+
+    if usuario_id is not None:
+        conditions.append("usuario_id = %s")
+        params.append(usuario_id)
+    if operador is not None:
+        conditions.append("operador = %s")
+        params.append(operador)
+    if desde is not None:
+        conditions.append("dia >= %s")
+        params.append(desde)
+    if hasta is not None:
+        conditions.append("dia <= %s")
+        params.append(hasta)
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return tabla, where, tuple(params)
+
+def _columnas_agregadas(convertir):
+    """
+    Expresiones (cantidad, suma, minimo, maximo) que combinan varias filas de agregados.
+    Con 'convertir' los NUMERIC se devuelven como float8 (PostgreSQL); SQLite ya los
+    guarda como REAL.
+    """
+    if not convertir:
+        return ("COALESCE(SUM(cantidad), 0)", "COALESCE(SUM(suma), 0)", "MIN(minimo)", "MAX(maximo)")
+    return ("COALESCE(SUM(cantidad), 0)::bigint", "COALESCE(SUM(suma), 0)::float8",
+            "MIN(minimo)::float8", "MAX(maximo)::float8")
+
+def _consulta_resumen(usuario_id=None, operador=None, convertir=True):
+    """Consulta de resumen_operaciones sobre los agregados. Retorna (query, params)."""
+    tabla, where, params = _filtros_agregados(usuario_id, operador)
+    return f"SELECT {', '.join(_columnas_agregadas(convertir))} FROM {tabla}{where};", params
+
+def _consulta_lista_agregados(usuario_id=None, operador=None, por_dia=False, desde=None, hasta=None,
+                              convertir=True):
+    """Consulta de obtener_agregados_operaciones. Retorna (query, params)."""
+    tabla, where, params = _filtros_agregados(usuario_id, operador, por_dia, desde, hasta)
+    claves = "usuario_id, operador, dia" if por_dia else "usuario_id, operador"
+    columnas = ", ".join(
+        f"{valor} AS {nombre}"
+        for valor, nombre in zip(_columnas_agregadas(convertir), ("cantidad", "suma", "minimo", "maximo"))
+    )
+    # Cada día es una fila; sin por_dia se suman los días (o el total) de cada grupo
+    return f"SELECT {claves}, {columnas} FROM {tabla}{where} GROUP BY {claves} ORDER BY {claves};", params
+
+@_segun_backend
+def resumen_operaciones(usuario_id=None, operador=None):
+    """
+    Retorna un diccionario con 'cantidad', 'total' (suma de resultados), 'minimo' y
+    'maximo' (como float; None si no hay operaciones) de las operaciones que cumplen
+    los filtros. Se lee de 'agregados_operaciones', que los triggers mantienen al
+    insertar, así que el coste no depende del número de operaciones.
+    """
+    query, params = _consulta_resumen(usuario_id=usuario_id, operador=operador)
+
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            cantidad, total, minimo, maximo = cur.fetchone()
+    return {"cantidad": cantidad, "total": total, "minimo": minimo, "maximo": maximo}
+
+@_segun_backend
+def obtener_agregados_operaciones(usuario_id=None, operador=None, por_dia=False, desde=None, hasta=None):
+    """
+    Retorna una lista de diccionarios con 'usuario_id', 'operador', 'cantidad', 'suma',
+    'minimo' y 'maximo' por usuario y operador (y 'dia' si por_dia), ordenada por esas
+    claves. 'desde' y 'hasta' (fechas, incluidas) limitan los días sumados.
+    """
+    query, params = _consulta_lista_agregados(usuario_id, operador, por_dia, desde, hasta)
+
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+    return [dict(zip(cols, row)) for row in rows]
+
+@_segun_backend
+def estadisticas_resultados(usuario_id=None, operador=None, percentiles=PERCENTILES):
+    """
+    Estadísticas de los resultados guardados que cumplen los filtros, calculadas en
+    PostgreSQL con funciones de agregado (sin traer las filas): cantidad, suma, media,
+    mediana, desviación típica muestral, mínimo, máximo y los percentiles (0-100)
+    indicados. Retorna un diccionario como core.estadisticas.resumen_estadistico,
+    o None si no hay operaciones.
+    """
+    # Un percentil fuera de 0-100 (o nan) haría fallar PERCENTILE_CONT con un DataError
+    percentiles = _validar_percentiles(percentiles)
+    query, params = _consulta_operaciones(usuario_id=usuario_id, operador=operador)
+    fracciones = [0.5] + [p / 100 for p in percentiles]
+    query = query.replace("SELECT *", """
+        SELECT COUNT(*), SUM(resultado)::float8, AVG(resultado)::float8,
+               STDDEV_SAMP(resultado)::float8, MIN(resultado)::float8, MAX(resultado)::float8,
+               PERCENTILE_CONT(%s::float8[]) WITHIN GROUP (ORDER BY resultado::float8)""", 1)
+
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, (fracciones,) + params)
+            cantidad, suma, media, desviacion, minimo, maximo, cortes = cur.fetchone()
+    if cantidad == 0:
+        return None
+    return {
+        "cantidad": cantidad,
+        "suma": suma,
+        "media": media,
+        "mediana": cortes[0],
+        "desviacion": desviacion,
+        "minimo": minimo,
+        "maximo": maximo,
+        "percentiles": dict(zip(percentiles, cortes[1:])),
+    }
+
+def _sentencias_analitica(hora="date_trunc('hour', creado_en)", menor="LEAST", mayor="GREATEST"):
+    """
+    Sentencias que suman a los resúmenes analíticos las operaciones con id en
+    (%s, %s]. 'hora' trunca creado_en a la hora y 'menor'/'mayor' son las funciones
+    de mínimo y máximo de dos valores (SQLite usa otras).
+    Retorna una tupla (por hora, por usuario).
+
+    Cuentan con que ninguna operación tiene creado_en nulo (la hora de la clave
+    primaria de analitica_por_hora no puede serlo): lo garantizan la migración 3
+    de PostgreSQL y la 6 de SQLite, que rellenan las antiguas y rechazan las nuevas.
+    """
+    por_hora = f"""
+        INSERT INTO analitica_por_hora (hora, operador, cantidad, suma, minimo, maximo)
+        SELECT {hora}, operador, COUNT(*), SUM(resultado), MIN(resultado), MAX(resultado)
+        FROM operaciones
+        WHERE id > %s AND id <= %s
+        GROUP BY 1, 2
+        ON CONFLICT (hora, operador) DO UPDATE SET
+            cantidad = analitica_por_hora.cantidad + excluded.cantidad,
+            suma = analitica_por_hora.suma + excluded.suma,
+            minimo = {menor}(analitica_por_hora.minimo, excluded.minimo),
+            maximo = {mayor}(analitica_por_hora.maximo, excluded.maximo);
+    """
+    por_usuario = f"""
+        INSERT INTO analitica_por_usuario (usuario_id, cantidad, suma, primera, ultima)
+        SELECT usuario_id, COUNT(*), SUM(resultado), MIN(creado_en), MAX(creado_en)
+        FROM operaciones
+        WHERE id > %s AND id <= %s
+        GROUP BY usuario_id
+        ON CONFLICT (usuario_id) DO UPDATE SET
+            cantidad = analitica_por_usuario.cantidad + excluded.cantidad,
+            suma = analitica_por_usuario.suma + excluded.suma,
+            primera = {menor}(analitica_por_usuario.primera, excluded.primera),
+            ultima = {mayor}(analitica_por_usuario.ultima, excluded.ultima);
+    """
+    return por_hora, por_usuario
+
+def _consulta_analitica_por_hora(desde=None, hasta=None, convertir=True):
+    """Consulta de obtener_analitica_por_hora. Retorna (query, params)."""
+    conditions = []
+    params = []
+    if desde is not None:
+        conditions.append("hora >= %s")
+        params.append(desde)
+    if hasta is not None:
+        conditions.append("hora < %s")
+        params.append(hasta)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    numericas = ("suma::float8 AS suma, minimo::float8 AS minimo, maximo::float8 AS maximo"
+                 if convertir else "suma, minimo, maximo")
+    return (f"SELECT hora, operador, cantidad, {numericas} FROM analitica_por_hora{where} "
+            f"ORDER BY hora, operador;", tuple(params))
+
+def _consulta_analitica_por_usuario(limite=None, convertir=True):
+    """Consulta de obtener_analitica_por_usuario. Retorna (query, params)."""
+    suma = "a.suma::float8 AS suma" if convertir else "a.suma"
+    query = f"""
+        SELECT a.usuario_id, u.nombre, a.cantidad, {suma}, a.primera, a.ultima
+        FROM analitica_por_usuario a
+        JOIN usuarios u ON u.id = a.usuario_id
+        ORDER BY a.cantidad DESC, a.usuario_id
+    """
+    if limite is None:
+        return query + ";", ()
+    return query + " LIMIT %s;", (limite,)
+
+@_segun_backend
+def actualizar_analitica(reconstruir=False):
+    """
+    Pone al día los resúmenes analíticos (analitica_por_hora y analitica_por_usuario)
+    sumando solo las operaciones con id posterior a la marca de agua, y avanza la
+    marca. Con 'reconstruir' se vacían y se recalculan desde cero (p. ej. tras
+    borrar operaciones, que el proceso incremental no descuenta).
+
+    Antes de leer el último id se espera a que terminen las inserciones en curso
+    (LOCK ... IN SHARE MODE, en una transacción aparte y breve): así ninguna
+    operación con id menor que la marca puede confirmarse después y quedarse fuera.
+
+    Returns:
+        Diccionario con 'desde_id' y 'hasta_id' (intervalo procesado, desde excluido)
+    """
+    with conexion() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("LOCK TABLE operaciones IN SHARE MODE;")
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM operaciones;")
+                hasta_id = cur.fetchone()[0]
+
+        with conn:
+            with conn.cursor() as cur:
+                # FOR UPDATE: dos actualizaciones a la vez no suman el mismo intervalo
+                cur.execute("SELECT ultimo_id FROM analitica_marca FOR UPDATE;")
+                desde_id = cur.fetchone()[0]
+                if reconstruir:
+                    cur.execute("TRUNCATE analitica_por_hora, analitica_por_usuario;")
+                    desde_id = 0
+                if hasta_id > desde_id:
+                    for sentencia in _sentencias_analitica():
+                        cur.execute(sentencia, (desde_id, hasta_id))
+                cur.execute(
+                    "UPDATE analitica_marca SET ultimo_id = %s, actualizado_en = now();",
+                    (max(desde_id, hasta_id),)
+                )
+    return {"desde_id": desde_id, "hasta_id": max(desde_id, hasta_id)}
+
+@_segun_backend
+def estado_analitica():
+    """
+    Retorna un diccionario con 'ultimo_id' (marca de agua), 'actualizado_en' y
+    'pendientes' (operaciones con id posterior a la marca).
+    """
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT 
-                    o.id as operacion_id,
-                    u.id as usuario_id,
-                    u.nombre as usuario,
-                    o.operando1,
-                    o.operador,
-                    o.operando2,
-                    o.resultado,
-                    o.creado_en as operacion_creado_en
-                FROM operaciones o
-                JOIN usuarios u ON o.usuario_id = u.id
-                ORDER BY o.id ASC;
+                SELECT m.ultimo_id, m.actualizado_en,
+                       (SELECT COUNT(*) FROM operaciones WHERE id > m.ultimo_id)
+                FROM analitica_marca m;
             """)
+            ultimo_id, actualizado_en, pendientes = cur.fetchone()
+    return {"ultimo_id": ultimo_id, "actualizado_en": actualizado_en, "pendientes": pendientes}
+
+@_segun_backend
+def obtener_analitica_por_hora(desde=None, hasta=None):
+    """
+    Retorna una lista de diccionarios con 'hora' (inicio de la hora), 'operador',
+    'cantidad', 'suma', 'minimo' y 'maximo', ordenada por hora y operador. 'desde'
+    (incluido) y 'hasta' (excluido) limitan las horas.
+    """
+    query, params = _consulta_analitica_por_hora(desde, hasta)
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
             rows = cur.fetchall()
             cols = [desc[0] for desc in cur.description]
-            for row in rows:
-                registro = dict(zip(cols, row))
-                data.append(registro)
-    conn.close()
-    return data
+    return [dict(zip(cols, row)) for row in rows]
+
+@_segun_backend
+def obtener_analitica_por_usuario(limite=None):
+    """
+    Retorna una lista de diccionarios con 'usuario_id', 'nombre', 'cantidad', 'suma',
+    'primera' y 'ultima' (fechas de su primera y última operación), de más a menos
+    operaciones. 'limite' devuelve solo los primeros.
+    """
+    query, params = _consulta_analitica_por_usuario(limite)
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+    return [dict(zip(cols, row)) for row in rows]
+
+# Columnas de 'operaciones_matriciales' que guardan arrays en formato .npy
+_COLUMNAS_ARRAYS = ("operando1", "operando2", "resultado")
+
+def _fila_matricial(row, cols):
+    """Diccionario de una operación matricial con sus arrays ya deserializados."""
+    fila = dict(zip(cols, row))
+    for columna in _COLUMNAS_ARRAYS:
+        valor = de_bytes(fila[columna])
+        # Los resultados escalares (det, dot de vectores) se guardan como arrays de 0 dimensiones
+        fila[columna] = valor.item() if valor is not None and valor.ndim == 0 else valor
+    return fila
 
+@_segun_backend
+def insertar_operacion_matricial(usuario_id, operando1, operador, operando2, resultado):
+    """
+    Inserta una operación con vectores o matrices en 'operaciones_matriciales'.
+    Los operandos y el resultado (arrays o escalares) se guardan en formato .npy;
+    operando2 puede ser None (operadores unarios). Retorna el ID de la operación.
+    """
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO operaciones_matriciales (usuario_id, operador, operando1, operando2, resultado)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING id;
+            """, (usuario_id, operador, a_bytes(operando1), a_bytes(operando2), a_bytes(resultado)))
+            return cur.fetchone()[0]
+
+@_segun_backend
+def obtener_operaciones_matriciales(usuario_id=None, operador=None):
+    """
+    Retorna las operaciones matriciales (de la más reciente a la más antigua) como
+    diccionarios con los operandos y el resultado como arrays de NumPy (o float si
+    el resultado es un escalar).
+    """
+    query, params = _consulta_operaciones(usuario_id=usuario_id, operador=operador)
+    query = query.replace("FROM operaciones", "FROM operaciones_matriciales", 1)
+    query += " ORDER BY creado_en DESC, id DESC;"
+
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+    return [_fila_matricial(row, cols) for row in rows]
+
+def _consulta_operaciones_unidas(formato=FORMATO_DICTS):
+    """Consulta de todas las operaciones con el nombre de usuario."""
+    numerico = "{}" if formato == FORMATO_DICTS else "{}::float8"
+    return f"""
+        SELECT 
+            o.id as operacion_id,
+            u.id as usuario_id,
+            u.nombre as usuario,
+            {numerico.format("o.operando1")} as operando1,
+            o.operador,
+            {numerico.format("o.operando2")} as operando2,
+            {numerico.format("o.resultado")} as resultado,
+            o.creado_en as operacion_creado_en
+        FROM operaciones o
+        JOIN usuarios u ON o.usuario_id = u.id
+        ORDER BY o.id ASC;
+    """
+
+@_segun_backend
+def rango_ids_operaciones():
+    """
+    Retorna una tupla (id mínimo, id máximo) de la tabla 'operaciones',
+    o (None, None) si está vacía.
+    """
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(id), MAX(id) FROM operaciones;")
+            return cur.fetchone()
+
+@_segun_backend
+def obtener_operaciones_por_ids(desde_id, hasta_id, formato=FORMATO_DICTS):
+    """
+    Retorna las operaciones con desde_id <= id < hasta_id, ordenadas por id.
+    Permite recorrer la tabla por rangos de clave primaria (p. ej. en paralelo).
+    Ver obtener_operaciones para los valores de 'formato'.
+    """
+    query, _ = _consulta_operaciones(formato=formato)
+    query += " WHERE id >= %s AND id < %s ORDER BY id;"
+
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(query, (desde_id, hasta_id))
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+    return _convertir_filas(rows, cols, formato)
+
+@_segun_backend
+def obtener_todas_las_operaciones_unidas(formato=FORMATO_DICTS):
+    """
+    Retorna todas las operaciones unidas con el nombre de usuario (JOIN con la tabla 'usuarios').
+    Ver obtener_operaciones para los valores de 'formato'.
+    """
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute(_consulta_operaciones_unidas(formato))
+            rows = cur.fetchall()
+            cols = [desc[0] for desc in cur.description]
+    return _convertir_filas(rows, cols, formato)
+
+@_segun_backend
+def iterar_todas_las_operaciones_unidas(tamano_lote=TAMANO_LOTE_STREAMING, por_lotes=False,
+                                        formato=FORMATO_DICTS):
+    """
+    Versión en streaming de obtener_todas_las_operaciones_unidas (cursor del servidor).
+    Ver iterar_operaciones para el significado de 'tamano_lote', 'por_lotes' y 'formato'.
+    """
+    return _iterar_consulta(_consulta_operaciones_unidas(formato), (), tamano_lote, por_lotes, formato)
+
+def _iterar_consulta(query, params, tamano_lote, por_lotes, formato=FORMATO_DICTS):
+    """
+    Ejecuta 'query' con un cursor con nombre (del lado del servidor) y entrega los
+    resultados de 'tamano_lote' en 'tamano_lote', en el formato pedido.
+    La conexión del pool queda ocupada hasta que se agota o se cierra el generador.
+    """
+    if formato != FORMATO_DICTS and not por_lotes:
+        raise ValueError("Los formatos columnares solo pueden leerse por lotes (por_lotes=True).")
+    return _generar_consulta(query, params, tamano_lote, por_lotes, formato)
+
+def _generar_consulta(query, params, tamano_lote, por_lotes, formato):
+    with conexion() as conn, conn:
+        nombre_cursor = f"calc_stream_{uuid.uuid4().hex}"
+        with conn.cursor(name=nombre_cursor) as cur:
+            cur.itersize = tamano_lote
+            cur.execute(query, params)
+            cols = None
+            while True:
+                rows = cur.fetchmany(tamano_lote)
+                if not rows:
+                    break
+                if cols is None:
+                    cols = [desc[0] for desc in cur.description]
+                lote = _convertir_filas(rows, cols, formato)
+                if por_lotes:
+                    yield lote
+                else:
+                    yield from lote
+
+@_segun_backend
 def obtener_todos_usuarios():
     """
     Retorna una lista de todos los usuarios registrados.
     """
-    conn = get_connection()
     usuarios = []
-    with conn:
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
             cur.execute("SELECT id, nombre, es_superusuario, creado_en FROM usuarios ORDER BY id;")
             rows = cur.fetchall()
@@ -189,22 +948,42 @@ def obtener_todos_usuarios():
             for row in rows:
                 usuario = dict(zip(cols, row))
                 usuarios.append(usuario)
-    conn.close()
     return usuarios
 
+@_segun_backend
 def guardar_en_historial(usuario_id, fecha_hora, descripcion):
     """
     Guarda una entrada de historial en la base de datos.
     """
-    conn = get_connection()
-    with conn:
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
-            cur.execute("""
+            ejecutar_sentencia(cur, "guardar_historial", (usuario_id, fecha_hora, descripcion))
+
+@_segun_backend
+def guardar_en_historial_lote(filas):
+    """
+    Guarda varias entradas de historial con un único INSERT multi-fila.
+    
+    Args:
+        filas: Lista de tuplas (usuario_id, fecha_hora, descripcion)
+    
+    Returns:
+        Número de filas insertadas
+    """
+    if not filas:
+        return 0
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            if len(filas) == 1:
+                ejecutar_sentencia(cur, "guardar_historial", filas[0])
+                return 1
+            execute_values(cur, """
                 INSERT INTO historial_memoria (usuario_id, fecha_hora, descripcion)
-                VALUES (%s, %s, %s);
-            """, (usuario_id, fecha_hora, descripcion))
-    conn.close()
+                VALUES %s;
+            """, filas, page_size=len(filas))
+    return len(filas)
 
+@_segun_backend
 def obtener_historial(usuario_id=None, horas_limite=24):
     """
     Obtiene el historial de las últimas horas_limite para un usuario específico o todos.
@@ -216,50 +995,55 @@ def obtener_historial(usuario_id=None, horas_limite=24):
     Returns:
         Una lista de diccionarios con los campos: usuario_id, usuario_nombre, fecha_hora, descripcion
     """
-    conn = get_connection()
     fecha_limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
     
-    query = """
-        SELECT h.id, h.usuario_id, u.nombre as usuario_nombre, h.fecha_hora, h.descripcion
-        FROM historial_memoria h
-        JOIN usuarios u ON h.usuario_id = u.id
-        WHERE h.fecha_hora > %s
-    """
-    
-    params = [fecha_limite]
-    
+    # Sentencias preparadas (ver calculadora/db/sentencias.py)
     if usuario_id is not None:
-        query += " AND h.usuario_id = %s"
-        params.append(usuario_id)
-    
-    query += " ORDER BY h.fecha_hora DESC"
+        nombre, params = "historial_usuario", (fecha_limite, usuario_id)
+    else:
+        nombre, params = "historial_todos", (fecha_limite,)
     
     data = []
-    with conn:
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
-            cur.execute(query, params)
+            ejecutar_sentencia(cur, nombre, params)
             rows = cur.fetchall()
             cols = [desc[0] for desc in cur.description]
             for row in rows:
                 registro = dict(zip(cols, row))
                 data.append(registro)
-    conn.close()
     return data
 
+@_segun_backend
 def limpiar_historial_antiguo(horas_limite=24):
     """
-    Elimina entradas del historial más antiguas que las horas especificadas.
+    Elimina entradas del historial más antiguas que las horas especificadas,
+    borrando las particiones diarias vencidas (ver calculadora/db/particiones.py).
+    Retorna el número aproximado de entradas eliminadas.
     """
-    conn = get_connection()
-    fecha_limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
-    
-    with conn:
+    return purgar_particiones_historial(horas_limite)
+
+@_segun_backend
+def obtener_usuario_por_id(usuario_id):
+    """
+    Retorna una tupla (id, nombre, password, es_superusuario) si existe un usuario con ese ID,
+    o None si no existe.
+    """
+    usuario = None
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, nombre, password, es_superusuario FROM usuarios WHERE id = %s;", (usuario_id,))
+            usuario = cur.fetchone()
+    return usuario
+
+@_segun_backend
+def marcar_superusuario(usuario_id):
+    """
+    Marca al usuario indicado como superusuario.
+    """
+    with conexion() as conn, conn:
         with conn.cursor() as cur:
             cur.execute("""
-                DELETE FROM historial_memoria
-                WHERE fecha_hora < %s;
-            """, (fecha_limite,))
-            eliminados = cur.rowcount
-    conn.close()
-    
-    return eliminados
\ No newline at end of file
+                UPDATE usuarios SET es_superusuario = TRUE
+                WHERE id = %s;
+            """, (usuario_id,))
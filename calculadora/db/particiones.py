@@ -0,0 +1,147 @@
+# calculadora/db/particiones.py
+
+"""
+Mantenimiento de las particiones diarias de 'historial_memoria'.
+
+La tabla está particionada por rango de 'fecha_hora' (migración 5), con una
+partición por día llamada historial_memoria_pAAAAMMDD y una partición por defecto
+para las filas que caen fuera de ellas. La aplicación crea por adelantado las
+particiones de los próximos días y la retención se hace separando (DETACH) y
+borrando (DROP) las particiones vencidas, con un coste que no depende del número
+de filas. Las consultas filtradas por 'fecha_hora' solo leen las particiones
+necesarias (partition pruning).
+"""
+
+import datetime
+import re
+
+from calculadora.db.connection import conexion
+
+# Clave del advisory lock que evita que dos procesos creen o borren particiones a la vez
+_CLAVE_LOCK_PARTICIONES = 7152026
+
+_PREFIJO_PARTICION = "historial_memoria_p"
+_PATRON_PARTICION = re.compile(r"^historial_memoria_p(\d{8})$")
+PARTICION_DEFECTO = "historial_memoria_default"
+
+# Días por delante de hoy que deben tener partición
+DIAS_ADELANTE = 2
+
+
+def nombre_particion(dia):
+    """Nombre de la partición que guarda las filas del día 'dia'."""
+    return f"{_PREFIJO_PARTICION}{dia:%Y%m%d}"
+
+
+def _listar_particiones(cur):
+    """Retorna un diccionario {fecha: nombre} con las particiones diarias existentes."""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'historial_memoria'::regclass;
+    """)
+    particiones = {}
+    for (nombre,) in cur.fetchall():
+        coincidencia = _PATRON_PARTICION.match(nombre)
+        if coincidencia:
+            dia = datetime.datetime.strptime(coincidencia.group(1), "%Y%m%d").date()
+            particiones[dia] = nombre
+    return particiones
+
+
+def _crear_particion(cur, dia):
+    """
+    Crea la partición del día 'dia'. Si la partición por defecto ya tiene filas de
+    ese día (PostgreSQL no permitiría crearla), se mueven a la nueva partición.
+    """
+    desde = dia.isoformat()
+    hasta = (dia + datetime.timedelta(days=1)).isoformat()
+    nombre = nombre_particion(dia)
+
+    cur.execute(f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {PARTICION_DEFECTO}
+            WHERE fecha_hora >= %s AND fecha_hora < %s
+        );
+    """, (desde, hasta))
+    hay_filas = cur.fetchone()[0]
+
+    if hay_filas:
+        cur.execute("CREATE TEMP TABLE historial_movido (LIKE historial_memoria);")
+        cur.execute(f"""
+            WITH movidas AS (
+                DELETE FROM {PARTICION_DEFECTO}
+                WHERE fecha_hora >= %s AND fecha_hora < %s
+                RETURNING *
+            )
+            INSERT INTO historial_movido SELECT * FROM movidas;
+        """, (desde, hasta))
+
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {nombre}
+        PARTITION OF historial_memoria FOR VALUES FROM (%s) TO (%s);
+    """, (desde, hasta))
+
+    if hay_filas:
+        cur.execute("INSERT INTO historial_memoria SELECT * FROM historial_movido;")
+        cur.execute("DROP TABLE historial_movido;")
+
+
+def asegurar_particiones_historial(dias_adelante=DIAS_ADELANTE, desde=None):
+    """
+    Crea las particiones que falten desde 'desde' (hoy por defecto; una fecha
+    anterior sirve para cargar historial con fechas pasadas) hasta 'dias_adelante'
+    días después de hoy.
+
+    Returns:
+        Lista con los nombres de las particiones creadas
+    """
+    hoy = datetime.date.today()
+    desde = min(desde or hoy, hoy)
+    creadas = []
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_CLAVE_LOCK_PARTICIONES,))
+            existentes = _listar_particiones(cur)
+            for i in range((hoy - desde).days + dias_adelante + 1):
+                dia = desde + datetime.timedelta(days=i)
+                if dia not in existentes:
+                    _crear_particion(cur, dia)
+                    creadas.append(nombre_particion(dia))
+    return creadas
+
+
+def purgar_particiones_historial(horas_limite=24):
+    """
+    Elimina el historial anterior a 'horas_limite' horas. Las particiones diarias
+    completamente vencidas se separan y se borran; de la partición por defecto,
+    que solo recoge filas sueltas, se borran las filas antiguas con un DELETE.
+    Una partición se conserva mientras tenga alguna fila dentro del plazo, así que
+    obtener_historial sigue filtrando por fecha.
+
+    Returns:
+        Número aproximado de filas eliminadas (estadísticas de las particiones
+        borradas más las filas borradas de la partición por defecto)
+    """
+    limite = datetime.datetime.now() - datetime.timedelta(hours=horas_limite)
+    eliminados = 0
+    with conexion() as conn, conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_CLAVE_LOCK_PARTICIONES,))
+            for dia, nombre in sorted(_listar_particiones(cur).items()):
+                fin = datetime.datetime.combine(dia + datetime.timedelta(days=1), datetime.time())
+                if fin > limite:
+                    break
+                # Contar las filas exactas costaría tanto como borrarlas: usamos la estimación
+                cur.execute(
+                    "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = %s::regclass;",
+                    (nombre,)
+                )
+                eliminados += cur.fetchone()[0]
+                cur.execute(f"ALTER TABLE historial_memoria DETACH PARTITION {nombre};")
+                cur.execute(f"DROP TABLE {nombre};")
+
+            cur.execute(f"DELETE FROM {PARTICION_DEFECTO} WHERE fecha_hora < %s;", (limite,))
+            eliminados += cur.rowcount
+    return eliminados
@@ -0,0 +1,130 @@
+# calculadora/db/sentencias.py
+
+"""
+Registro de sentencias preparadas del lado del servidor para las consultas más frecuentes.
+
+Cada conexión del pool prepara estas sentencias una sola vez (PREPARE), de modo que
+PostgreSQL no tiene que volver a analizarlas ni planificarlas en cada llamada.
+Si una sentencia no se pudo preparar (por ejemplo, porque la tabla aún no existía)
+o las sentencias preparadas están desactivadas, se ejecuta el SQL normal.
+
+Variables de entorno:
+    CALCULADORA_SENTENCIAS_PREPARADAS: '0' para desactivarlas (por defecto activadas)
+"""
+
+import os
+
+import psycopg2
+from psycopg2 import extensions
+
+# nombre -> (tipos de los parámetros, SQL con marcadores %s)
+SENTENCIAS = {
+    "usuario_por_nombre": (
+        "text",
+        "SELECT id, nombre, password, es_superusuario FROM usuarios WHERE nombre = %s"
+    ),
+    "insertar_operacion": (
+        "int, numeric, varchar, numeric, numeric",
+        """INSERT INTO operaciones (usuario_id, operando1, operador, operando2, resultado)
+           VALUES (%s, %s, %s, %s, %s)"""
+    ),
+    "insertar_operacion_con_fecha": (
+        "int, numeric, varchar, numeric, numeric, timestamp, text",
+        """INSERT INTO operaciones (usuario_id, operando1, operador, operando2, resultado, creado_en, expresion)
+           VALUES (%s, %s, %s, %s, %s, %s, %s)"""
+    ),
+    "guardar_historial": (
+        "int, timestamp, text",
+        "INSERT INTO historial_memoria (usuario_id, fecha_hora, descripcion) VALUES (%s, %s, %s)"
+    ),
+    "historial_todos": (
+        "timestamp",
+        """SELECT h.id, h.usuario_id, u.nombre as usuario_nombre, h.fecha_hora, h.descripcion
+           FROM historial_memoria h
+           JOIN usuarios u ON h.usuario_id = u.id
+           WHERE h.fecha_hora > %s
+           ORDER BY h.fecha_hora DESC"""
+    ),
+    "historial_usuario": (
+        "timestamp, int",
+        """SELECT h.id, h.usuario_id, u.nombre as usuario_nombre, h.fecha_hora, h.descripcion
+           FROM historial_memoria h
+           JOIN usuarios u ON h.usuario_id = u.id
+           WHERE h.fecha_hora > %s AND h.usuario_id = %s
+           ORDER BY h.fecha_hora DESC"""
+    ),
+}
+
+# Prefijo de los nombres en el servidor, para no chocar con otras sentencias
+_PREFIJO = "calc_"
+
+
+class ConexionCalculadora(extensions.connection):
+    """
+    Conexión psycopg2 que recuerda qué sentencias tiene preparadas.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sentencias_preparadas = set()
+
+
+def sentencias_activadas():
+    """Indica si se deben usar sentencias preparadas."""
+    return os.getenv("CALCULADORA_SENTENCIAS_PREPARADAS", "1") != "0"
+
+
+def _sql_preparado(sql):
+    """Convierte los marcadores %s en $1, $2, ... para PREPARE."""
+    partes = sql.split("%s")
+    resultado = partes[0]
+    for i, parte in enumerate(partes[1:], start=1):
+        resultado += f"${i}" + parte
+    return resultado
+
+
+def _preparar(cur, nombre, preparadas):
+    """
+    Prepara una sentencia dentro de un SAVEPOINT, para que un fallo no aborte
+    la transacción en curso. Retorna True si quedó preparada.
+    """
+    tipos, sql = SENTENCIAS[nombre]
+    try:
+        cur.execute("SAVEPOINT calc_preparar;")
+        cur.execute(f"PREPARE {_PREFIJO}{nombre} ({tipos}) AS {_sql_preparado(sql)};")
+        cur.execute("RELEASE SAVEPOINT calc_preparar;")
+    except psycopg2.Error:
+        cur.execute("ROLLBACK TO SAVEPOINT calc_preparar;")
+        return False
+    preparadas.add(nombre)
+    return True
+
+
+def preparar_sentencias(conn):
+    """
+    Prepara todas las sentencias del registro en una conexión recién creada.
+    Se registra en el pool como gancho 'al crear'. Las que no se puedan preparar
+    (por ejemplo, si la tabla aún no existe) se intentarán de nuevo al usarse.
+    """
+    if not sentencias_activadas() or not hasattr(conn, "sentencias_preparadas"):
+        return
+    with conn.cursor() as cur:
+        for nombre in SENTENCIAS:
+            _preparar(cur, nombre, conn.sentencias_preparadas)
+    conn.commit()
+
+
+def ejecutar_sentencia(cur, nombre, params):
+    """
+    Ejecuta la sentencia 'nombre' del registro con los parámetros dados.
+    Usa EXECUTE sobre la sentencia preparada de la conexión; si no está preparada
+    intenta prepararla y, si no es posible, ejecuta el SQL normal.
+    """
+    preparadas = getattr(cur.connection, "sentencias_preparadas", None)
+
+    if preparadas is not None and sentencias_activadas():
+        if nombre in preparadas or _preparar(cur, nombre, preparadas):
+            marcadores = ", ".join(["%s"] * len(params))
+            cur.execute(f"EXECUTE {_PREFIJO}{nombre} ({marcadores});", params)
+            return
+
+    cur.execute(SENTENCIAS[nombre][1], params)
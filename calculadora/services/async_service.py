@@ -0,0 +1,51 @@
+# calculadora/services/async_service.py
+
+"""
+Versión asíncrona de los servicios de operaciones y usuarios, sobre
+calculadora/db/async_models.py. Pensada para atender muchas sesiones concurrentes
+desde un único proceso con asyncio (por ejemplo, un servidor web).
+"""
+
+import datetime
+
+from calculadora.db import async_models
+from calculadora.services.operation_service import calcular
+from calculadora.services.user_service import hashear_password, verificar_password
+
+async def realizar_operacion_async(usuario_id, operando1, operador, operando2):
+    """
+    Realiza la operación, la guarda en la DB y retorna el resultado.
+    Lanza las mismas excepciones que realizar_operacion.
+    """
+    resultado = calcular(operando1, operador, operando2)
+    await async_models.insertar_operacion(usuario_id, operando1, operador, operando2, resultado)
+    return resultado
+
+async def registrar_en_historial_async(usuario_id, descripcion):
+    """
+    Guarda una entrada en el historial del usuario con la fecha y hora actuales.
+    """
+    await async_models.guardar_en_historial(usuario_id, datetime.datetime.now(), descripcion)
+
+async def autenticar_usuario_async(nombre, password):
+    """
+    Verifica si el usuario existe y la contraseña coincide con el hash almacenado.
+    Retorna una tupla (user_id, es_superusuario) en caso de éxito, o (None, None) si no coincide.
+    """
+    usuario = await async_models.obtener_usuario_por_nombre(nombre)
+    if usuario:
+        user_id, _, password_almacenado, es_superusuario = usuario
+        if verificar_password(password, password_almacenado):
+            return user_id, es_superusuario
+    return None, None
+
+async def crear_usuario_si_no_existe_async(nombre, password, es_superusuario=False):
+    """
+    Crea un usuario nuevo con contraseña hasheada si no existe.
+    Retorna una tupla (user_id, es_superusuario) del usuario nuevo o del existente.
+    """
+    usuario = await async_models.obtener_usuario_por_nombre(nombre)
+    if usuario is not None:
+        return usuario[0], usuario[3]
+    user_id = await async_models.insertar_usuario(nombre, hashear_password(password), es_superusuario)
+    return user_id, es_superusuario
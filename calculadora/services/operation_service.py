@@ -1,12 +1,26 @@
 # calculadora/services/operation_service.py
 
+import datetime
+from itertools import repeat
+
+import numpy as np
+
 from calculadora.core.operators import operators
-from calculadora.db.models import insertar_operacion
+from calculadora.core.cache_resultados import obtener_cache_resultados
+from calculadora.core.estadisticas import PERCENTILES, leer_numeros, resumen_estadistico
+from calculadora.core.evaluacion_lote import evaluar_lote, CODIGOS_OPERADOR, ERROR_NINGUNO
+from calculadora.core.expresiones import compilar
+from calculadora.core.matrices import calcular_matricial
+from calculadora.db.escritura_diferida import encolar_operacion, vaciar_escrituras
+from calculadora.db.models import (
+    insertar_operaciones_lote,
+    insertar_operacion_matricial,
+    estadisticas_resultados
+)
 
-def realizar_operacion(usuario_id, operando1, operador, operando2):
+def calcular(operando1, operador, operando2):
     """
-    Realiza la operación definida por 'operador' con operando1 y operando2.
-    Guarda el resultado en la DB y retorna el resultado.
+    Valida y calcula la operación definida por 'operador' sin guardarla.
     """
     if operador not in operators:
         raise ValueError("Operador inválido.")
@@ -15,10 +29,111 @@ def realizar_operacion(usuario_id, operando1, operador, operando2):
     if operador == '/' and operando2 == 0:
         raise ZeroDivisionError("División por cero no permitida.")
 
+    # Los operadores son puros: si la caché está activada se reutilizan resultados
+    cache = obtener_cache_resultados()
+    if cache is not None:
+        return cache.calcular(operando1, operador, operando2, operators[operador])
+
     # Para sqrt, se ignora operando2 en la lambda, pero lo enviamos igual
-    resultado = operators[operador](operando1, operando2)
+    return operators[operador](operando1, operando2)
+
+def realizar_operacion(usuario_id, operando1, operador, operando2):
+    """
+    Realiza la operación definida por 'operador' con operando1 y operando2.
+    Encola el resultado para guardarlo en la DB (en lote) y retorna el resultado.
+    """
+    resultado = calcular(operando1, operador, operando2)
+
+    # Guardamos la operación en la DB mediante escritura diferida
+    encolar_operacion(usuario_id, operando1, operador, operando2, resultado)
+
+    return resultado
+
+def realizar_operaciones_lote(usuario_id, operandos1, operadores, operandos2=None, guardar=True):
+    """
+    Versión por lotes de realizar_operacion: evalúa todas las operaciones con NumPy
+    (ver calculadora/core/evaluacion_lote.py) y guarda las válidas con un único
+    INSERT multi-fila. Las operaciones con error no se guardan ni lanzan excepción.
+
+    Args:
+        usuario_id: ID del usuario al que se atribuyen las operaciones
+        operandos1, operadores, operandos2: Arrays o secuencias de la misma longitud
+        guardar: Si es False solo se evalúa
+
+    Returns:
+        ResultadoLote con los arrays 'resultados' (NaN donde hay error) y 'errores'
+    """
+    resultado = evaluar_lote(operandos1, operadores, operandos2)
+    if not guardar:
+        return resultado
 
-    # Guardamos la operación en la DB
-    insertar_operacion(usuario_id, operando1, operador, operando2, resultado)
+    validos = resultado.errores == ERROR_NINGUNO
+    if validos.any():
+        a = np.asarray(operandos1, dtype=np.float64).reshape(-1)[validos]
+        if operandos2 is None:
+            b = np.zeros(len(a))
+        else:
+            b = np.asarray(operandos2, dtype=np.float64).reshape(-1)[validos]
+        operadores = np.asarray(operadores).reshape(-1)[validos]
+        if operadores.dtype.kind in "iu":
+            operadores = np.asarray(CODIGOS_OPERADOR)[operadores]
 
+        filas = list(zip(
+            repeat(usuario_id), a.tolist(), operadores.tolist(), b.tolist(),
+            resultado.resultados[validos].tolist(), repeat(datetime.datetime.now()), repeat(None)
+        ))
+        insertar_operaciones_lote(filas)
+
+    return resultado
+
+def describir_expresion(expresion, variables=None):
+    """Texto con el que se guarda una expresión: fuente normalizada y valores de sus variables."""
+    if not variables:
+        return expresion.fuente
+    valores = ", ".join(f"{nombre}={variables[nombre]}" for nombre in expresion.variables)
+    return f"{expresion.fuente} [{valores}]"
+
+def realizar_expresion(usuario_id, fuente, variables=None):
+    """
+    Evalúa una expresión completa (ver calculadora/core/expresiones.py) y la guarda
+    como una única operación con operador 'expr' y el texto en la columna 'expresion'.
+    Lanza ValueError si la expresión no es válida y ZeroDivisionError al dividir entre cero.
+    """
+    expresion = compilar(fuente)
+    resultado = expresion.evaluar(variables)
+
+    encolar_operacion(usuario_id, 0, 'expr', 0, resultado, describir_expresion(expresion, variables))
+
+    return resultado
+
+def estadisticas_de_numeros(valores, percentiles=PERCENTILES):
+    """
+    Estadísticas (ver calculadora/core/estadisticas.py) de una lista de números o de
+    un texto con números separados por espacios o comas. Lanza ValueError si no hay
+    números válidos.
+    """
+    if isinstance(valores, str):
+        valores = leer_numeros(valores)
+    return resumen_estadistico(valores, percentiles)
+
+def estadisticas_historial(usuario_id, operador=None, percentiles=PERCENTILES):
+    """
+    Estadísticas de los resultados guardados de un usuario (opcionalmente solo de un
+    operador), calculadas en la base de datos. Lanza ValueError si no hay operaciones.
+    """
+    # Deben contar también las operaciones aún pendientes de escribir
+    vaciar_escrituras()
+    estadisticas = estadisticas_resultados(usuario_id=usuario_id, operador=operador, percentiles=percentiles)
+    if estadisticas is None:
+        raise ValueError("No hay operaciones guardadas sobre las que calcular estadísticas.")
+    return estadisticas
+
+def realizar_operacion_matricial(usuario_id, operando1, operador, operando2=None):
+    """
+    Realiza una operación con vectores o matrices (ver calculadora/core/matrices.py)
+    y la guarda en 'operaciones_matriciales'. Retorna el resultado (array o float).
+    Lanza ValueError si las dimensiones no son compatibles o la matriz es singular.
+    """
+    resultado = calcular_matricial(operador, operando1, operando2)
+    insertar_operacion_matricial(usuario_id, operando1, operador, operando2, resultado)
     return resultado
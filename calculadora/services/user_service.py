@@ -5,7 +5,7 @@ import hashlib
 from calculadora.db.models import (
     insertar_usuario,
     obtener_usuario_por_nombre,
-    get_connection
+    marcar_superusuario
 )
 
 def hashear_password(password):
@@ -98,7 +98,6 @@ def crear_superusuario_inicial(nombre, password):
     Asegura que exista al menos un superusuario en el sistema.
     Si el usuario ya existe, actualiza su flag a superusuario.
     """
-    conn = get_connection()
     usuario = obtener_usuario_por_nombre(nombre)
     
     if usuario is None:
@@ -112,16 +111,10 @@ def crear_superusuario_inicial(nombre, password):
         user_id, _, _, es_super = usuario
         if not es_super:
             # Actualizar a superusuario
-            with conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        UPDATE usuarios SET es_superusuario = TRUE
-                        WHERE id = %s;
-                    """, (user_id,))
+            marcar_superusuario(user_id)
             print(f"Usuario '{nombre}' actualizado a superusuario.")
         else:
             print(f"El usuario '{nombre}' ya es superusuario.")
-        conn.close()
         return user_id
 
 def obtener_o_crear_usuario(nombre):
@@ -6,7 +6,9 @@ import re
 import hashlib
 import os
 import requests  # Asegúrate de importar requests para las llamadas API
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from calculadora.db.connection import conexion
 
 # Clase personalizada para JSON que pueda manejar objetos Decimal
 class DecimalEncoder(json.JSONEncoder):
@@ -130,7 +132,9 @@ class SQLSecurityValidator:
         
         # Tablas permitidas para consulta
         self.allowed_tables = [
-            "usuarios", "operaciones", "historial_memoria"
+            "usuarios", "operaciones", "historial_memoria",
+            "agregados_operaciones", "agregados_operaciones_diarios",
+            "analitica_por_hora", "analitica_por_usuario"
         ]
     
     def validate_query(self, sql_query):
@@ -181,12 +185,13 @@ class SQLSecurityValidator:
             
 
 class SQLChatbot:
-    def __init__(self, db_connection, api_key=GROQ_API_KEY, user_tech_level="medio"):
+    def __init__(self, db_connection=None, api_key=GROQ_API_KEY, user_tech_level="medio"):
         """
         Inicializa el chatbot SQL.
         
         Args:
-            db_connection: Conexión a la base de datos
+            db_connection: Conexión a la base de datos (opcional). Si no se indica,
+                           cada consulta toma prestada una conexión del pool.
             api_key: Clave API para Groq
             user_tech_level: Nivel técnico del usuario ('basico', 'medio', 'avanzado')
         """
@@ -199,23 +204,36 @@ class SQLChatbot:
         # Obtener esquema de base de datos
         self.db_schema = self._get_db_schema()
         
+    @contextmanager
+    def _conexion(self):
+        """Usa la conexión fija si se proporcionó; si no, una del pool."""
+        if self.db_connection is not None:
+            yield self.db_connection
+        else:
+            with conexion() as conn:
+                yield conn
+
     def _get_db_schema(self):
         """Obtiene el esquema de la base de datos."""
-        cursor = self.db_connection.cursor()
-        # Consulta para obtener información sobre tablas y columnas
-        cursor.execute("""
-            SELECT table_name, column_name, data_type 
-            FROM information_schema.columns 
-            WHERE table_schema = 'public'
-            AND table_name IN ('usuarios', 'operaciones', 'historial_memoria')
-            ORDER BY table_name, ordinal_position;
-        """)
-        
-        schema = {}
-        for table_name, column_name, data_type in cursor.fetchall():
-            if table_name not in schema:
-                schema[table_name] = []
-            schema[table_name].append({"column": column_name, "type": data_type})
+        with self._conexion() as conn:
+            cursor = conn.cursor()
+            # Consulta para obtener información sobre tablas y columnas
+            cursor.execute("""
+                SELECT table_name, column_name, data_type 
+                FROM information_schema.columns 
+                WHERE table_schema = 'public'
+                AND table_name IN ('usuarios', 'operaciones', 'historial_memoria',
+                                   'agregados_operaciones', 'agregados_operaciones_diarios',
+                                   'analitica_por_hora', 'analitica_por_usuario')
+                ORDER BY table_name, ordinal_position;
+            """)
+            
+            schema = {}
+            for table_name, column_name, data_type in cursor.fetchall():
+                if table_name not in schema:
+                    schema[table_name] = []
+                schema[table_name].append({"column": column_name, "type": data_type})
+            conn.rollback()
             
         return schema
     
@@ -364,6 +382,12 @@ class SQLChatbot:
         6. Si se pide un número específico de resultados, usa LIMIT correctamente
         7. Nunca termines una consulta con LIMIT y punto y coma juntos como "LIMIT 5;"
         8. Si se solicita exportar datos, crea una consulta que seleccione los datos relevantes
+        9. Para conteos, totales (suma de resultado), mínimos o máximos por usuario u operador usa
+           agregados_operaciones (y agregados_operaciones_diarios si se filtra o agrupa por día)
+           en lugar de recorrer la tabla operaciones
+        10. Para actividad por hora o por día de todos los usuarios usa analitica_por_hora, y para
+           la actividad total de cada usuario analitica_por_usuario (pueden no incluir las
+           operaciones más recientes)
         """
         
         prompt = f"""
@@ -418,33 +442,34 @@ class SQLChatbot:
         if cached:
             return cached
         
-        try:
-            cursor = self.db_connection.cursor()
-            
-            # Asegurarse de que estamos en un estado de transacción limpio
-            self.db_connection.rollback()
-            
-            # Ejecutar la consulta
-            cursor.execute(sql_query)
-            
-            # Si no hay resultados, devolver mensaje apropiado
-            if cursor.description is None:
-                return {"success": True, "data": [], "query": sql_query, "message": "La consulta no devolvió resultados."}
-            
-            columns = [desc[0] for desc in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            
-            # Hacer commit explícito para cerrar la transacción
-            self.db_connection.commit()
-            
-            result = {"success": True, "data": results, "query": sql_query}
-            # Guardar en caché para futuras consultas idénticas
-            self.cache.set(cache_key, result)
-            return result
-        except Exception as e:
-            # Asegurarse de hacer rollback en caso de error
-            self.db_connection.rollback()
-            return {"success": False, "error": str(e), "query": sql_query}
+        with self._conexion() as conn:
+            try:
+                cursor = conn.cursor()
+                
+                # Asegurarse de que estamos en un estado de transacción limpio
+                conn.rollback()
+                
+                # Ejecutar la consulta
+                cursor.execute(sql_query)
+                
+                # Si no hay resultados, devolver mensaje apropiado
+                if cursor.description is None:
+                    return {"success": True, "data": [], "query": sql_query, "message": "La consulta no devolvió resultados."}
+                
+                columns = [desc[0] for desc in cursor.description]
+                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                
+                # Hacer commit explícito para cerrar la transacción
+                conn.commit()
+                
+                result = {"success": True, "data": results, "query": sql_query}
+                # Guardar en caché para futuras consultas idénticas
+                self.cache.set(cache_key, result)
+                return result
+            except Exception as e:
+                # Asegurarse de hacer rollback en caso de error
+                conn.rollback()
+                return {"success": False, "error": str(e), "query": sql_query}
     
     def _format_response(self, results, original_query):
         """
@@ -0,0 +1,252 @@
+# calculadora/verificacion.py
+
+"""
+Verificación (replay) del historial de operaciones.
+
+Recalcula los resultados guardados en 'operaciones' con la tabla de operadores
+actual (versión vectorizada de calculadora/core/evaluacion_lote.py) y comunica las
+filas cuyo resultado ya no coincide. Sirve para auditar la tabla tras cambiar un
+operador o migrar datos.
+
+La tabla se recorre por rangos de id (clave primaria) que se reparten entre un
+pool de procesos: cada proceso lee su rango con su propia conexión, en formato
+columnar, y lo compara con NumPy. El proceso principal nunca carga la tabla, solo
+mantiene unos pocos rangos en curso y va guardando un checkpoint con el id hasta
+el que todo está verificado, de modo que una ejecución interrumpida se puede
+reanudar.
+
+Uso:
+    python main.py verificar --procesos 8 --checkpoint verificacion.json
+"""
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from calculadora.core.evaluacion_lote import ERROR_NINGUNO, MENSAJES_ERROR, evaluar_lote
+from calculadora.core.expresiones import compilar
+from calculadora.db.models import (
+    FORMATO_COLUMNAS,
+    obtener_operaciones_por_ids,
+    rango_ids_operaciones,
+)
+
+# Ids por rango (cada proceso lee y compara un rango completo de una vez)
+TAMANO_RANGO = 50000
+
+# Tolerancia de la comparación (los resultados se guardan como NUMERIC)
+TOLERANCIA_RELATIVA = 1e-9
+TOLERANCIA_ABSOLUTA = 1e-12
+
+# Máximo de discrepancias que se conservan con detalle (el total se cuenta siempre)
+MAX_DISCREPANCIAS = 1000
+
+
+def rangos_de_ids(desde_id, hasta_id, tamano=TAMANO_RANGO):
+    """
+    Genera los rangos [inicio, fin) que cubren los ids desde_id..hasta_id (ambos incluidos).
+    """
+    for inicio in range(desde_id, hasta_id + 1, tamano):
+        yield inicio, min(inicio + tamano, hasta_id + 1)
+
+
+def _reevaluar_expresion(texto):
+    """
+    Recalcula una operación 'expr' a partir del texto guardado por describir_expresion
+    ('fuente' o 'fuente [x=1.0, y=2.0]'). Retorna (resultado, mensaje de error).
+    """
+    fuente, variables = texto, {}
+    if texto.endswith("]") and " [" in texto:
+        fuente, valores = texto[:-1].rsplit(" [", 1)
+        for asignacion in valores.split(", "):
+            nombre, valor = asignacion.split("=", 1)
+            variables[nombre] = float(valor)
+    try:
+        return float(compilar(fuente).evaluar(variables)), None
+    except (ArithmeticError, ValueError) as e:
+        return np.nan, str(e)
+
+
+def verificar_rango(desde_id, hasta_id,
+                    rtol=TOLERANCIA_RELATIVA, atol=TOLERANCIA_ABSOLUTA,
+                    max_discrepancias=MAX_DISCREPANCIAS):
+    """
+    Recalcula las operaciones con desde_id <= id < hasta_id y las compara con el
+    resultado guardado. Se ejecuta en los procesos del pool.
+
+    Returns:
+        Diccionario con 'desde', 'hasta', 'revisadas', 'discrepancias' (número) y
+        'detalle' (lista de hasta max_discrepancias diccionarios con id, operación,
+        resultado guardado, recalculado y error)
+    """
+    datos = obtener_operaciones_por_ids(desde_id, hasta_id, formato=FORMATO_COLUMNAS)
+    ids = np.asarray(datos["id"])
+    operadores = np.asarray(datos["operador"], dtype=object)
+    operandos1 = np.asarray(datos["operando1"], dtype=np.float64)
+    operandos2 = np.asarray(datos["operando2"], dtype=np.float64)
+    guardados = np.asarray(datos["resultado"], dtype=np.float64)
+
+    lote = evaluar_lote(operandos1, operadores, operandos2)
+    recalculados = lote.resultados
+    con_error = lote.errores != ERROR_NINGUNO
+    mensajes = [MENSAJES_ERROR.get(codigo) for codigo in lote.errores.tolist()]
+
+    # Las expresiones completas no son operaciones binarias: se recalculan una a una
+    for i in np.flatnonzero(operadores == 'expr'):
+        recalculados[i], mensajes[i] = _reevaluar_expresion(datos["expresion"][i] or "")
+        con_error[i] = mensajes[i] is not None
+
+    # Un error es siempre una discrepancia: la operación guardada sí tuvo resultado
+    distintas = con_error | ~np.isclose(guardados, recalculados, rtol=rtol, atol=atol)
+    indices = np.flatnonzero(distintas)
+
+    detalle = [
+        {
+            "id": int(ids[i]),
+            "operando1": float(operandos1[i]),
+            "operador": operadores[i],
+            "operando2": float(operandos2[i]),
+            "expresion": datos["expresion"][i],
+            "resultado_guardado": float(guardados[i]),
+            "resultado_recalculado": None if np.isnan(recalculados[i]) else float(recalculados[i]),
+            "error": mensajes[i],
+        }
+        for i in indices[:max_discrepancias]
+    ]
+    return {
+        "desde": desde_id,
+        "hasta": hasta_id,
+        "revisadas": len(ids),
+        "discrepancias": len(indices),
+        "detalle": detalle,
+    }
+
+
+def _leer_checkpoint(ruta):
+    if ruta and os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def _guardar_checkpoint(ruta, estado):
+    # Se escribe en un fichero temporal y se renombra para no dejarlo a medias
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def verificar_operaciones(procesos=None, tamano_rango=TAMANO_RANGO, checkpoint=None,
+                          desde_id=None, rtol=TOLERANCIA_RELATIVA, atol=TOLERANCIA_ABSOLUTA,
+                          progreso=None):
+    """
+    Verifica toda la tabla 'operaciones' (o desde 'desde_id') repartiendo los rangos
+    de ids entre 'procesos' procesos (por defecto, uno por núcleo).
+
+    Si 'checkpoint' es la ruta de un fichero existente se reanuda desde el id
+    guardado en él, con los totales acumulados; el fichero se actualiza cada vez
+    que se completa el siguiente rango pendiente. Los rangos terminados fuera de
+    orden se acumulan cuando se completan todos los anteriores, así que al
+    reanudar ningún rango se cuenta dos veces.
+
+    Args:
+        progreso: Función opcional que recibe el estado tras cada rango completado
+
+    Returns:
+        Diccionario con 'revisadas', 'discrepancias', 'detalle', 'siguiente_id',
+        'hasta_id', 'segundos' y 'operaciones_por_segundo'
+    """
+    procesos = procesos or os.cpu_count() or 1
+    minimo, maximo = rango_ids_operaciones()
+
+    estado = _leer_checkpoint(checkpoint) or {
+        "siguiente_id": minimo,
+        "hasta_id": maximo,
+        "revisadas": 0,
+        "discrepancias": 0,
+        "detalle": [],
+    }
+    if desde_id is not None:
+        estado["siguiente_id"] = max(desde_id, estado["siguiente_id"] or desde_id)
+
+    inicio_tiempo = time.perf_counter()
+    revisadas_ejecucion = 0
+
+    if estado["siguiente_id"] is not None and estado["hasta_id"] is not None:
+        rangos = rangos_de_ids(estado["siguiente_id"], estado["hasta_id"], tamano_rango)
+        terminados = {}
+        en_curso = set()
+
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            while True:
+                # Pocos rangos en vuelo: la memoria no crece con el tamaño de la tabla
+                while len(en_curso) < procesos * 2:
+                    rango = next(rangos, None)
+                    if rango is None:
+                        break
+                    en_curso.add(pool.submit(verificar_rango, *rango, rtol=rtol, atol=atol))
+                if not en_curso:
+                    break
+
+                hechos, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    resultado = futuro.result()
+                    terminados[resultado["desde"]] = resultado
+                    revisadas_ejecucion += resultado["revisadas"]
+
+                # Se avanza el checkpoint solo por rangos contiguos
+                avanzado = False
+                while estado["siguiente_id"] in terminados:
+                    resultado = terminados.pop(estado["siguiente_id"])
+                    estado["revisadas"] += resultado["revisadas"]
+                    estado["discrepancias"] += resultado["discrepancias"]
+                    hueco = MAX_DISCREPANCIAS - len(estado["detalle"])
+                    estado["detalle"].extend(resultado["detalle"][:max(hueco, 0)])
+                    estado["siguiente_id"] = resultado["hasta"]
+                    avanzado = True
+
+                if avanzado:
+                    if checkpoint:
+                        _guardar_checkpoint(checkpoint, estado)
+                    if progreso:
+                        progreso(estado)
+
+    segundos = time.perf_counter() - inicio_tiempo
+    return {
+        **estado,
+        "segundos": segundos,
+        "operaciones_por_segundo": revisadas_ejecucion / segundos if segundos > 0 else 0.0,
+    }
+
+
+def ejecutar_verificacion(procesos=None, tamano_rango=TAMANO_RANGO, checkpoint=None,
+                          desde_id=None, mostrar=20):
+    """
+    Verifica la tabla desde la línea de comandos mostrando el progreso, el
+    rendimiento y las primeras 'mostrar' discrepancias.
+
+    Returns:
+        Código de salida del proceso (0 si no hay discrepancias, 2 si las hay)
+    """
+    def progreso(estado):
+        print(
+            f"Verificado hasta id {estado['siguiente_id'] - 1} de {estado['hasta_id']}: "
+            f"{estado['revisadas']} operaciones, {estado['discrepancias']} discrepancias.",
+            flush=True
+        )
+
+    resumen = verificar_operaciones(procesos, tamano_rango, checkpoint, desde_id, progreso=progreso)
+
+    print(
+        f"{resumen['revisadas']} operaciones revisadas, {resumen['discrepancias']} discrepancias "
+        f"({resumen['operaciones_por_segundo']:,.0f} op/s en {resumen['segundos']:.2f} s)."
+    )
+    for d in resumen["detalle"][:mostrar]:
+        operacion = d["expresion"] if d["operador"] == 'expr' else f"{d['operando1']} {d['operador']} {d['operando2']}"
+        recalculado = d["error"] or d["resultado_recalculado"]
+        print(f"  id {d['id']}: {operacion} -> guardado {d['resultado_guardado']}, ahora {recalculado}")
+    return 2 if resumen["discrepancias"] else 0
@@ -5,8 +5,60 @@ Punto de entrada principal para la Calculadora Avanzada.
 Este script inicializa la aplicación, crea las tablas necesarias,
 crea un superusuario inicial si no existe, y muestra el menú de autenticación
 antes de iniciar el menú principal.
+
+Con el subcomando 'lote' procesa operaciones desde un fichero o la entrada
+estándar sin menús (ver calculadora/batch_app.py):
+    python main.py lote --usuario admin --entrada operaciones.csv
+
+Con el subcomando 'verificar' recalcula los resultados guardados y comunica los
+que no coinciden (ver calculadora/verificacion.py):
+    python main.py verificar --procesos 8 --checkpoint verificacion.json
 """
-from calculadora.cli_app import run_app
+import argparse
+import sys
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Calculadora Avanzada")
+    subcomandos = parser.add_subparsers(dest="comando")
+
+    lote = subcomandos.add_parser("lote", help="Procesa operaciones desde un fichero o stdin sin menús")
+    lote.add_argument("--usuario", required=True, help="Nombre del usuario que realiza las operaciones")
+    lote.add_argument("--password", help="Contraseña (por defecto CALCULADORA_PASSWORD o se solicita)")
+    lote.add_argument("--entrada", default="-", help="Fichero CSV/JSON Lines ('-' para stdin)")
+    lote.add_argument("--formato", choices=["auto", "csv", "jsonl"], default="auto")
+    lote.add_argument("--tamano-bloque", type=int, default=10000, help="Operaciones por bloque")
+    lote.add_argument("--no-guardar", action="store_true", help="Solo evaluar, sin guardar en la base de datos")
+
+    verificar = subcomandos.add_parser("verificar", help="Recalcula las operaciones guardadas y comunica discrepancias")
+    verificar.add_argument("--procesos", type=int, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    verificar.add_argument("--tamano-rango", type=int, default=50000, help="Ids que verifica cada tarea")
+    verificar.add_argument("--checkpoint", help="Fichero JSON para guardar el progreso y reanudar")
+    verificar.add_argument("--desde", type=int, help="Primer id a verificar")
+    return parser
+
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    args = crear_parser().parse_args()
+
+    if args.comando == "lote":
+        from calculadora.batch_app import ejecutar_lote
+        sys.exit(ejecutar_lote(
+            args.usuario,
+            password=args.password,
+            entrada=args.entrada,
+            formato=args.formato,
+            tamano_bloque=args.tamano_bloque,
+            guardar=not args.no_guardar
+        ))
+    elif args.comando == "verificar":
+        from calculadora.verificacion import ejecutar_verificacion
+        sys.exit(ejecutar_verificacion(
+            procesos=args.procesos,
+            tamano_rango=args.tamano_rango,
+            checkpoint=args.checkpoint,
+            desde_id=args.desde
+        ))
+    else:
+        from calculadora.cli_app import run_app
+        run_app()
@@ -0,0 +1,311 @@
+# script_generar_datos.py
+
+"""
+Generador de datos sintéticos para pruebas de escala.
+
+Crea usuarios, operaciones e historial_memoria con distribuciones parecidas a las
+de producción: unos pocos usuarios concentran la mayoría de la actividad (reparto
+tipo Zipf), los operadores aparecen con frecuencias distintas y las fechas se
+reparten a lo largo de los días con más actividad en horario laboral. Los datos
+se generan por bloques con NumPy y los resultados se calculan con evaluar_lote,
+así que son coherentes con los operandos (la herramienta de verificación no
+encuentra discrepancias). Con la misma semilla se generan los mismos datos.
+
+En PostgreSQL cada bloque se carga con COPY (los triggers de agregados son por
+sentencia, así que se actualizan una vez por bloque); en SQLite se usan las
+inserciones por lotes del backend.
+
+Uso:
+    python script_generar_datos.py --usuarios 5000 --operaciones 10000000
+    python script_generar_datos.py --backend sqlite --ruta escala.db --operaciones 1000000
+"""
+
+import argparse
+import datetime
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculadora.core.evaluacion_lote import CODIGOS_OPERADOR, ERROR_NINGUNO, evaluar_lote
+from calculadora.core.utils import format_numeros
+from calculadora.db.backends import cerrar_backend, configurar_backend, obtener_backend
+from calculadora.db.models import (
+    crear_tablas,
+    guardar_en_historial_lote,
+    insertar_operaciones_lote,
+    insertar_usuario,
+    obtener_todos_usuarios,
+)
+from calculadora.services.user_service import hashear_password
+
+# Probabilidad de cada operador, en el orden de CODIGOS_OPERADOR (+, -, *, /, ^, sqrt)
+PESOS_OPERADORES = np.array([0.35, 0.20, 0.20, 0.12, 0.08, 0.05])
+
+# Actividad relativa de cada hora del día: casi nula de madrugada, picos a media mañana y media tarde
+PESOS_HORAS = np.array([1, 1, 1, 1, 1, 2, 4, 8, 14, 18, 18, 16, 12, 14, 16, 16, 14, 10, 7, 5, 4, 3, 2, 1],
+                       dtype=np.float64)
+PESOS_HORAS /= PESOS_HORAS.sum()
+
+# Exponente del reparto de operaciones por usuario (el usuario k tiene un peso 1/k^s)
+EXPONENTE_ZIPF = 1.1
+
+# Contraseña de todos los usuarios generados (se hashea una sola vez)
+PASSWORD_SINTETICO = "Sintetico2025!"
+
+_SEGUNDOS_DIA = 86400
+_MICROSEGUNDOS_HORA = 3600 * 10**6
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para pruebas de escala")
+    parser.add_argument("--backend", choices=["postgres", "sqlite"],
+                        help="Backend de almacenamiento (por defecto, CALCULADORA_BACKEND)")
+    parser.add_argument("--ruta", help="Fichero de la base de datos SQLite")
+    parser.add_argument("--usuarios", type=int, default=1000, help="Usuarios a crear")
+    parser.add_argument("--operaciones", type=int, default=1_000_000, help="Operaciones a generar")
+    parser.add_argument("--historial", type=int, default=100_000, help="Entradas de historial_memoria a generar")
+    parser.add_argument("--dias", type=int, default=90, help="Días hacia atrás por los que se reparten las operaciones")
+    parser.add_argument("--horas-historial", type=int, default=24,
+                        help="Horas hacia atrás por las que se reparte el historial (la retención es de 24h)")
+    parser.add_argument("--semilla", type=int, default=2025, help="Semilla del generador aleatorio")
+    parser.add_argument("--tamano-bloque", type=int, default=200_000, help="Filas generadas y cargadas de cada vez")
+    parser.add_argument("--prefijo", default="sintetico", help="Prefijo de los nombres de usuario generados")
+    return parser
+
+
+def pesos_zipf(n, exponente=EXPONENTE_ZIPF, rng=None):
+    """
+    Probabilidades de un reparto tipo Zipf entre n elementos. Si se pasa 'rng',
+    los pesos se barajan para que los usuarios más activos no sean siempre los
+    primeros ids.
+    """
+    pesos = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponente
+    if rng is not None:
+        rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def generar_instantes(rng, n, desde, hasta):
+    """
+    Genera n instantes entre 'desde' y 'hasta' (datetime): el día se elige al azar
+    y la hora según PESOS_HORAS. Los que caen fuera del intervalo (en el primer o
+    el último día) se vuelven a generar.
+
+    Returns:
+        Array datetime64[us]
+    """
+    inicio = np.datetime64(desde, "us")
+    fin = np.datetime64(hasta, "us")
+    primer_dia = inicio.astype("datetime64[D]")
+    dias = int((fin.astype("datetime64[D]") - primer_dia) / np.timedelta64(1, "D")) + 1
+
+    instantes = np.empty(n, dtype="datetime64[us]")
+    pendientes = np.arange(n)
+    while len(pendientes):
+        m = len(pendientes)
+        desplazamiento = (
+            rng.integers(0, dias, m) * (_SEGUNDOS_DIA * 10**6)
+            + rng.choice(24, m, p=PESOS_HORAS) * _MICROSEGUNDOS_HORA
+            + rng.integers(0, _MICROSEGUNDOS_HORA, m)
+        )
+        candidatos = primer_dia + desplazamiento.astype("timedelta64[us]")
+        validos = (candidatos >= inicio) & (candidatos < fin)
+        instantes[pendientes[validos]] = candidatos[validos]
+        pendientes = pendientes[~validos]
+    return instantes
+
+
+def generar_operaciones(rng, n, ids_usuarios, pesos_usuarios, desde, hasta):
+    """
+    Genera un bloque de hasta n operaciones válidas. Los operandos siguen una
+    distribución lognormal (con un 10% de negativos salvo en 'sqrt'), los
+    exponentes de '^' son enteros pequeños y los resultados se calculan con
+    evaluar_lote; las pocas filas con error (p. ej. un divisor redondeado a 0)
+    se descartan.
+
+    Returns:
+        DataFrame con usuario_id, operando1, operador, operando2, resultado y creado_en
+    """
+    codigos = rng.choice(len(CODIGOS_OPERADOR), n, p=PESOS_OPERADORES).astype(np.int8)
+    es_potencia = codigos == CODIGOS_OPERADOR.index('^')
+    es_raiz = codigos == CODIGOS_OPERADOR.index('sqrt')
+
+    signos = np.where((rng.random(n) < 0.1) & ~es_raiz, -1.0, 1.0)
+    operandos1 = np.round(signos * rng.lognormal(3.0, 1.5, n), 2)
+    operandos2 = np.round(rng.lognormal(2.0, 1.2, n), 2)
+    operandos2[es_potencia] = rng.integers(0, 5, int(es_potencia.sum()))
+    operandos2[es_raiz] = 0.0
+
+    resultados, errores = evaluar_lote(operandos1, codigos, operandos2)
+    validas = errores == ERROR_NINGUNO
+    operadores = np.array(CODIGOS_OPERADOR, dtype=object)[codigos]
+
+    return pd.DataFrame({
+        "usuario_id": rng.choice(ids_usuarios, n, p=pesos_usuarios),
+        "operando1": operandos1,
+        "operador": operadores,
+        "operando2": operandos2,
+        "resultado": resultados,
+        "creado_en": generar_instantes(rng, n, desde, hasta),
+    })[validas]
+
+
+def generar_historial(rng, n, ids_usuarios, pesos_usuarios, desde, hasta):
+    """
+    Genera un bloque de entradas de historial con la misma descripción que la CLI
+    ('op1 operador op2 = resultado').
+
+    Returns:
+        DataFrame con usuario_id, fecha_hora y descripcion
+    """
+    ops = generar_operaciones(rng, n, ids_usuarios, pesos_usuarios, desde, hasta)
+    descripciones = (
+        format_numeros(ops["operando1"]) + " " + ops["operador"] + " "
+        + format_numeros(ops["operando2"]) + " = " + format_numeros(ops["resultado"])
+    )
+    return pd.DataFrame({
+        "usuario_id": ops["usuario_id"],
+        "fecha_hora": ops["creado_en"],
+        "descripcion": descripciones,
+    })
+
+
+def _bloques(total, tamano_bloque):
+    """Tamaños de los bloques en que se reparte 'total'."""
+    while total > 0:
+        yield min(total, tamano_bloque)
+        total -= tamano_bloque
+
+
+# ---------------------------------------------------------------------------
+# Carga
+# ---------------------------------------------------------------------------
+
+def _copiar(cur, tabla, df):
+    """Carga un DataFrame en 'tabla' con COPY ... FROM STDIN (formato CSV)."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S.%f")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {tabla} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv);", buffer)
+
+
+class CargaPostgres:
+    """Carga con COPY en PostgreSQL, una transacción por bloque."""
+
+    def crear_usuarios(self, nombres, password):
+        from calculadora.db.connection import conexion
+
+        df = pd.DataFrame({"nombre": nombres, "password": password, "es_superusuario": False})
+        with conexion() as conn, conn:
+            with conn.cursor() as cur:
+                _copiar(cur, "usuarios", df)
+
+    def preparar_historial(self, desde):
+        # Las filas de días sin partición acabarían en la partición por defecto
+        from calculadora.db.particiones import asegurar_particiones_historial
+        asegurar_particiones_historial(desde=desde.date())
+
+    def cargar(self, tabla, df):
+        from calculadora.db.connection import conexion
+
+        with conexion() as conn, conn:
+            with conn.cursor() as cur:
+                _copiar(cur, tabla, df)
+
+
+class CargaEmbebida:
+    """Carga con las inserciones por lotes del backend (SQLite)."""
+
+    def crear_usuarios(self, nombres, password):
+        for nombre in nombres:
+            insertar_usuario(nombre, password)
+
+    def preparar_historial(self, desde):
+        pass
+
+    def cargar(self, tabla, df):
+        # datetime64 -> datetime, que es lo que esperan los adaptadores del backend
+        columnas = [
+            df[c].to_numpy().astype("datetime64[us]").tolist() if df[c].dtype.kind == "M" else df[c].tolist()
+            for c in df.columns
+        ]
+        if tabla == "operaciones":
+            # La columna 'expresion' solo la usan las operaciones 'expr'
+            insertar_operaciones_lote([fila + (None,) for fila in zip(*columnas)])
+        else:
+            guardar_en_historial_lote(list(zip(*columnas)))
+
+
+def preparar_usuarios(carga, n, prefijo):
+    """
+    Crea los usuarios '<prefijo>_0000001'... que falten hasta tener n.
+
+    Returns:
+        Array con los ids de los n usuarios
+    """
+    nombres = [f"{prefijo}_{i:07d}" for i in range(1, n + 1)]
+    existentes = {u["nombre"]: u["id"] for u in obtener_todos_usuarios()}
+    nuevos = [nombre for nombre in nombres if nombre not in existentes]
+    if nuevos:
+        carga.crear_usuarios(nuevos, hashear_password(PASSWORD_SINTETICO))
+        existentes = {u["nombre"]: u["id"] for u in obtener_todos_usuarios()}
+    return np.array([existentes[nombre] for nombre in nombres], dtype=np.int64)
+
+
+def generar_datos(usuarios, operaciones, historial, dias=90, horas_historial=24,
+                  semilla=2025, tamano_bloque=200_000, prefijo="sintetico"):
+    """
+    Genera y carga los datos en el backend configurado.
+
+    Returns:
+        Diccionario con las filas cargadas por tabla y los segundos empleados
+    """
+    carga = CargaPostgres() if obtener_backend().usa_models else CargaEmbebida()
+    rng = np.random.default_rng(semilla)
+    ahora = datetime.datetime.now()
+    resumen = {}
+
+    inicio = time.perf_counter()
+    ids_usuarios = preparar_usuarios(carga, usuarios, prefijo)
+    pesos_usuarios = pesos_zipf(len(ids_usuarios), rng=rng)
+    resumen["usuarios"] = (len(ids_usuarios), time.perf_counter() - inicio)
+    print(f"Usuarios: {len(ids_usuarios)} ({resumen['usuarios'][1]:.1f}s)")
+
+    desde = ahora - datetime.timedelta(days=dias)
+    desde_historial = ahora - datetime.timedelta(hours=horas_historial)
+    carga.preparar_historial(desde_historial)
+
+    for tabla, total, generar, inicio_intervalo in (
+        ("operaciones", operaciones, generar_operaciones, desde),
+        ("historial_memoria", historial, generar_historial, desde_historial),
+    ):
+        inicio = time.perf_counter()
+        cargadas = 0
+        for n in _bloques(total, tamano_bloque):
+            df = generar(rng, n, ids_usuarios, pesos_usuarios, inicio_intervalo, ahora)
+            carga.cargar(tabla, df)
+            cargadas += len(df)
+            print(f"\r{tabla}: {cargadas}/{total}", end="", flush=True)
+        segundos = time.perf_counter() - inicio
+        resumen[tabla] = (cargadas, segundos)
+        print(f"\r{tabla}: {cargadas} filas en {segundos:.1f}s"
+              f" ({cargadas / segundos * 60 if segundos else 0:,.0f} filas/minuto)")
+
+    return resumen
+
+
+if __name__ == "__main__":
+    args = crear_parser().parse_args()
+    if args.backend == "sqlite":
+        configurar_backend("sqlite", ruta=args.ruta)
+    elif args.backend:
+        configurar_backend(args.backend)
+
+    try:
+        crear_tablas()
+        generar_datos(args.usuarios, args.operaciones, args.historial, args.dias, args.horas_historial,
+                      args.semilla, args.tamano_bloque, args.prefijo)
+    finally:
+        cerrar_backend()